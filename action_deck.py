@@ -0,0 +1,260 @@
+"""
+Baralho de ação do SWADE para a iniciativa (!init): um baralho de 54
+cartas por canal.
+
+Cada carta é um byte que já vale a ordem de iniciativa: 0..51 são as
+cartas comuns (valor * 4 + naipe, do 2 de paus ao Ás de espadas) e 52/53
+os Coringas; maior byte age antes. O baralho é um bytearray com uma
+permutação das 54 cartas e um cursor: o que está antes do cursor já saiu.
+Os combatentes de cada canal ficam em listas paralelas (nomes, um byte de
+carta e um de espera por combatente).
+
+Distribuir é um fatiamento: as cartas de todos saem de order[cursor:], de
+uma vez, e a ordem da rodada é um argsort dos bytes. Embaralhar é uma
+permutação do NumPy das cartas que não estão na mão de ninguém.
+
+Regras: quem está em espera (hold) não recebe carta nova; se saiu Coringa,
+o baralho é embaralhado antes da rodada seguinte; se as cartas acabam no
+meio da rodada, volta para o baralho o que não está em jogo.
+
+Persistência (com `path`): snapshot() grava os baralhos alterados numa
+tabela SQLite e tira da memória os que ficaram `idle_seconds` sem uso;
+load() traz de volta (o bot chama fora do event loop). Sem `path`, baralho
+ocioso é descartado. Quem altera um baralho segura `lock` (o snapshot roda
+numa thread).
+"""
+import json
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+DECK_SIZE = 54
+FIRST_JOKER = 52
+NO_CARD = 255       # sem carta: em espera ou fora da rodada
+RANKS = ("2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "A")
+SUITS = ("♣", "♦", "♥", "♠")   # ordem de desempate do SWADE, do menor ao maior
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS action_decks (
+    channel_id  INTEGER PRIMARY KEY,
+    last_used   REAL    NOT NULL,
+    deck        BLOB    NOT NULL,
+    cursor      INTEGER NOT NULL,
+    round       INTEGER NOT NULL,
+    joker_out   INTEGER NOT NULL,
+    names       TEXT    NOT NULL,
+    cards       BLOB    NOT NULL,
+    held        BLOB    NOT NULL
+);
+"""
+
+UPSERT = """
+INSERT INTO action_decks (channel_id, last_used, deck, cursor, round, joker_out, names, cards, held)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (channel_id) DO UPDATE SET
+    last_used = excluded.last_used, deck = excluded.deck, cursor = excluded.cursor, round = excluded.round,
+    joker_out = excluded.joker_out, names = excluded.names, cards = excluded.cards, held = excluded.held
+"""
+
+ALL_CARDS = np.arange(DECK_SIZE, dtype=np.uint8)
+
+
+def is_joker(card: int) -> bool:
+    return FIRST_JOKER <= card < DECK_SIZE
+
+
+def card_name(card: int) -> str:
+    if is_joker(card):
+        return "🃏 Coringa"
+    return RANKS[card // 4] + SUITS[card % 4]
+
+
+class Deck:
+    __slots__ = ("order", "cursor", "round", "joker_out", "names", "cards", "held", "last_used", "dirty")
+
+    def __init__(self, order: bytearray, cursor: int = 0, round_no: int = 0, joker_out: bool = False,
+                 names=(), cards: bytearray = None, held: bytearray = None, last_used: float = 0.0):
+        self.order = order               # permutação das 54 cartas
+        self.cursor = cursor             # order[:cursor] já saiu
+        self.round = round_no
+        self.joker_out = joker_out       # saiu Coringa: embaralha antes da próxima rodada
+        self.names = list(names)
+        self.cards = cards if cards is not None else bytearray([NO_CARD]) * len(self.names)
+        self.held = held if held is not None else bytearray(len(self.names))
+        self.last_used = last_used
+        self.dirty = False
+
+    @classmethod
+    def new(cls, gen: np.random.Generator) -> "Deck":
+        return cls(bytearray(gen.permutation(ALL_CARDS).tobytes()))
+
+    # ---------- Cartas ----------
+    def available(self) -> int:
+        return DECK_SIZE - self.cursor
+
+    def in_play(self) -> np.ndarray:
+        cards = np.frombuffer(self.cards, dtype=np.uint8)
+        return cards[cards != NO_CARD]
+
+    def shuffle(self, gen: np.random.Generator):
+        """Embaralha tudo o que não está na mão de alguém (essas ficam antes do cursor)."""
+        in_play = self.in_play()
+        rest = np.setdiff1d(ALL_CARDS, in_play, assume_unique=True)
+        self.order = bytearray(np.concatenate((in_play, gen.permutation(rest))).tobytes())
+        self.cursor = len(in_play)
+        self.joker_out = bool((in_play >= FIRST_JOKER).any())
+
+    def take(self, gen: np.random.Generator, n: int) -> np.ndarray:
+        """Próximas n cartas (embaralha antes se não houver n); quem chama garante n <= cartas fora de jogo."""
+        if n > self.available():
+            self.shuffle(gen)
+        drawn = np.frombuffer(self.order, dtype=np.uint8)[self.cursor:self.cursor + n].copy()
+        self.cursor += n
+        if (drawn >= FIRST_JOKER).any():
+            self.joker_out = True
+        return drawn
+
+    # ---------- Rodadas ----------
+    def deal(self, gen: np.random.Generator, names=None) -> bool:
+        """
+        Nova rodada: descarta as cartas da anterior e dá uma para cada
+        combatente fora de espera. `names` troca a lista (e zera as esperas).
+        Retorna True se embaralhou por causa de um Coringa.
+        """
+        if names is not None:
+            self.names = list(names)
+            self.held = bytearray(len(self.names))
+        self.cards = bytearray([NO_CARD]) * len(self.names)
+        reshuffled = self.joker_out
+        if reshuffled:
+            self.shuffle(gen)
+        held = np.frombuffer(self.held, dtype=np.uint8).astype(bool)
+        cards = np.full(len(self.names), NO_CARD, dtype=np.uint8)
+        cards[~held] = self.take(gen, int((~held).sum()))
+        self.cards = bytearray(cards.tobytes())
+        self.round += 1
+        return reshuffled
+
+    def redraw(self, gen: np.random.Generator, i: int):
+        """Mais uma carta para o combatente i, que fica com a melhor. Retorna (antiga, nova)."""
+        old = self.cards[i]
+        new = int(self.take(gen, 1)[0])
+        self.cards[i] = max(old, new)
+        return old, new
+
+    def toggle_hold(self, i: int) -> bool:
+        """Põe/tira da espera. Quem entra em espera guarda a carta até agir."""
+        self.held[i] ^= 1
+        return bool(self.held[i])
+
+    def find(self, name: str):
+        key = name.casefold()
+        return next((i for i, n in enumerate(self.names) if n.casefold() == key), None)
+
+    def ranking(self):
+        """Índices de quem tem carta, do primeiro a agir ao último."""
+        cards = np.frombuffer(self.cards, dtype=np.uint8)
+        idx = np.flatnonzero(cards != NO_CARD)
+        return idx[np.argsort(-cards[idx].astype(np.int16), kind="stable")].tolist()
+
+    # ---------- Linha da tabela ----------
+    def to_row(self, channel_id):
+        return (channel_id, self.last_used, bytes(self.order), self.cursor, self.round, int(self.joker_out),
+                json.dumps(self.names, ensure_ascii=False), bytes(self.cards), bytes(self.held))
+
+    @classmethod
+    def from_row(cls, row) -> "Deck":
+        last_used, order, cursor, round_no, joker_out, names, cards, held = row
+        return cls(bytearray(order), cursor, round_no, bool(joker_out), json.loads(names),
+                   bytearray(cards), bytearray(held), last_used)
+
+
+class DeckStore:
+    def __init__(self, path: str = "", idle_seconds: float = 14400.0, seed=None):
+        self.path = path
+        self.idle_seconds = idle_seconds
+        self.gen = np.random.Generator(np.random.PCG64(seed))
+        self.decks = {}                  # canal -> Deck
+        self.dropped = set()             # canais com !init fim ainda não apagados do disco
+        self.lock = threading.Lock()     # decks/dropped e as alterações dos baralhos
+        self.io_lock = threading.Lock()  # disco: snapshot e load não se cruzam
+        self.conn = None
+        if path:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+
+    # ---------- Caminho de cada !init ----------
+    def get(self, channel_id):
+        """Baralho do canal se estiver na memória; None se precisa de load()."""
+        return self.decks.get(channel_id)
+
+    def load(self, channel_id) -> Deck:
+        """Baralho do canal: da memória, do disco ou um novo. Pode ler o disco."""
+        with self.io_lock:
+            with self.lock:
+                deck = self.decks.get(channel_id)
+                if deck is not None:
+                    return deck
+            row = None
+            if self.conn is not None and channel_id not in self.dropped:
+                row = self.conn.execute(
+                    "SELECT last_used, deck, cursor, round, joker_out, names, cards, held "
+                    "FROM action_decks WHERE channel_id = ?", (channel_id,)
+                ).fetchone()
+            with self.lock:
+                deck = self.decks.get(channel_id)
+                if deck is None:
+                    deck = Deck.from_row(row) if row is not None else Deck.new(self.gen)
+                    deck.last_used = time.time()
+                    self.decks[channel_id] = deck
+                return deck
+
+    def touch(self, deck: Deck):
+        """Depois de alterar um baralho (com `lock`): entra no próximo snapshot."""
+        deck.last_used = time.time()
+        deck.dirty = True
+
+    def drop(self, channel_id):
+        """Encerra o combate do canal (sai da memória e, no snapshot, do disco)."""
+        with self.lock:
+            self.decks.pop(channel_id, None)
+            if self.conn is not None:
+                self.dropped.add(channel_id)
+
+    # ---------- Manutenção (thread à parte, de tempos em tempos) ----------
+    def snapshot(self, now: float | None = None):
+        """Grava os baralhos alterados e tira da memória os ociosos. Retorna (gravados, removidos)."""
+        now = time.time() if now is None else now
+        with self.io_lock:
+            rows, deletes = [], []
+            with self.lock:
+                if self.conn is not None:
+                    for channel_id, deck in self.decks.items():
+                        if deck.dirty:
+                            rows.append(deck.to_row(channel_id))
+                            deck.dirty = False
+                    deletes = [(channel_id,) for channel_id in self.dropped]
+                    self.dropped.clear()
+            if rows or deletes:
+                with self.conn:
+                    # Antes das gravações: `!init fim` seguido de um combate novo no
+                    # mesmo intervalo apaga o antigo e grava o novo
+                    self.conn.executemany("DELETE FROM action_decks WHERE channel_id = ?", deletes)
+                    self.conn.executemany(UPSERT, rows)
+
+            cutoff = now - self.idle_seconds
+            with self.lock:
+                idle = [channel_id for channel_id, deck in self.decks.items()
+                        if deck.last_used < cutoff and (not deck.dirty or self.conn is None)]
+                for channel_id in idle:
+                    del self.decks[channel_id]
+        return len(rows), len(idle)
+
+    def close(self):
+        if self.conn is not None:
+            self.snapshot(now=0.0)    # grava tudo; now=0 não expulsa ninguém
+            self.conn.close()
+            self.conn = None
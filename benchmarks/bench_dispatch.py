@@ -0,0 +1,125 @@
+"""
+Benchmark do dispatcher: mensagens/s do parse_message contra a cadeia de
+regex antiga (DS_PATTERN.search + sub + 4 padrões ancorados).
+
+Uso: python benchmarks/bench_dispatch.py [--messages N] [--chat-ratio 0.95]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot_swade_s as bot  # noqa: E402
+
+# ------------------------------------------------------------
+# Cadeia antiga, copiada do on_message anterior ao dispatcher
+# ------------------------------------------------------------
+CMD_PATTERN_GROUP = re.compile(
+    r"^\s*(\d*)\s*s(4|6|8|10|12)"
+    r"(?:\s*([+-]\s*\d+))?"
+    r"(?:\s*t\s*(\d+))?\s*$",
+    re.IGNORECASE
+)
+CMD_PATTERN_INDIV = re.compile(
+    r"^\s*(\d+)\s*#\s*s(4|6|8|10|12)"
+    r"(?:\s*([+-]\s*\d+))?"
+    r"(?:\s*t\s*(\d+))?\s*$",
+    re.IGNORECASE
+)
+DMG_PATTERN_GROUP = re.compile(
+    r"^\s*(\d*)\s*d(4|6|8|10|12|20)"
+    r"(?:\s*\+\s*(\d*)\s*d(4|6|8|10|12|20))?"
+    r"(?:\s*([+-]\s*\d+))?"
+    r"(?:\s*t\s*(\d+))?\s*$",
+    re.IGNORECASE
+)
+DMG_PATTERN_INDIV = re.compile(
+    r"^\s*(\d+)\s*#\s*(\d*)\s*d(4|6|8|10|12|20)"
+    r"(?:\s*\+\s*(\d*)\s*d(4|6|8|10|12|20))?"
+    r"(?:\s*([+-]\s*\d+))?"
+    r"(?:\s*t\s*(\d+))?\s*$",
+    re.IGNORECASE
+)
+DS_PATTERN = re.compile(r"\bds\s*(6|8|10|12)\b", re.IGNORECASE)
+
+
+def legacy_parse(content):
+    ds_match = DS_PATTERN.search(content)
+    wild_size = int(ds_match.group(1)) if ds_match else bot.WILD_DEFAULT
+    content_base = DS_PATTERN.sub("", content).strip()
+    m = DMG_PATTERN_INDIV.match(content_base)
+    if m:
+        return ("dmg_indiv", m.groups())
+    m = DMG_PATTERN_GROUP.match(content_base)
+    if m:
+        return ("dmg_group", m.groups())
+    m = CMD_PATTERN_INDIV.match(content_base)
+    if m:
+        return ("indiv", m.groups(), wild_size)
+    m = CMD_PATTERN_GROUP.match(content_base)
+    if m:
+        return ("group", m.groups(), wild_size)
+    return None
+
+
+# ------------------------------------------------------------
+# Mistura de mensagens
+# ------------------------------------------------------------
+CHAT = [
+    "alguém viu o mapa da sessão passada?",
+    "kkkkkkk",
+    "vou atacar o orc com a espada",
+    "o mestre tá demorando hoje",
+    "Boa noite pessoal!",
+    "quanto de dano faz a escopeta mesmo?",
+    "ok",
+    "sério isso?? 😂",
+    "preciso de 3 bennies",
+    "https://example.com/ficha.pdf",
+    "d",
+    "sim",
+    "hahaha ele errou de novo",
+    "teste de furtividade agora né",
+]
+ROLLS = [
+    "s8", "3s6 +2", "2s10 T6", "4s8 DS10", "3#s10", "5#s6 +1 T6 DS8",
+    "2d6 +1", "d10 T6", "2d6 + d8", "3d8 + 2d6 -2 T5", "4#2d6 +1", "5#d12 T4",
+]
+
+
+def make_messages(n, chat_ratio, seed=1234):
+    rng = random.Random(seed)
+    return [rng.choice(CHAT) if rng.random() < chat_ratio else rng.choice(ROLLS) for _ in range(n)]
+
+
+def measure(fn, messages, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for content in messages:
+            fn(content)
+        best = min(best, time.perf_counter() - t0)
+    return len(messages) / best
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--messages", type=int, default=100_000)
+    ap.add_argument("--chat-ratio", type=float, default=0.95)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    messages = make_messages(args.messages, args.chat_ratio)
+    legacy = measure(legacy_parse, messages, args.repeat)
+    current = measure(bot.parse_message, messages, args.repeat)
+    print(f"mensagens: {args.messages} | conversa: {args.chat_ratio:.0%}")
+    print(f"regex (antigo):  {legacy:>12,.0f} msg/s")
+    print(f"parse_message:   {current:>12,.0f} msg/s  ({current / legacy:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
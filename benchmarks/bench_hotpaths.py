@@ -0,0 +1,286 @@
+"""
+Microbenchmarks dos caminhos quentes do bot: roll_ace por lado de dado,
+roll_damage_once, apply_wild_to_best_slot com N grande, cada caminho do
+parser do on_message, cada build_*_embed (e render_text) com 1, 10 e
+MAX_COUNT entradas e a rodada do !init (deal e embed) com 5, 30 e 54
+combatentes.
+
+Sementes fixas; o resultado sai em JSON e pode ser comparado com uma base
+salva. Qualquer caso mais lento que a base além da tolerância faz o script
+sair com código 1; sem base, sai com código 2. A base versionada
+(benchmarks/baseline.json) foi gravada numa máquina só, e a comparação
+desconta a velocidade da máquina pelo trabalho de referência; para
+medir uma mudança com precisão, grave a sua com --save-baseline antes de
+mexer no código.
+
+Uso:
+  python benchmarks/bench_hotpaths.py                        # compara com benchmarks/baseline.json
+  python benchmarks/bench_hotpaths.py --save-baseline        # grava a base desta máquina
+  python benchmarks/bench_hotpaths.py --json out.json --filter embed/
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot_swade_s as bot  # noqa: E402
+from action_deck import DECK_SIZE, Deck  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+SEED = 20240601
+BIG_N = 100_000
+
+
+# ------------------------------------------------------------
+# Casos: nome -> (setup, fn). setup() roda uma vez, fora da medição,
+# e devolve os argumentos de fn.
+# ------------------------------------------------------------
+def reseed():
+    random.seed(SEED)
+    bot.DICE.reseed(SEED)
+
+
+def case(name, fn, setup=lambda: ()):
+    return name, setup, fn
+
+
+def trait_inputs(count: int, individual: bool = False):
+    return bot.TraitCommand(count, 8, 1, 4, 6, individual)
+
+
+def group_embed_args(count: int):
+    return (bot.roll_trait_group(trait_inputs(count)),)
+
+
+def individuals_embed_args(count: int):
+    return (bot.roll_trait_individuals(trait_inputs(count, individual=True)),)
+
+
+def damage_group_embed_args(count: int):
+    cmd = bot.DamageCommand(1, (bot.DiceTerm(count, 6), bot.DiceTerm(1, 8)), 1, 4, False)
+    return (bot.roll_damage(cmd),)
+
+
+def damage_individuals_embed_args(count: int):
+    return (bot.roll_damage(bot.DamageCommand(count, (bot.DiceTerm(2, 6),), 1, 4, True)),)
+
+
+def init_deck(n: int):
+    deck = Deck.new(np.random.default_rng(SEED))
+    deck.deal(np.random.default_rng(SEED), [f"Zumbi {k}" for k in range(1, n + 1)])
+    return deck
+
+
+def apply_wild_args(n: int):
+    rng = np.random.default_rng(SEED)
+    firsts = rng.integers(1, 9, size=n).tolist()
+    return firsts, 5, 4, firsts, 3
+
+
+DAMAGE_TERMS = {
+    "2d6": (bot.DiceTerm(2, 6),),
+    "3d8+2d6": (bot.DiceTerm(3, 8), bot.DiceTerm(2, 6)),
+    "4d6k3-d4": (bot.DiceTerm(4, 6, keep=3), bot.DiceTerm(1, 4, -1)),
+}
+
+PARSE_PATHS = {
+    "chat": "vou atacar o orc com a espada",
+    "chat_short": "ok",
+    "group": "3s6 +2 T6",
+    "group_ds": "4s8 DS10",
+    "individual": "5#s6 +1 T6 DS8",
+    "damage": "3d8 + 2d6 -2 T5",
+    "damage_individual": "4#2d6 +1",
+    "damage_expr": "3#(2d6 + d8 - d4) -2 T6",
+    "multi": "s8 +1; 2d6+d8; T6 DS8",
+}
+
+
+def build_cases():
+    cases = []
+    for die in (4, 6, 8, 10, 12, 20):
+        cases.append(case(f"roll_ace/d{die}", bot.roll_ace, lambda die=die: (die,)))
+    for text, terms in DAMAGE_TERMS.items():
+        cases.append(case(f"roll_damage_once/{text}", bot.roll_damage_once, lambda terms=terms: (terms,)))
+    cases.append(case(f"apply_wild_to_best_slot/n={BIG_N}", bot.apply_wild_to_best_slot,
+                      lambda: apply_wild_args(BIG_N)))
+    for path, text in PARSE_PATHS.items():
+        cases.append(case(f"parse/{path}", bot.parse_message, lambda text=text: (text,)))
+    # Sem os caches de compile_command/tokenize: o custo de uma expressão nova
+    for path in ("damage", "damage_expr"):
+        norm = bot.normalize_command(PARSE_PATHS[path])
+        cases.append(case(f"compile/{path}", lambda norm: bot.parse_tokens(bot.tokenize.__wrapped__(norm)),
+                          lambda norm=norm: (norm,)))
+    for n in (1, 10, bot.MAX_COUNT):
+        cases.append(case(f"embed/group/{n}", bot.build_group_embed, lambda n=n: group_embed_args(n)))
+        cases.append(case(f"embed/individuals/{n}", bot.build_individuals_embed,
+                          lambda n=n: individuals_embed_args(n)))
+        cases.append(case(f"embed/damage_group/{n}", bot.build_damage_group_embed,
+                          lambda n=n: damage_group_embed_args(n)))
+        cases.append(case(f"embed/damage_individuals/{n}", bot.build_damage_individuals_embed,
+                          lambda n=n: damage_individuals_embed_args(n)))
+        for kind, args in (("group", group_embed_args), ("individuals", individuals_embed_args),
+                           ("damage_group", damage_group_embed_args),
+                           ("damage_individuals", damage_individuals_embed_args)):
+            cases.append(case(f"text/{kind}/{n}", bot.render_text, lambda n=n, args=args: args(n)))
+    for n in (5, 30, DECK_SIZE):
+        cases.append(case(f"init/deal/{n}", lambda deck, gen: deck.deal(gen),
+                          lambda n=n: (init_deck(n), np.random.default_rng(SEED))))
+        cases.append(case(f"embed/init/{n}", bot.build_init_embed, lambda n=n: (init_deck(n),)))
+    return cases
+
+
+# ------------------------------------------------------------
+# Medição
+# ------------------------------------------------------------
+def calibrate(fn, args, min_time: float):
+    """Quantas chamadas por repetição para cada uma durar pelo menos min_time."""
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn(*args)
+        if time.perf_counter() - t0 >= min_time or loops >= 1 << 24:
+            return loops
+        loops *= 4
+
+
+def reference_workload():
+    """Trabalho fixo (Python puro + numpy) para descontar a velocidade da máquina."""
+    total = 0
+    for i in range(2000):
+        total += i * i
+    np.random.default_rng(SEED).integers(1, 7, size=256).sum()
+    return total
+
+
+def run(cases, repeat: int, min_time: float, quiet: bool = False):
+    """
+    Mede as repetições em rodízio (uma de cada caso por vez), para que
+    oscilações da máquina se espalhem por todos os casos; fica o melhor tempo.
+    """
+    cases = [("_reference", lambda: (), reference_workload)] + list(cases)
+    prepared = []
+    for name, setup, fn in cases:
+        reseed()
+        args = setup()
+        prepared.append((name, fn, args, calibrate(fn, args, min_time)))
+
+    samples = {name: [] for name, _, _, _ in prepared}
+    for _ in range(repeat):
+        for name, fn, args, loops in prepared:
+            reseed()
+            t0 = time.perf_counter()
+            for _ in range(loops):
+                fn(*args)
+            samples[name].append((time.perf_counter() - t0) / loops * 1e9)
+
+    results = {}
+    for name, fn, args, loops in prepared:
+        results[name] = {"best_ns": min(samples[name]), "median_ns": statistics.median(samples[name]),
+                         "loops": loops}
+        if not quiet and name != "_reference":
+            print(f"{name:<40} {fmt_ns(results[name]['best_ns']):>12}", flush=True)
+    return results
+
+
+def fmt_ns(ns: float) -> str:
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("µs", 1e3)):
+        if ns >= scale:
+            return f"{ns / scale:.2f} {unit}"
+    return f"{ns:.0f} ns"
+
+
+# ------------------------------------------------------------
+# Base de comparação
+# ------------------------------------------------------------
+def compare(results, baseline, tolerance: float):
+    """
+    Linhas do relatório e lista de regressões. Os tempos são divididos pelo
+    do trabalho de referência de cada execução antes de comparar; regressão
+    é razão acima de 1 + tolerance.
+    """
+    lines, regressions = [], []
+    speed = results["_reference"]["best_ns"] / baseline["_reference"]["best_ns"]
+    lines.append(f"máquina: {speed:.2f}x o tempo de referência da base")
+    for name, res in results.items():
+        if name == "_reference":
+            continue
+        base = baseline.get(name)
+        if base is None:
+            lines.append(f"{name:<40} {fmt_ns(res['best_ns']):>12}   (sem base)")
+            continue
+        ratio = res["best_ns"] / base["best_ns"] / speed
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  <-- REGRESSÃO"
+            regressions.append(name)
+        lines.append(f"{name:<40} {fmt_ns(res['best_ns']):>12}  base {fmt_ns(base['best_ns']):>10}  {ratio:5.2f}x{flag}")
+    return lines, regressions
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "seed": SEED,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--repeat", type=int, default=7)
+    ap.add_argument("--min-time", type=float, default=0.05, help="segundos mínimos por repetição")
+    ap.add_argument("--filter", default="", help="só casos cujo nome contém este texto")
+    ap.add_argument("--json", help="grava os resultados neste arquivo")
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE)
+    ap.add_argument("--save-baseline", action="store_true", help="grava os resultados como a nova base")
+    ap.add_argument("--tolerance", type=float, default=0.30, help="folga antes de acusar regressão (0.30 = 30%%)")
+    args = ap.parse_args(argv)
+
+    cases = [c for c in build_cases() if args.filter in c[0]]
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    results = run(cases, args.repeat, args.min_time, quiet=baseline is not None)
+    report = {"environment": environment(), "results": results}
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.save_baseline:
+        if args.filter:
+            ap.error("--save-baseline grava a suíte inteira; não use com --filter")
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"base gravada em {args.baseline}")
+        return 0
+    if baseline is None:
+        # Sem base não há como acusar regressão: não passa calado
+        print(f"\nsem base em {args.baseline}; grave uma com --save-baseline", file=sys.stderr)
+        return 2
+
+    lines, regressions = compare(results, baseline, args.tolerance)
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} regressão(ões) acima de {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"\nsem regressões (tolerância {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Compara os backends de sorteio (dice_rng.py): numpy/python, com e sem
+buffer, contra random.randint por dado (o jeito antigo do bot).
+
+Mede dice(lado, n) nos tamanhos que o bot pede de verdade (1 dado do
+selvagem, 3 de um grupo, 20 de N#, 4096 de um bloco de rolagem grande) e
+roll_ace_batch inteiro (com explosões) em cima de cada backend.
+
+Uso: python benchmarks/bench_rng.py [--repeat 5] [--json rng.json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot_swade_s as bot  # noqa: E402
+from dice_rng import BACKENDS, make_dice  # noqa: E402
+
+SEED = 20240601
+SIZES = (1, 3, 20, 4096)
+BUFFERS = (0, 4096)
+DIE = 8
+
+
+def best_ns_per_call(fn, repeat: int, min_time: float = 0.05):
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - t0 >= min_time:
+            break
+        loops *= 4
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, time.perf_counter() - t0)
+    return best / loops * 1e9
+
+
+def stdlib_randint(n: int):
+    rand = random.Random(SEED)
+    randint = rand.randint
+    return lambda: [randint(1, DIE) for _ in range(n)]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--json", help="grava os resultados neste arquivo")
+    args = ap.parse_args(argv)
+
+    results = {}
+    for n in SIZES:
+        results[f"randint/n={n}"] = best_ns_per_call(stdlib_randint(n), args.repeat)
+        for backend in BACKENDS:
+            for buffer in BUFFERS:
+                dice = make_dice(backend, SEED, buffer)
+                results[f"{backend}/buf={buffer}/n={n}"] = best_ns_per_call(
+                    lambda dice=dice, n=n: dice.dice(DIE, n), args.repeat)
+    for n in SIZES:
+        for backend in BACKENDS:
+            for buffer in BUFFERS:
+                dice = make_dice(backend, SEED, buffer)
+                results[f"roll_ace_batch/{backend}/buf={buffer}/n={n}"] = best_ns_per_call(
+                    lambda dice=dice, n=n: bot.roll_ace_batch(n, DIE, with_chains=False, rng=dice), args.repeat)
+
+    print(f"d{DIE}, melhor de {args.repeat} (ns por chamada; entre parênteses, ns por dado)")
+    for name, ns in results.items():
+        n = int(name.rsplit("=", 1)[1])
+        print(f"{name:<40} {ns:>12,.0f}  ({ns / n:>8,.1f})")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"die": DIE, "seed": SEED, "results_ns": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
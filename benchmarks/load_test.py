@@ -0,0 +1,275 @@
+"""
+Teste de carga ponta a ponta: repete um fluxo de mensagens pelo on_message
+de verdade, com Message falsas e um reply assíncrono que só registra o
+envio (com latência de rede simulada). Sem rede e sem token.
+
+As mensagens chegam num ritmo fixo (--rate por segundo), sem esperar as
+respostas anteriores; a latência conta a partir do horário agendado de
+chegada, então um bot atrasado aparece como latência e não como ritmo
+menor.
+
+Relata vazão, latência p50/p90/p99 por tipo de mensagem, atraso do event
+loop e pico de memória (RSS).
+
+Uso:
+  python benchmarks/load_test.py --rate 500 --duration 20
+  python benchmarks/load_test.py --mix chat=0.5,group=0.2,individual=0.1,damage=0.2 --channels 20
+  python benchmarks/load_test.py --json carga.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot_swade_s as bot  # noqa: E402
+
+SEED = 20240601
+
+MESSAGES = {
+    "chat": [
+        "alguém viu o mapa da sessão passada?", "kkkkkkk", "vou atacar o orc com a espada",
+        "o mestre tá demorando hoje", "Boa noite pessoal!", "quanto de dano faz a escopeta mesmo?",
+        "ok", "sério isso?? 😂", "preciso de 3 bennies", "teste de furtividade agora né",
+    ],
+    "group": ["s8", "3s6 +2", "2s10 T6", "4s8 DS10", "s12 -2", "5s6 +1 T5"],
+    "individual": ["3#s10", "5#s6 +1 T6 DS8", "2#s8 T5", "10#s4 +2"],
+    "damage": ["2d6 +1", "d10 T6", "2d6 + d8", "3d8 + 2d6 -2 T5", "4#2d6 +1", "5#d12 T4"],
+    "big": ["500#s8 +1", "2000#2d6 T5", "10000#s6"],
+    "bang": ["!odds 3s8+2 T6 DS10", "!odds 2d6+d8 T5", "!help"],
+}
+DEFAULT_MIX = "chat=0.90,group=0.04,individual=0.02,damage=0.04"
+
+
+# ------------------------------------------------------------
+# Objetos falsos do discord.py (só o que o bot usa)
+# ------------------------------------------------------------
+class FakeUser:
+    __slots__ = ("id", "bot", "display_name")
+
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.bot = False
+        self.display_name = f"Jogador {user_id}"
+
+
+class FakeGuild:
+    __slots__ = ("id",)
+
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+
+
+class FakeChannel:
+    __slots__ = ("id", "guild")
+
+    def __init__(self, channel_id: int, guild: FakeGuild):
+        self.id = channel_id
+        self.guild = guild
+
+
+class ReplySink:
+    """Recebe os reply() de todas as mensagens: conta envios e embeds."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.sends = 0
+        self.embeds = 0
+
+    async def deliver(self, kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sends += 1
+        self.embeds += len(kwargs.get("embeds") or ()) or (1 if "embed" in kwargs else 0)
+
+
+class FakeMessage:
+    __slots__ = ("id", "content", "author", "channel", "guild", "jump_url", "sink")
+
+    def __init__(self, message_id: int, content: str, author: FakeUser, channel: FakeChannel, sink: ReplySink):
+        self.id = message_id
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.jump_url = f"https://discord.com/channels/{channel.guild.id}/{channel.id}/{message_id}"
+        self.sink = sink
+
+    async def reply(self, content=None, **kwargs):
+        if content is not None:
+            kwargs["content"] = content
+        await self.sink.deliver(kwargs)
+
+
+# ------------------------------------------------------------
+# Geração do fluxo
+# ------------------------------------------------------------
+def parse_mix(spec: str):
+    mix = {}
+    for part in spec.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in MESSAGES:
+            raise SystemExit(f"tipo desconhecido no --mix: {kind} (use {', '.join(MESSAGES)})")
+        mix[kind] = float(weight)
+    return mix
+
+
+def make_stream(n: int, mix: dict, channels: int, guilds: int, users: int, sink: ReplySink, seed: int):
+    rng = random.Random(seed)
+    guild_objs = [FakeGuild(g) for g in range(1, guilds + 1)]
+    channel_objs = [FakeChannel(1000 + c, guild_objs[c % guilds]) for c in range(channels)]
+    user_objs = [FakeUser(5000 + u) for u in range(users)]
+    kinds = rng.choices(list(mix), weights=list(mix.values()), k=n)
+    return [
+        (kind, FakeMessage(i, rng.choice(MESSAGES[kind]), rng.choice(user_objs), rng.choice(channel_objs), sink))
+        for i, kind in enumerate(kinds)
+    ]
+
+
+# ------------------------------------------------------------
+# Medição
+# ------------------------------------------------------------
+async def watch_loop_lag(interval: float, lags: list, stop: asyncio.Event):
+    """Quanto o event loop atrasa um sleep(interval): mede o quanto ele fica travado."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        t0 = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - t0 - interval)
+
+
+async def handle(kind: str, message: FakeMessage, scheduled: float, latencies: dict, errors: list):
+    try:
+        await bot.on_message(message)
+    except Exception as exc:  # a carga continua; o erro entra no relatório
+        errors.append(f"{kind}: {message.content!r}: {exc!r}")
+        return
+    latencies[kind].append(time.perf_counter() - scheduled)
+
+
+async def run_load(stream, rate: float):
+    latencies = {kind: [] for kind in MESSAGES}
+    errors, lags = [], []
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(watch_loop_lag(0.01, lags, stop))
+
+    tasks = []
+    start = time.perf_counter()
+    for i, (kind, message) in enumerate(stream):
+        scheduled = start + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # Como o discord.py: cada evento vira uma task
+        tasks.append(asyncio.create_task(handle(kind, message, scheduled, latencies, errors)))
+    sent_at = time.perf_counter()
+    await asyncio.gather(*tasks)
+    end = time.perf_counter()
+    stop.set()
+    await watcher
+    return {
+        "latencies": latencies, "errors": errors, "lags": lags,
+        "feed_seconds": sent_at - start, "total_seconds": end - start,
+    }
+
+
+def percentiles(values, points=(50, 90, 99)):
+    if not values:
+        return {}
+    arr = np.asarray(values) * 1000
+    out = {f"p{p}_ms": float(np.percentile(arr, p)) for p in points}
+    out["max_ms"] = float(arr.max())
+    out["mean_ms"] = float(statistics.fmean(arr))
+    return out
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss: KiB no Linux, bytes no macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def build_report(args, mix, raw, sink: ReplySink):
+    lat = raw["latencies"]
+    handled = sum(len(v) for v in lat.values())
+    rolls = sum(len(v) for kind, v in lat.items() if kind != "chat")
+    all_replied = [x for kind, v in lat.items() if kind != "chat" for x in v]
+    return {
+        "config": {
+            "rate": args.rate, "duration": args.duration, "mix": mix, "channels": args.channels,
+            "guilds": args.guilds, "reply_latency_ms": args.reply_latency * 1000, "seed": args.seed,
+        },
+        "messages": handled,
+        "rolls": rolls,
+        "errors": len(raw["errors"]),
+        "discord_sends": sink.sends,
+        "embeds": sink.embeds,
+        "achieved_rate": handled / raw["feed_seconds"] if raw["feed_seconds"] else 0.0,
+        "throughput_msgs_per_s": handled / raw["total_seconds"],
+        "throughput_rolls_per_s": rolls / raw["total_seconds"],
+        "latency": {kind: percentiles(v) for kind, v in lat.items() if v},
+        "latency_rolls": percentiles(all_replied),
+        "loop_lag": percentiles(raw["lags"]),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def print_report(report, errors):
+    cfg = report["config"]
+    print(f"ritmo pedido {cfg['rate']:.0f} msg/s por {cfg['duration']:.0f}s | {cfg['channels']} canais | "
+          f"reply simulado {cfg['reply_latency_ms']:.0f} ms")
+    print(f"mensagens {report['messages']:,} | rolagens {report['rolls']:,} | "
+          f"envios ao Discord {report['discord_sends']:,} ({report['embeds']:,} embeds) | erros {report['errors']}")
+    print(f"ritmo de chegada alcançado: {report['achieved_rate']:,.0f} msg/s")
+    print(f"vazão: {report['throughput_msgs_per_s']:,.0f} msg/s | {report['throughput_rolls_per_s']:,.0f} rolagens/s")
+    print(f"{'latência (ms)':<16}{'p50':>9}{'p90':>9}{'p99':>9}{'máx':>9}")
+    rows = list(report["latency"].items()) + [("rolagens", report["latency_rolls"]), ("atraso loop", report["loop_lag"])]
+    for name, p in rows:
+        if p:
+            print(f"{name:<16}{p['p50_ms']:>9.2f}{p['p90_ms']:>9.2f}{p['p99_ms']:>9.2f}{p['max_ms']:>9.2f}")
+    print(f"pico de RSS: {report['peak_rss_mb']:.1f} MB")
+    for err in errors[:5]:
+        print("erro:", err)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rate", type=float, default=500.0, help="mensagens por segundo")
+    ap.add_argument("--duration", type=float, default=10.0, help="segundos de fluxo")
+    ap.add_argument("--mix", default=DEFAULT_MIX, help=f"pesos por tipo ({', '.join(MESSAGES)})")
+    ap.add_argument("--channels", type=int, default=200)
+    ap.add_argument("--guilds", type=int, default=50)
+    ap.add_argument("--users", type=int, default=500)
+    ap.add_argument("--reply-latency", type=float, default=0.05, help="segundos de cada reply simulado")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--json", help="grava o relatório neste arquivo")
+    args = ap.parse_args(argv)
+
+    random.seed(args.seed)
+    bot.DICE.reseed(args.seed)
+    mix = parse_mix(args.mix)
+    sink = ReplySink(args.reply_latency)
+    stream = make_stream(int(args.rate * args.duration), mix, args.channels, args.guilds, args.users,
+                         sink, args.seed)
+
+    raw = asyncio.run(run_load(stream, args.rate))
+    bot.scheduler.pool.shutdown(wait=False, cancel_futures=True)
+    report = build_report(args, mix, raw, sink)
+    print_report(report, raw["errors"])
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 1 if raw["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,580 +1,2993 @@
-import os
-import random
-import re
-import discord
-
-# ---------- Config ----------
-TOKEN = os.getenv("DISCORD_TOKEN", "COLOQUE_SEU_TOKEN_AQUI")
-
-T_DEFAULT = 4          # Dificuldade padrão
-WILD_DEFAULT = 6       # Selvagem padrão (d6)
-
-INTENTS = discord.Intents.default()
-INTENTS.message_content = True
-client = discord.Client(intents=INTENTS)
-
-# ------------------------------------------------------------
-# Padrões de comandos
-# ------------------------------------------------------------
-# Testes com selvagem (grupo e individuais):
-CMD_PATTERN_GROUP = re.compile(
-    r"^\s*(\d*)\s*s(4|6|8|10|12)"
-    r"(?:\s*([+-]\s*\d+))?"
-    r"(?:\s*t\s*(\d+))?\s*$",
-    re.IGNORECASE
-)
-
-CMD_PATTERN_INDIV = re.compile(
-    r"^\s*(\d+)\s*#\s*s(4|6|8|10|12)"
-    r"(?:\s*([+-]\s*\d+))?"
-    r"(?:\s*t\s*(\d+))?\s*$",
-    re.IGNORECASE
-)
-
-# Dano (SEM selvagem) — suporta até DOIS termos (XdY [+ WdZ]) e T<dif>
-# Grupo:      XdY [+ WdZ] [±mod] [T<dif>]
-DMG_PATTERN_GROUP = re.compile(
-    r"^\s*(\d*)\s*d(4|6|8|10|12|20)"
-    r"(?:\s*\+\s*(\d*)\s*d(4|6|8|10|12|20))?"
-    r"(?:\s*([+-]\s*\d+))?"
-    r"(?:\s*t\s*(\d+))?\s*$",
-    re.IGNORECASE
-)
-# Individuais: M#XdY [+ WdZ] [±mod] [T<dif>]
-DMG_PATTERN_INDIV = re.compile(
-    r"^\s*(\d+)\s*#\s*(\d*)\s*d(4|6|8|10|12|20)"
-    r"(?:\s*\+\s*(\d*)\s*d(4|6|8|10|12|20))?"
-    r"(?:\s*([+-]\s*\d+))?"
-    r"(?:\s*t\s*(\d+))?\s*$",
-    re.IGNORECASE
-)
-
-# DS em qualquer posição (troca o dado selvagem SÓ nessa jogada):
-DS_PATTERN = re.compile(r"\bds\s*(6|8|10|12)\b", re.IGNORECASE)
-
-MAX_COUNT = 20
-
-# ------------------------------------------------------------
-# Utilidades de rolagem
-# ------------------------------------------------------------
-def roll_ace(die_size: int):
-    total = 0
-    rolls = []
-    while True:
-        r = random.randint(1, die_size)
-        rolls.append(r)
-        total += r
-        if r == die_size:  # explode
-            continue
-        break
-    return total, rolls
-
-def fmt_rolls(rolls, die_size):
-    def fmt(r):
-        return f"**{r}**" if r == die_size else str(r)
-    return "[" + ", ".join(fmt(r) for r in rolls) + "]"
-
-def parse_mod(s):
-    if not s:
-        return 0
-    s = s.replace(" ", "")
-    return int(s)
-
-def assess(final_val: int, diff_value: int):
-    """('fail'|'success'|'raises', raises_int)"""
-    if final_val < diff_value:
-        return "fail", 0
-    raises = (final_val - diff_value) // 4
-    if raises >= 1:
-        return "raises", raises
-    return "success", 0
-
-def score(final_val: int, diff_value: int) -> int:
-    """0=falha; 1=sucesso; 1+N=sucesso com N ampliações."""
-    status, raises = assess(final_val, diff_value)
-    if status == "fail":
-        return 0
-    return 1 + raises
-
-def color_for(final_val: int, diff_value: int):
-    status, _ = assess(final_val, diff_value)
-    if status == "fail":
-        return 0xE24C4B  # red
-    if status == "raises":
-        return 0xF1C40F  # gold
-    return 0x2ECC71      # green
-
-# Emotes por teste para títulos (modo s…)
-def title_emote_token(final_val: int, T_value: int, is_crit: bool = False) -> str:
-    if is_crit:
-        return "💀"
-    status, raises = assess(final_val, T_value)
-    if status == "fail":
-        return "❌"
-    return "✅" + (f" 🏅x{raises}" if raises > 0 else "")
-
-# Emote para títulos de DANO (não existe falha crítica em dano)
-def title_emote_damage(final_val: int, T_value: int) -> str:
-    status, raises = assess(final_val, T_value)
-    if status == "fail":
-        return "❌"
-    return "✅" + (f" 🏅x{raises}" if raises > 0 else "")
-
-# ------------------------------------------------------------
-# Lógica especial do grupo NsX: aplicar UM selvagem ao melhor slot
-# ------------------------------------------------------------
-def apply_wild_to_best_slot(trait_finals, wild_final, T_value, first_trait_vals, wild_first):
-    """
-    Decide em qual teste aplicar o Selvagem para maximizar o resultado:
-    - Prioriza transformar falha em sucesso; depois, aumentar ampliação.
-    - Se não melhora nada, não aplica.
-    Retorna: (eff_finals, used_idx, crit_idx)
-    """
-    n = len(trait_finals)
-    base_scores = [score(v, T_value) for v in trait_finals]
-    alt_scores  = [score(max(v, wild_final), T_value) for v in trait_finals]
-    improvements = [alt_scores[i] - base_scores[i] for i in range(n)]
-
-    used_idx = None
-    if max(improvements) > 0:
-        best_imp = max(improvements)
-        candidates = [i for i, imp in enumerate(improvements) if imp == best_imp]
-        used_idx = min(candidates, key=lambda i: base_scores[i])  # arruma falha primeiro
-
-    eff_finals = [max(v, wild_final) if i == used_idx else v for i, v in enumerate(trait_finals)]
-
-    crit_idx = None
-    if used_idx is not None and first_trait_vals[used_idx] == 1 and wild_first == 1:
-        crit_idx = used_idx
-
-    return eff_finals, used_idx, crit_idx
-
-# ------------------------------------------------------------
-# Embeds — Testes com Selvagem
-# ------------------------------------------------------------
-def build_group_embed(
-    count: int, die: int, mod_all: int, T_value: int, wild_size: int,
-    wild_total: int, wild_rolls, wild_final: int,
-    trait_results: list
-):
-    # Finais crus dos traços e primeiros (p/ crítica)
-    trait_finals = [t["final"] for t in trait_results]
-    first_trait_vals = [t["rolls"][0] for t in trait_results]
-    wild_first = wild_rolls[0]
-
-    # Aplica Selvagem em UM slot (se melhorar)
-    eff_finals, used_idx, crit_idx = apply_wild_to_best_slot(
-        trait_finals, wild_final, T_value, first_trait_vals, wild_first
-    )
-
-    # Título: tokens por teste separados por |
-    tokens = [title_emote_token(val, T_value, (i == crit_idx)) for i, val in enumerate(eff_finals)]
-    title = " | ".join(tokens)
-    if len(title) > 250:  # segurança
-        title = title[:247] + "…"
-
-    # Melhor efetivo para cor/resultado
-    best_value = max(eff_finals) if eff_finals else wild_final
-
-    # Descrição
-    desc_parts = [f"Dif={T_value}"]
-    if mod_all:
-        desc_parts.append(f"mod {mod_all:+d}")
-    if wild_size != WILD_DEFAULT:
-        desc_parts.append(f"selv=d{wild_size}")
-    description = " | ".join(desc_parts)
-
-    embed = discord.Embed(title=title, description=description, color=color_for(best_value, T_value))
-
-    # Selvagem
-    embed.add_field(
-        name=f"d{wild_size} (Selvagem)",
-        value=f"{fmt_rolls(wild_rolls, wild_size)}\nTotal: **{wild_total}** ⇒ **{wild_final}**",
-        inline=False
-    )
-
-    # Traços (sem a palavra "Traços")
-    if count == 1:
-        t = trait_results[0]
-        crit = " • ⚠️ Falha Crítica" if (crit_idx == 0) else ""
-        embed.add_field(
-            name=f"d{die}",
-            value=f"{fmt_rolls(t['rolls'], die)}\nTotal: **{t['total']}** ⇒ **{t['final']}**{crit}",
-            inline=False
-        )
-    else:
-        lines = [f"#{t['idx']}: {fmt_rolls(t['rolls'], die)} ⇒ **{t['final']}**" for t in trait_results]
-        chunk = ""
-        block_idx = 1
-        for line in lines:
-            if len(chunk) + len(line) + 1 > 1000:
-                embed.add_field(name=f"d{die} (parte {block_idx})", value=chunk, inline=False)
-                block_idx += 1
-                chunk = ""
-            chunk += (line + "\n")
-        if chunk:
-            embed.add_field(name=f"d{die}{' (parte ' + str(block_idx) + ')' if block_idx>1 else ''}", value=chunk, inline=False)
-
-    # Resultado: Final & Ampliações
-    _, raises = assess(best_value, T_value)
-    embed.add_field(name="Resultado", value=f"Final: **{best_value}**  |  Ampliações: **{raises}**", inline=False)
-
-    if used_idx is not None and count > 1:
-        embed.set_footer(text=f"Selvagem aplicado ao teste #{used_idx + 1}")
-
-    return embed
-
-def build_individuals_embed(count: int, die: int, mod_all: int, T_value: int, wild_size: int, tests: list):
-    # Título: tokens por teste (um por teste), separados por |
-    tokens = [title_emote_token(t["best_value"], T_value, t["crit"]) for t in tests]
-    title = " | ".join(tokens)
-    if len(title) > 250:
-        title = title[:247] + "…"
-
-    ref = tests[0]["best_value"] if tests else 0
-    desc = f"Dif={T_value}"
-    if mod_all:
-        desc += f" | mod {mod_all:+d}"
-    if wild_size != WILD_DEFAULT:
-        desc += f" | selv=d{wild_size}"
-
-    embed = discord.Embed(title=title, description=desc, color=color_for(ref, T_value))
-
-    if count > 10:
-        lines = []
-        for i, t in enumerate(tests, start=1):
-            _, raises = assess(t["best_value"], T_value)
-            crit = " ⚠️" if t["crit"] else ""
-            lines.append(
-                f"#{i}: d{die} {fmt_rolls(t['trait_rolls'], die)} ⇒ **{t['trait_final']}** | "
-                f"Selv {fmt_rolls(t['wild_rolls'], wild_size)} ⇒ **{t['wild_final']}** | "
-                f"Final: **{t['best_value']}**  |  Ampliações: **{raises}**{crit}"
-            )
-        chunk = ""
-        block_idx = 1
-        for line in lines:
-            if len(chunk) + len(line) + 1 > 1000:
-                embed.add_field(name=f"Testes (parte {block_idx})", value=chunk, inline=False)
-                block_idx += 1
-                chunk = ""
-            chunk += (line + "\n")
-        if chunk:
-            embed.add_field(name=f"Testes{'' if block_idx==1 else f' (parte {block_idx})'}", value=chunk, inline=False)
-    else:
-        for i, t in enumerate(tests, start=1):
-            _, raises = assess(t["best_value"], T_value)
-            crit = " • ⚠️ Falha Crítica" if t["crit"] else ""
-            embed.add_field(
-                name=f"Teste #{i}",
-                value=(
-                    f"• Resultado: Final **{t['best_value']}**  |  Ampliações: **{raises}**{crit}\n"
-                    f"• d{die}: {fmt_rolls(t['trait_rolls'], die)} ⇒ **{t['trait_final']}**\n"
-                    f"• d{wild_size} (Selvagem): {fmt_rolls(t['wild_rolls'], wild_size)} ⇒ **{t['wild_final']}**"
-                ),
-                inline=False
-            )
-
-    successes = sum(1 for t in tests if t["best_value"] >= T_value)
-    total_raises = sum((t["best_value"] - T_value)//4 for t in tests if t["best_value"] >= T_value)
-    embed.add_field(name="Resumo", value=f"{successes}/{count} sucesso(s) | ampliações totais: {total_raises}", inline=False)
-    return embed
-
-# ------------------------------------------------------------
-# DANO (SEM selvagem) — com Dif/T, ampliações e até 2 termos (XdY + WdZ)
-# ------------------------------------------------------------
-def roll_damage_once(dice1_count: int, die1: int, dice2_count: int = 0, die2: int | None = None):
-    """
-    Rola até dois termos de dano:
-      - Termo 1: dice1_count d die1
-      - Termo 2 (opcional): dice2_count d die2
-    Retorna:
-      raw_sum,  # soma dos totais dos dados (sem mod)
-      per_term  # lista de termos, cada um: {'die': die, 'totals': [..por dado..], 'rolls': [..por dado..]}
-    """
-    per_term = []
-    # Termo 1
-    t_totals_1, t_rolls_1 = [], []
-    for _ in range(dice1_count or 1):
-        t, rolls = roll_ace(die1)
-        t_totals_1.append(t)
-        t_rolls_1.append(rolls)
-    per_term.append({"die": die1, "totals": t_totals_1, "rolls": t_rolls_1})
-
-    # Termo 2 (se houver)
-    if dice2_count and die2:
-        t_totals_2, t_rolls_2 = [], []
-        for _ in range(dice2_count):
-            t, rolls = roll_ace(die2)
-            t_totals_2.append(t)
-            t_rolls_2.append(rolls)
-        per_term.append({"die": die2, "totals": t_totals_2, "rolls": t_rolls_2})
-
-    raw_sum = sum(sum(term["totals"]) for term in per_term)
-    return raw_sum, per_term
-
-def build_damage_group_embed(d1_count: int, d1: int, mod_all: int, T_value: int,
-                             d2_count: int = 0, d2: int | None = None):
-    raw_sum, per_term = roll_damage_once(d1_count or 1, d1, d2_count or 0, d2)
-    final = raw_sum + mod_all
-
-    # Título com EMOTE de dano + número
-    title = f"{title_emote_damage(final, T_value)} · {final}"
-
-    # Descrição: Dif, expressão e mod
-    description = " | ".join(
-        part for part in [
-            f"Dif={T_value}",
-            "Expr=" + (f"{d1_count or 1}d{d1}" + (f" + {d2_count}d{d2}" if d2_count and d2 else "")),
-            f"mod {mod_all:+d}" if mod_all else None
-        ] if part
-    )
-
-    embed = discord.Embed(title=title, description=description, color=color_for(final, T_value))
-
-    # Mostrar termos (sem label 'Rolagens')
-    for term in per_term:
-        die = term["die"]
-        lines = []
-        for i, (tot, rolls) in enumerate(zip(term["totals"], term["rolls"]), start=1):
-            lines.append(f"#{i}: {fmt_rolls(rolls, die)} ⇒ **{tot}**")
-        embed.add_field(name=f"d{die}", value="\n".join(lines), inline=False)
-
-    # Total (soma e final)
-    embed.add_field(name="Total", value=f"Soma: **{raw_sum}** ⇒ Final: **{final}**", inline=False)
-
-    # Resultado (ampliações)
-    _, raises = assess(final, T_value)
-    embed.add_field(name="Resultado", value=f"Final: **{final}**  |  Ampliações: **{raises}**", inline=False)
-    return embed
-
-def build_damage_individuals_embed(instances: int, d1_count: int, d1: int, mod_all: int, T_value: int,
-                                   d2_count: int = 0, d2: int | None = None):
-    instances = max(1, instances)
-    d1_count = d1_count or 1
-
-    results = []
-    for _ in range(instances):
-        raw_sum, per_term = roll_damage_once(d1_count, d1, d2_count or 0, d2)
-        final = raw_sum + mod_all
-        results.append({"raw_sum": raw_sum, "final": final, "per_term": per_term})
-
-    # Título: tokens por instância (emote + número), separados por |
-    tokens = [f"{title_emote_damage(r['final'], T_value)} · {r['final']}" for r in results]
-    title = " | ".join(tokens)
-    if len(title) > 250:
-        title = title[:247] + "…"
-
-    # Descrição
-    expr = f"{d1_count}d{d1}" + (f" + {d2_count}d{d2}" if d2_count and d2 else "")
-    desc = f"Dif={T_value} | Expr={expr}" + (f" | mod {mod_all:+d}" if mod_all else "")
-    # cor baseada no primeiro (apenas estética)
-    embed = discord.Embed(title=title, description=desc, color=color_for(results[0]['final'], T_value))
-
-    if instances > 10:
-        lines = []
-        for i, r in enumerate(results, start=1):
-            _, raises = assess(r["final"], T_value)
-            lines.append(f"#{i}: Soma **{r['raw_sum']}** ⇒ Final **{r['final']}** | Ampliações: **{raises}**")
-        chunk = ""
-        block_idx = 1
-        for line in lines:
-            if len(chunk) + len(line) + 1 > 1000:
-                embed.add_field(name=f"Danos (parte {block_idx})", value=chunk, inline=False)
-                block_idx += 1
-                chunk = ""
-            chunk += (line + "\n")
-        if chunk:
-            embed.add_field(name=f"Danos{'' if block_idx==1 else f' (parte {block_idx})'}", value=chunk, inline=False)
-    else:
-        # Um field por instância
-        for i, r in enumerate(results, start=1):
-            lines = [f"• #{i}"]
-            for j, term in enumerate(r["per_term"], start=1):
-                die = term["die"]
-                for k, (tot, rolls) in enumerate(zip(term["totals"], term["rolls"]), start=1):
-                    lines.append(f"  - d{die} #{k}: {fmt_rolls(rolls, die)} ⇒ **{tot}**")
-            _, raises = assess(r["final"], T_value)
-            lines.append(f"  - Soma: **{r['raw_sum']}** ⇒ Final: **{r['final']}**  |  Ampliações: **{raises}**")
-            embed.add_field(name=f"Dano #{i}", value="\n".join(lines), inline=False)
-
-    return embed
-
-# ------------------------------------------------------------
-# HELP
-# ------------------------------------------------------------
-def build_help_embed():
-    e = discord.Embed(
-        title="Comandos Disponíveis",
-        description="Sintaxe resumida (maiúsculas/minúsculas tanto faz).",
-        color=0x3498DB
-    )
-    e.add_field(
-        name="Testes com Selvagem (modelo SWADE)",
-        value=(
-            "**Grupo (um selvagem p/ o conjunto):**\n"
-            "`[N]s<lado> [±mod] [T<dif>] [DS<6|8|10|12>]`\n"
-            "• Ex.: `s8`, `3s6 +2`, `2s10 T6`, `4s8 DS10`\n"
-            "• Título mostra um token por teste (✅/❌/💀 e 🏅xN)\n"
-            "• `DS` troca o dado selvagem só nesta jogada\n\n"
-            "**Individuais (#):**\n"
-            "`N#s<lado> [±mod] [T<dif>] [DS<6|8|10|12>]`\n"
-            "• Ex.: `3#s10`, `5#s6 +1 T6 DS8`\n"
-            "• Cada teste tem seu próprio selvagem"
-        ),
-        inline=False
-    )
-    e.add_field(
-        name="Dano / Extras (SEM selvagem) — com Dif e 2 termos",
-        value=(
-            "**Uma rolagem:**\n"
-            "`XdY [ + WdZ ] [±mod] [T<dif>]`\n"
-            "• Ex.: `2d6 +1`, `d10 T6`, `2d6 + d8`, `3d8 + 2d6 -2 T5`\n"
-            "_Obs.: o modificador aplica **uma vez no total**._\n\n"
-            "**Várias rolagens:**\n"
-            "`M#XdY [ + WdZ ] [±mod] [T<dif>]`\n"
-            "• Ex.: `4#2d6 +1`, `3#(2d6 + d8) -2 T6`, `5#d12 T4`\n"
-            "**Títulos de dano mostram emote e número** (ex.: `✅ 🏅x2 · 17`)."
-        ),
-        inline=False
-    )
-    e.add_field(
-        name="Dicas",
-        value=(
-            "• `Dif` padrão é **4**; mude com `T<valor>`.\n"
-            "• `DS<8|10|12>` muda o dado selvagem só na jogada (ignorado em dano).\n"
-            "• Explosões aparecem **em negrito** dentro dos colchetes."
-        ),
-        inline=False
-    )
-    return e
-
-# ------------------------------------------------------------
-# BOT
-# ------------------------------------------------------------
-@client.event
-async def on_ready():
-    print(f"Logado como {client.user} (id: {client.user.id})")
-    print("Uso rápido:")
-    print("  • Teste grupo: [N]s<lado> [±mod] [T<dif>] [DS<6|8|10|12>]")
-    print("  • Teste individuais: N#s<lado> [±mod] [T<dif>] [DS<6|8|10|12>]")
-    print("  • Dano: XdY [+ WdZ] [±mod] [T<dif>]   |   M#XdY [+ WdZ] [±mod] [T<dif>]")
-    print("  • !help para ver tudo")
-
-@client.event
-async def on_message(message: discord.Message):
-    if message.author.bot:
-        return
-
-    # Help
-    if message.content.strip().lower().startswith("!help"):
-        await message.reply(embed=build_help_embed())
-        return
-
-    # Captura DS e remove do texto base (ignorado em dano)
-    ds_match = DS_PATTERN.search(message.content)
-    wild_size = int(ds_match.group(1)) if ds_match else WILD_DEFAULT
-    content_base = DS_PATTERN.sub("", message.content).strip()
-
-    # ---------------------------
-    # DANO (SEM selvagem) — primeiro, para não conflitar com 's'
-    # ---------------------------
-    # Individuais de dano: M#XdY [+ WdZ] [±mod] [T<dif>]
-    m_dmg_ind = DMG_PATTERN_INDIV.match(content_base)
-    if m_dmg_ind:
-        inst_str, d1c_str, d1_str, d2c_str, d2_str, mod_str, t_str = m_dmg_ind.groups()
-        instances = int(inst_str)
-        d1_count = int(d1c_str) if d1c_str else 1
-        d1 = int(d1_str)
-        d2_count = int(d2c_str) if d2c_str else 0
-        d2 = int(d2_str) if d2_str else None
-        if instances < 1 or instances > MAX_COUNT:
-            await message.reply(f"❌ Quantidade inválida. Use 1 a {MAX_COUNT}.")
-            return
-        mod_all = parse_mod(mod_str)
-        T_value = int(t_str) if t_str else T_DEFAULT
-        embed = build_damage_individuals_embed(instances, d1_count, d1, mod_all, T_value, d2_count, d2)
-        await message.reply(embed=embed)
-        return
-
-    # Dano simples: XdY [+ WdZ] [±mod] [T<dif>]
-    m_dmg_grp = DMG_PATTERN_GROUP.match(content_base)
-    if m_dmg_grp:
-        d1c_str, d1_str, d2c_str, d2_str, mod_str, t_str = m_dmg_grp.groups()
-        d1_count = int(d1c_str) if d1c_str else 1
-        d1 = int(d1_str)
-        d2_count = int(d2c_str) if d2c_str else 0
-        d2 = int(d2_str) if d2_str else None
-        mod_all = parse_mod(mod_str)
-        T_value = int(t_str) if t_str else T_DEFAULT
-        embed = build_damage_group_embed(d1_count, d1, mod_all, T_value, d2_count, d2)
-        await message.reply(embed=embed)
-        return
-
-    # ---------------------------
-    # TESTES COM SELVAGEM (existentes)
-    # ---------------------------
-    # Individuais (#): N#sX [±mod] [T] [DS]
-    m_ind = CMD_PATTERN_INDIV.match(content_base)
-    if m_ind:
-        count_str, die_str, mod_str, t_str = m_ind.groups()
-        count = int(count_str)
-        die = int(die_str)
-        if count < 1 or count > MAX_COUNT:
-            await message.reply(f"❌ Quantidade inválida. Use 1 a {MAX_COUNT}.")
-            return
-        mod_all = parse_mod(mod_str)
-        T_value = int(t_str) if t_str else T_DEFAULT
-
-        tests = []
-        for _ in range(count):
-            trait_total, trait_rolls = roll_ace(die)
-            wild_total,  wild_rolls  = roll_ace(wild_size)
-            trait_final = trait_total + mod_all
-            wild_final  = wild_total  + mod_all
-            is_crit = (trait_rolls[0] == 1 and wild_rolls[0] == 1)
-            if trait_final >= wild_final:
-                best_name, best_value = f"d{die}", trait_final
-            else:
-                best_name, best_value = f"Curinga d{wild_size}", wild_final
-            tests.append({
-                "trait_total": trait_total, "trait_rolls": trait_rolls, "trait_final": trait_final,
-                "wild_total": wild_total,   "wild_rolls":  wild_rolls,  "wild_final":  wild_final,
-                "best_name": best_name, "best_value": best_value, "crit": is_crit
-            })
-
-        embed = build_individuals_embed(count, die, mod_all, T_value, wild_size, tests)
-        await message.reply(embed=embed)
-        return
-
-    # Grupo: [N]sX [±mod] [T] [DS]
-    m_grp = CMD_PATTERN_GROUP.match(content_base)
-    if not m_grp:
-        return
-
-    count_str, die_str, mod_str, t_str = m_grp.groups()
-    count = int(count_str) if count_str else 1
-    die = int(die_str)
-    if count < 1 or count > MAX_COUNT:
-        await message.reply(f"❌ Quantidade inválida. Use 1 a {MAX_COUNT}.")
-        return
-    mod_all = parse_mod(mod_str)
-    T_value = int(t_str) if t_str else T_DEFAULT
-
-    wild_total, wild_rolls = roll_ace(wild_size)
-    wild_final = wild_total + mod_all
-
-    trait_results = []
-    for i in range(count):
-        t_total, t_rolls = roll_ace(die)
-        t_final = t_total + mod_all
-        trait_results.append({"idx": i + 1, "total": t_total, "rolls": t_rolls, "final": t_final})
-
-    embed = build_group_embed(count, die, mod_all, T_value, wild_size,
-                              wild_total, wild_rolls, wild_final, trait_results)
-    await message.reply(embed=embed)
-
-# ------------------------------------------------------------
-if __name__ == "__main__":
-    if not TOKEN or TOKEN == "COLOQUE_SEU_TOKEN_AQUI":
-        raise SystemExit("Defina a variável de ambiente DISCORD_TOKEN com o token do bot.")
-    client.run(TOKEN)
+import asyncio
+import contextlib
+import inspect
+import logging
+import math
+import os
+import re
+import signal
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from functools import lru_cache, partial
+
+import discord
+import numpy as np
+import yarl
+from discord import app_commands
+
+import profiler
+from action_deck import DECK_SIZE, NO_CARD, DeckStore, card_name, is_joker
+from channel_config import ChannelConfig, ConfigStore
+from dice_rng import ThreadDice, make_dice, new_seed
+from metrics import Metrics
+from roll_log import RollLog
+from roll_stats import RollStats, describe as describe_stats
+
+# ---------- Config ----------
+TOKEN = os.getenv("DISCORD_TOKEN", "COLOQUE_SEU_TOKEN_AQUI")
+
+T_DEFAULT = 4          # Dificuldade padrão
+WILD_DEFAULT = 6       # Selvagem padrão (d6)
+
+# Sorteio (ver dice_rng.py): backend "numpy" (PCG64) ou "python" (random.Random),
+# com RNG_BUFFER faces pré-sorteadas por lado de dado.
+RNG_BACKEND = os.getenv("RNG_BACKEND", "numpy")
+RNG_BUFFER = int(os.getenv("RNG_BUFFER", "4096"))
+# ROLL_SEEDS=1: cada rolagem usa uma semente própria, mostrada no rodapé;
+# `!replay <semente> <rolagem>` repete exatamente os mesmos dados.
+ROLL_SEEDS = os.getenv("ROLL_SEEDS", "0") == "1"
+
+# Comandos de texto (`s8`, `!odds` ...) exigem receber o conteúdo de toda
+# mensagem (intent privilegiada). Com TEXT_COMMANDS=0 o bot só atende os
+# slash commands e o gateway nem manda as mensagens.
+TEXT_COMMANDS = os.getenv("TEXT_COMMANDS", "1") != "0"
+# Registra os slash commands no Discord ao iniciar: "global", ou o id de um
+# servidor (aparece na hora, bom para testes). Vazio: não registra.
+SLASH_SYNC = os.getenv("SLASH_SYNC", "")
+
+INTENTS = discord.Intents.default()
+INTENTS.messages = TEXT_COMMANDS
+INTENTS.message_content = TEXT_COMMANDS
+
+# Shards (ver shard_launcher.py): sem SHARD_COUNT roda um discord.Client comum.
+#   SHARD_COUNT=auto   -> AutoShardedClient, o Discord escolhe quantos
+#   SHARD_COUNT=8      -> total de shards do bot
+#   SHARD_IDS=0-3,6    -> shards deste processo (padrão: todos)
+SHARD_COUNT = os.getenv("SHARD_COUNT", "")
+SHARD_IDS = os.getenv("SHARD_IDS", "")
+SHARD_CONNECT_DELAY = float(os.getenv("SHARD_CONNECT_DELAY", "5"))   # entre IDENTIFYs
+# Horário (epoch) do primeiro IDENTIFY do cluster; o shard N identifica em
+# SHARD_IDENTIFY_START + N * SHARD_CONNECT_DELAY. O launcher define.
+SHARD_IDENTIFY_START = float(os.getenv("SHARD_IDENTIFY_START", "0"))
+HEALTH_LOG_INTERVAL = float(os.getenv("HEALTH_LOG_INTERVAL", "60"))
+
+# Endereços alternativos da API/gateway (ex.: fake_gateway.py, para testar sem rede)
+DISCORD_API_BASE = os.getenv("DISCORD_API_BASE", "")
+DISCORD_GATEWAY_URL = os.getenv("DISCORD_GATEWAY_URL", "")
+if DISCORD_API_BASE:
+    discord.http.Route.BASE = DISCORD_API_BASE.rstrip("/")
+if DISCORD_GATEWAY_URL:
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(DISCORD_GATEWAY_URL)
+
+log = logging.getLogger("swade")
+
+# Métricas (ver metrics.py): com METRICS_PORT, GET http://METRICS_HOST:PORT/metrics.
+# Sem ele, metrics = None e cada ponto de medição é só um `if metrics:`.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+metrics = Metrics() if METRICS_PORT else None
+
+# Histórico (ver roll_log.py): com ROLL_LOG_PATH, toda rolagem vai para esse
+# SQLite, gravada em lotes por uma thread. Fila cheia descarta (e conta).
+ROLL_LOG_PATH = os.getenv("ROLL_LOG_PATH", "")
+ROLL_LOG_QUEUE = int(os.getenv("ROLL_LOG_QUEUE", "10000"))
+history = RollLog(ROLL_LOG_PATH, ROLL_LOG_QUEUE) if ROLL_LOG_PATH else None
+
+# Estatísticas do !stats (ver roll_stats.py): sempre em memória; com STATS_PATH,
+# gravadas a cada STATS_SNAPSHOT_INTERVAL s e lidas de volta quando pedidas.
+# Entradas sem rolagem há STATS_IDLE_SECONDS saem da memória.
+STATS_PATH = os.getenv("STATS_PATH", "")
+STATS_SNAPSHOT_INTERVAL = float(os.getenv("STATS_SNAPSHOT_INTERVAL", "300"))
+STATS_IDLE_SECONDS = float(os.getenv("STATS_IDLE_SECONDS", "3600"))
+stats = RollStats(STATS_PATH, STATS_IDLE_SECONDS)
+
+# Baralhos de ação do !init (ver action_deck.py): um por canal, em memória;
+# com INIT_PATH, gravados a cada INIT_SNAPSHOT_INTERVAL s e lidos de volta
+# depois de um restart. Baralhos sem uso há INIT_IDLE_SECONDS saem da memória.
+INIT_PATH = os.getenv("INIT_PATH", "")
+INIT_SNAPSHOT_INTERVAL = float(os.getenv("INIT_SNAPSHOT_INTERVAL", "60"))
+INIT_IDLE_SECONDS = float(os.getenv("INIT_IDLE_SECONDS", "14400"))
+decks = DeckStore(INIT_PATH, INIT_IDLE_SECONDS)
+
+# Administradores do bot (ids separados por vírgula): podem usar !profile
+ADMIN_USER_IDS = frozenset(int(x) for x in os.getenv("ADMIN_USER_IDS", "").replace(",", " ").split())
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+def parse_shard_ids(spec: str):
+    """Ex.: "0-3,6" -> [0, 1, 2, 3, 6]"""
+    ids = []
+    for part in spec.split(","):
+        first, _, last = part.strip().partition("-")
+        ids.extend(range(int(first), int(last or first) + 1))
+    return ids
+
+def make_client():
+    if not SHARD_COUNT:
+        return discord.Client(intents=INTENTS)
+    shard_count = None if SHARD_COUNT == "auto" else int(SHARD_COUNT)
+    shard_ids = parse_shard_ids(SHARD_IDS) if SHARD_IDS and shard_count else None
+    return discord.AutoShardedClient(intents=INTENTS, shard_count=shard_count, shard_ids=shard_ids)
+
+client = make_client()
+tree = app_commands.CommandTree(client)
+
+_identified_shards = set()
+
+async def staggered_identify(shard_id, *, initial: bool = False):
+    """
+    Espaça os IDENTIFYs. No cluster do launcher, o primeiro IDENTIFY de cada
+    shard espera o seu horário fixo (vale entre processos); depois disso, ou
+    fora do launcher, espera SHARD_CONNECT_DELAY como o discord.py faria.
+    """
+    if SHARD_IDENTIFY_START and shard_id is not None and shard_id not in _identified_shards:
+        _identified_shards.add(shard_id)
+        await asyncio.sleep(max(0.0, SHARD_IDENTIFY_START + shard_id * SHARD_CONNECT_DELAY - time.time()))
+    elif not initial:
+        await asyncio.sleep(SHARD_CONNECT_DELAY)
+
+client.before_identify_hook = staggered_identify
+
+# ------------------------------------------------------------
+# Parser de comandos
+# ------------------------------------------------------------
+# A maioria das mensagens é conversa. Antes de qualquer parsing, uma única
+# classe de caracteres descarta tudo que tenha algo fora do alfabeto dos
+# comandos (dígitos, espaço, s/d/t/k/h, +, -, #, ;, parênteses e, no dano
+# em área, v/x e vírgula).
+NON_COMMAND_CHAR = re.compile(r"[^0-9sdtkhvxSDTKHVX#+\-;(),\s]")
+MAX_COMMAND_LEN = 64
+MAX_MESSAGE_LEN = 400
+MAX_COMMANDS_PER_MESSAGE = 10   # uma resposta leva no máximo 10 embeds
+MAX_DAMAGE_TERMS = 8            # termos de dados numa expressão de dano
+MAX_TERM_DICE = 1000            # dados num termo (`1000d6`)
+MAX_DAMAGE_DICE = 2000          # dados somando todos os termos da expressão
+MAX_AREA_GROUPS = 32            # itens na lista de resistências do dano em área
+COMMAND_CACHE_SIZE = 4096       # expressões compiladas guardadas (LRU)
+
+# Várias rolagens numa mensagem: separadas por ";" ou quebra de linha
+COMMAND_SEPARATOR = re.compile(r"[;\n]")
+
+# Alvo do dano em área: resistência, com `x<quantos>` opcional (`8x30`)
+AREA_TARGET = re.compile(r"\s*(\d+)\s*(?:x\s*(\d+))?\s*")
+
+# Tokens (texto já em minúsculas): número | DS<n> | s<n>/d<n> | k<n>/kh<n> (manter
+# os maiores) | símbolo | qualquer outra coisa (erro)
+TOKEN_PATTERN = re.compile(r"(\d+)|(?<!\w)ds\s*(\d+)\b|([sd])(\d+)|kh?(\d+)|([t#+()-])|(\S)")
+
+TRAIT_DIES = frozenset((4, 6, 8, 10, 12))
+DAMAGE_DIES = frozenset((4, 6, 8, 10, 12, 20))
+WILD_DIES = frozenset((6, 8, 10, 12))
+
+@dataclass(frozen=True, slots=True)
+class TraitCommand:
+    """Teste com selvagem: grupo (`3s8`) ou individuais (`3#s8`)."""
+    count: int
+    die: int
+    mod: int
+    target: int
+    wild: int
+    individual: bool
+
+@dataclass(frozen=True, slots=True)
+class DiceTerm:
+    """Termo de dano: `count`d`die` somado (sign=1) ou subtraído (-1); com keep, só os maiores (`4d6k3`)."""
+    count: int
+    die: int
+    sign: int = 1
+    keep: int = 0
+
+    @property
+    def kept(self) -> int:
+        return self.keep or self.count
+
+@dataclass(frozen=True, slots=True)
+class DamageCommand:
+    """Dano sem selvagem: `2d6 + d8 - d4`, `4d6k3` ou `4#(2d6 + d8)`. `terms` = (DiceTerm, ...)."""
+    instances: int
+    terms: tuple
+    mod: int
+    target: int
+    individual: bool
+
+@dataclass(frozen=True, slots=True)
+class AreaDamageCommand:
+    """
+    Dano em área contra várias Resistências: `3d6+2 vs 5,6,6,8x30` (uma
+    rolagem para todos) ou `#3d6+2 vs ...` (uma rolagem por alvo).
+    """
+    terms: tuple
+    mod: int
+    targets: tuple        # ((resistência, quantos alvos), ...) na ordem digitada
+    individual: bool
+
+    @property
+    def count(self) -> int:
+        return sum(n for _, n in self.targets)
+
+@lru_cache(maxsize=COMMAND_CACHE_SIZE)
+def tokenize(text: str):
+    """Tupla de tokens (tipo, valor) ou None se sobrar lixo no texto."""
+    tokens = []
+    for num, ds, die_kind, die, keep, sym, junk in TOKEN_PATTERN.findall(text.lower()):
+        if junk:
+            return None
+        if num:
+            tokens.append(("num", int(num)))
+        elif ds:
+            tokens.append(("ds", int(ds)))
+        elif die_kind:
+            tokens.append((die_kind, int(die)))
+        elif keep:
+            tokens.append(("k", int(keep)))
+        else:
+            tokens.append((sym, None))
+    return tuple(tokens)
+
+def normalize_command(text: str) -> str:
+    """Forma canônica do texto de uma rolagem: chave do cache de comandos."""
+    return " ".join(text.lower().split())
+
+def parse_command(text: str, target: int = T_DEFAULT, wild: int = WILD_DEFAULT):
+    """
+    Converte o texto de uma rolagem em TraitCommand/DamageCommand/AreaDamageCommand.
+    `target`/`wild` valem quando o texto não traz T/DS.
+    Retorna None para qualquer coisa que não seja rolagem.
+    """
+    if len(text) > MAX_COMMAND_LEN or NON_COMMAND_CHAR.search(text):
+        return None
+    return compile_command(normalize_command(text), target, wild)
+
+@lru_cache(maxsize=COMMAND_CACHE_SIZE)
+def compile_command(text: str, target: int, wild: int):
+    """
+    parse_command sobre texto já normalizado. Os comandos são imutáveis, e
+    o plano de rolagem do dano (damage_plan) também fica em cache: uma mesa
+    repetindo a mesma rolagem não passa de novo pelo parser nem pelo plano.
+    """
+    expr, vs, targets = text.partition("vs")
+    if vs:
+        return parse_area(expr, targets)
+    tokens = tokenize(text)
+    if not tokens:
+        return None
+    return parse_tokens(tokens, target, wild)
+
+def parse_tokens(tokens, target: int = T_DEFAULT, wild: int = WILD_DEFAULT):
+    """Gramática das rolagens sobre a saída de tokenize()."""
+    # DS em qualquer posição (troca o dado selvagem SÓ nessa jogada)
+    kinds = [kind for kind, _ in tokens]
+    if "ds" in kinds:
+        wild = tokens[kinds.index("ds")][1]
+        if wild not in WILD_DIES:
+            return None
+        tokens = [tok for tok in tokens if tok[0] != "ds"]
+        kinds = [kind for kind, _ in tokens]
+    values = [value for _, value in tokens]
+    n = len(kinds)
+    kinds += (None, None, None)  # sentinelas: dispensa checagem de limite
+
+    # Prefixo M# (individuais)
+    i = 0
+    individual = False
+    instances = 1
+    if kinds[0] == "num" and kinds[1] == "#":
+        instances = values[0]
+        individual = True
+        i = 2
+
+    # Dano: soma de termos, com M#( ... ) opcional
+    if kinds[i] == "(" or kinds[i] == "d" or (kinds[i] == "num" and kinds[i + 1] == "d"):
+        parsed = parse_damage_sum(kinds, values, i)
+        if parsed is None:
+            return None
+        terms, mod, i = parsed
+        if kinds[i] == "t" and kinds[i + 1] == "num":
+            target = values[i + 1]
+            i += 2
+        if i != n:
+            return None
+        return DamageCommand(instances, terms, mod, target, individual)
+
+    # Teste: [N]sX [±mod] [T<dif>]
+    count = None
+    if kinds[i] == "num":
+        count = values[i]
+        i += 1
+    if kinds[i] != "s":
+        return None
+    die = values[i]
+    if die not in TRAIT_DIES:
+        return None
+    i += 1
+
+    mod = 0
+    if (kinds[i] == "+" or kinds[i] == "-") and kinds[i + 1] == "num":
+        mod = values[i + 1] if kinds[i] == "+" else -values[i + 1]
+        i += 2
+
+    if kinds[i] == "t" and kinds[i + 1] == "num":
+        target = values[i + 1]
+        i += 2
+
+    if i != n:
+        return None
+
+    # Individuais exigem N#sX; no grupo, o N é opcional
+    if individual:
+        if count is not None:
+            return None
+        return TraitCommand(instances, die, mod, target, wild, True)
+    return TraitCommand(1 if count is None else count, die, mod, target, wild, False)
+
+def parse_damage_sum(kinds, values, i: int):
+    """
+    `[(] [N]dX[kK] (±[N]dX[kK] | ±num)* [)] (±num)*` a partir de kinds[i].
+    O primeiro termo é sempre de dados; os números somam no mod. Depois do
+    `)` só vêm números (o mod vale uma vez por rolagem de qualquer jeito).
+    Retorna (termos, mod, próxima posição) ou None.
+    """
+    paren = kinds[i] == "("
+    if paren:
+        i += 1
+    terms = []
+    mod = 0
+    sign = 1
+    first = True
+    while True:
+        # [N]dX[kK]
+        count = None
+        if kinds[i] == "num" and kinds[i + 1] == "d":
+            count = values[i]
+            i += 1
+        if kinds[i] == "d":
+            die = values[i]
+            if die not in DAMAGE_DIES:
+                return None
+            i += 1
+            if count is None:
+                count = 1
+            elif count == 0 and first:
+                count = 1          # `0d6` sempre valeu como `1d6`
+            keep = 0
+            if kinds[i] == "k":
+                keep = values[i]
+                if not 1 <= keep <= count:
+                    return None
+                if keep == count:
+                    keep = 0
+                i += 1
+            if count > MAX_TERM_DICE:
+                return None
+            if count:
+                terms.append(DiceTerm(count, die, sign, keep))
+                if len(terms) > MAX_DAMAGE_TERMS:
+                    return None
+        elif kinds[i] == "num" and not first:
+            mod += sign * values[i]
+            i += 1
+        else:
+            return None
+        first = False
+
+        if paren and kinds[i] == ")":
+            paren = False
+            i += 1
+            break
+        if kinds[i] != "+" and kinds[i] != "-":
+            break
+        sign = 1 if kinds[i] == "+" else -1
+        i += 1
+    if paren or sum(term.count for term in terms) > MAX_DAMAGE_DICE:
+        return None
+
+    while (kinds[i] == "+" or kinds[i] == "-") and kinds[i + 1] == "num":
+        mod += values[i + 1] if kinds[i] == "+" else -values[i + 1]
+        i += 2
+    return tuple(terms), mod, i
+
+def parse_area(expr: str, targets_text: str):
+    """`[#]<dano> vs <R>[x<quantos>], ...` -> AreaDamageCommand, ou None."""
+    expr = expr.strip()
+    individual = expr.startswith("#")
+    tokens = tokenize(expr[1:] if individual else expr)
+    # A Dif de cada alvo é a sua Resistência: T na expressão não faz sentido
+    if not tokens or ("t", None) in tokens:
+        return None
+    cmd = parse_tokens(tokens)
+    if not isinstance(cmd, DamageCommand) or cmd.individual:
+        return None
+    items = targets_text.split(",")
+    if len(items) > MAX_AREA_GROUPS:
+        return None
+    targets = []
+    for item in items:
+        m = AREA_TARGET.fullmatch(item)
+        if m is None:
+            return None
+        n = int(m[2]) if m[2] else 1
+        if n < 1 or int(m[1]) < 1:
+            return None
+        targets.append((int(m[1]), n))
+    return AreaDamageCommand(cmd.terms, cmd.mod, tuple(targets), individual)
+
+def parse_shared_options(tokens):
+    """
+    Segmento só com T<dif> e/ou DS<n>, que vale para todas as rolagens da
+    mensagem. Retorna (target, wild), com None no que não veio, ou None.
+    """
+    target = wild = None
+    i, n = 0, len(tokens)
+    while i < n:
+        kind, value = tokens[i]
+        if kind == "ds" and value in WILD_DIES:
+            wild = value
+            i += 1
+        elif kind == "t" and i + 1 < n and tokens[i + 1][0] == "num":
+            target = tokens[i + 1][1]
+            i += 2
+        else:
+            return None
+    return target, wild
+
+def could_be_roll(text: str) -> bool:
+    """Filtro barato: False para toda mensagem que certamente não é rolagem."""
+    return len(text) <= MAX_MESSAGE_LEN and not NON_COMMAND_CHAR.search(text)
+
+def parse_message(text: str, target: int = T_DEFAULT, wild: int = WILD_DEFAULT):
+    """
+    Uma ou mais rolagens separadas por `;` ou quebra de linha, com T/DS
+    opcionais num segmento próprio valendo para todas (ex.: `s8 +1; 2d6+d8; T6`).
+    Retorna a lista de comandos, ou None se algum segmento não for rolagem.
+    """
+    if not could_be_roll(text):
+        return None
+    segments = [seg for seg in COMMAND_SEPARATOR.split(text) if seg and not seg.isspace()]
+    if len(segments) == 1:
+        cmd = parse_command(segments[0], target, wild)
+        return [cmd] if cmd else None
+    if not segments or len(segments) > MAX_COMMANDS_PER_MESSAGE:
+        return None
+
+    rolls = []
+    for seg in segments:
+        norm = normalize_command(seg)
+        if "vs" in norm:   # dano em área: nunca é só T/DS
+            rolls.append(norm)
+            continue
+        tokens = tokenize(norm)
+        if not tokens:
+            return None
+        shared = parse_shared_options(tokens)
+        if shared is None:
+            rolls.append(norm)
+            continue
+        target = shared[0] if shared[0] is not None else target
+        wild = shared[1] if shared[1] is not None else wild
+
+    cmds = []
+    for norm in rolls:
+        cmd = compile_command(norm, target, wild)
+        if cmd is None:
+            return None
+        cmds.append(cmd)
+    return cmds or None
+
+
+MAX_COUNT = 20          # acima disso, N#… vira resumo (ver ROLAGENS GRANDES)
+MAX_BIG_COUNT = 100_000
+
+# Configuração por canal (!config, ver channel_config.py): com CONFIG_PATH fica
+# num SQLite; sem ele, só em memória. Cache LRU de CONFIG_CACHE_SIZE canais,
+# cada um relido do disco depois de CONFIG_TTL segundos.
+CONFIG_PATH = os.getenv("CONFIG_PATH", "")
+CONFIG_CACHE_SIZE = int(os.getenv("CONFIG_CACHE_SIZE", "10000"))
+CONFIG_TTL = float(os.getenv("CONFIG_TTL", "3600"))
+CONFIG_FLUSH_INTERVAL = 5.0
+DEFAULT_CONFIG = ChannelConfig(T_DEFAULT, WILD_DEFAULT, False, MAX_COUNT, MAX_BIG_COUNT)
+channel_configs = ConfigStore(CONFIG_PATH, DEFAULT_CONFIG, CONFIG_CACHE_SIZE, CONFIG_TTL)
+
+# ------------------------------------------------------------
+# Utilidades de rolagem
+# ------------------------------------------------------------
+# Motor em lote: cada passada sorteia todos os dados ainda vivos de uma vez;
+# só os que tiraram o máximo seguem para a próxima passada.
+DICE = ThreadDice(RNG_BACKEND, RNG_BUFFER)
+# Até ACE_SCALAR_MAX dados, as passadas rodam em listas do Python: com poucos
+# dados o custo fixo das operações do NumPy domina (roll_ace(6) ~1 µs em
+# listas contra ~7 µs em arrays; o lote só ganha por volta de 200 dados).
+# A ordem dos sorteios é a mesma nos dois caminhos: mesma semente, mesmos dados.
+ACE_SCALAR_MAX = 32
+
+def roll_ace_batch(count: int, die_size: int, with_chains: bool = True, rng=None):
+    """
+    Rola `count` dados explosivos de `die_size` lados (com o backend `rng`,
+    ou o da thread em DICE).
+    Retorna (totals, firsts, chains):
+      totals  # ndarray int64 com o total de cada dado
+      firsts  # ndarray int64 com a primeira face de cada dado (p/ crítica)
+      chains  # lista de listas com as faces de cada dado (formato do fmt_rolls),
+              # ou None se with_chains=False
+    """
+    rng = rng or DICE.get()
+    firsts = rng.dice(die_size, count)
+    totals = firsts.copy()
+    rounds = []
+    live = np.flatnonzero(firsts == die_size)
+    while live.size:
+        extra = rng.dice(die_size, live.size)
+        totals[live] += extra
+        if with_chains:
+            rounds.append((live, extra))
+        live = live[extra == die_size]
+
+    chains = None
+    if with_chains:
+        chains = [[r] for r in firsts.tolist()]
+        for idx, vals in rounds:
+            for i, v in zip(idx.tolist(), vals.tolist()):
+                chains[i].append(v)
+    return totals, firsts, chains
+
+def roll_aces(count: int, die_size: int, rng=None):
+    """
+    Como roll_ace_batch (com as cadeias), mas em listas: (totals, chains).
+    Poucos dados (até ACE_SCALAR_MAX) rolam sem passar pelos arrays.
+    """
+    if count > ACE_SCALAR_MAX:
+        totals, _, chains = roll_ace_batch(count, die_size, rng=rng)
+        return totals.tolist(), chains
+    return roll_ace_lists(count, die_size, rng)
+
+def roll_ace_lists(count: int, die_size: int, rng=None):
+    """As passadas de roll_ace_batch em listas do Python: (totals, chains)."""
+    rng = rng or DICE.get()
+    chains = [[r] for r in rng.dice_list(die_size, count)]
+    live = [chain for chain in chains if chain[0] == die_size]
+    while live:
+        for chain, v in zip(live, rng.dice_list(die_size, len(live))):
+            chain.append(v)
+        live = [chain for chain in live if chain[-1] == die_size]
+    return [sum(chain) for chain in chains], chains
+
+def roll_ace(die_size: int, rng=None):
+    totals, chains = roll_aces(1, die_size, rng)
+    return totals[0], chains[0]
+
+def fmt_rolls(rolls, die_size):
+    def fmt(r):
+        return f"**{r}**" if r == die_size else str(r)
+    return "[" + ", ".join(fmt(r) for r in rolls) + "]"
+
+def assess(final_val: int, diff_value: int):
+    """('fail'|'success'|'raises', raises_int)"""
+    if final_val < diff_value:
+        return "fail", 0
+    raises = (final_val - diff_value) // 4
+    if raises >= 1:
+        return "raises", raises
+    return "success", 0
+
+def score(final_val: int, diff_value: int) -> int:
+    """0=falha; 1=sucesso; 1+N=sucesso com N ampliações."""
+    status, raises = assess(final_val, diff_value)
+    if status == "fail":
+        return 0
+    return 1 + raises
+
+def color_for(final_val: int, diff_value: int):
+    status, _ = assess(final_val, diff_value)
+    if status == "fail":
+        return 0xE24C4B  # red
+    if status == "raises":
+        return 0xF1C40F  # gold
+    return 0x2ECC71      # green
+
+# Emotes por teste para títulos (modo s…)
+def title_emote_token(final_val: int, T_value: int, is_crit: bool = False) -> str:
+    if is_crit:
+        return "💀"
+    status, raises = assess(final_val, T_value)
+    if status == "fail":
+        return "❌"
+    return "✅" + (f" 🏅x{raises}" if raises > 0 else "")
+
+# Emote para títulos de DANO (não existe falha crítica em dano)
+def title_emote_damage(final_val: int, T_value: int) -> str:
+    status, raises = assess(final_val, T_value)
+    if status == "fail":
+        return "❌"
+    return "✅" + (f" 🏅x{raises}" if raises > 0 else "")
+
+# ------------------------------------------------------------
+# Lógica especial do grupo NsX: aplicar UM selvagem ao melhor slot
+# ------------------------------------------------------------
+def apply_wild_to_best_slot(trait_finals, wild_final, T_value, first_trait_vals, wild_first):
+    """
+    Decide em qual teste aplicar o Selvagem para maximizar o resultado:
+    - Prioriza transformar falha em sucesso; depois, aumentar ampliação.
+    - Se não melhora nada, não aplica.
+    Retorna: (eff_finals, used_idx, crit_idx)
+    """
+    n = len(trait_finals)
+    base_scores = [score(v, T_value) for v in trait_finals]
+    alt_scores  = [score(max(v, wild_final), T_value) for v in trait_finals]
+    improvements = [alt_scores[i] - base_scores[i] for i in range(n)]
+
+    used_idx = None
+    if max(improvements) > 0:
+        best_imp = max(improvements)
+        candidates = [i for i, imp in enumerate(improvements) if imp == best_imp]
+        used_idx = min(candidates, key=lambda i: base_scores[i])  # arruma falha primeiro
+
+    eff_finals = [max(v, wild_final) if i == used_idx else v for i, v in enumerate(trait_finals)]
+
+    # Falha crítica: selvagem e traço com 1. Um selvagem em 1 nunca melhora
+    # nenhum slot (used_idx fica None), então ela vai para o primeiro traço com 1.
+    crit_idx = None
+    if wild_first == 1 and 1 in first_trait_vals:
+        crit_idx = first_trait_vals.index(1)
+
+    return eff_finals, used_idx, crit_idx
+
+# ------------------------------------------------------------
+# Resultados: o que cada rolagem deu, antes de virar embed, texto ou JSON
+# ------------------------------------------------------------
+# roll_* devolvem estes objetos (com slots: bem menores que dicts); quem
+# mostra são render_embed, render_text e render_json (ver Renderização).
+@dataclass(slots=True)
+class TraitGroupResult:
+    """[N]sX: um selvagem para o conjunto, já aplicado ao melhor teste (apply_wild_to_best_slot)."""
+    cmd: TraitCommand
+    wild_total: int
+    wild_rolls: list
+    trait_totals: list        # total de cada dado do traço (sem mod)
+    trait_rolls: list         # faces de cada dado do traço
+    finals: list              # final de cada teste, com o selvagem aplicado
+    used_idx: int | None      # teste que ficou com o selvagem
+    crit_idx: int | None      # teste com falha crítica
+
+    @property
+    def wild_final(self) -> int:
+        return self.wild_total + self.cmd.mod
+
+@dataclass(slots=True)
+class TraitTest:
+    """Um teste de N#sX, com seu próprio selvagem."""
+    trait_rolls: list
+    trait_final: int
+    wild_rolls: list
+    wild_final: int
+    crit: bool
+
+    @property
+    def final(self) -> int:
+        return max(self.trait_final, self.wild_final)
+
+@dataclass(slots=True)
+class TraitIndividualsResult:
+    cmd: TraitCommand
+    tests: list               # [TraitTest, ...]
+
+@dataclass(slots=True)
+class DamagePart:
+    """Um termo numa rolagem de dano: total e faces de cada dado; `dropped` = descartados pelo k."""
+    term: DiceTerm
+    totals: list
+    rolls: list
+    dropped: frozenset
+
+@dataclass(slots=True)
+class DamageRoll:
+    raw_sum: int              # soma dos termos, sem mod
+    final: int
+    parts: list               # [DamagePart, ...] na ordem da expressão
+
+@dataclass(slots=True)
+class DamageResult:
+    """Dano: uma DamageRoll (XdY) ou uma por instância (M#XdY)."""
+    cmd: DamageCommand
+    rolls: list
+
+@dataclass(slots=True)
+class AreaDamageResult:
+    """Dano em área: dano final e efeito em cada alvo (ver area_effects)."""
+    cmd: AreaDamageCommand
+    roll: DamageRoll | None   # a rolagem de todos (None: uma por alvo, sem faces)
+    toughness: np.ndarray     # Resistência de cada alvo
+    finals: np.ndarray        # dano final em cada alvo
+    effects: np.ndarray       # -1 = nada, 0 = Abalado, k = k ferimentos
+    detailed: bool            # uma linha por alvo (até o limite de N# do canal)
+
+FIELD_CHARS = 1000   # por field nas listas longas (o Discord aceita 1024)
+EMBED_CHARS = 5000   # teto do embed com as listas (o Discord aceita 6000; sobra p/ total, rodapé e autor)
+TITLE_CHARS = 250
+
+def title_tokens(result):
+    """Tokens do título, um por teste/rolagem: os mesmos no embed e no texto."""
+    if isinstance(result, AreaDamageResult):
+        none, shaken, wounded, _ = effect_counts(result.effects)
+        tokens = [f"🩸 {wounded}", f"😵 {shaken}", f"❌ {none}"]
+        return tokens if result.roll is None else [f"💥 {result.roll.final}"] + tokens
+    T_value = result.cmd.target
+    if isinstance(result, TraitGroupResult):
+        return [title_emote_token(v, T_value, i == result.crit_idx) for i, v in enumerate(result.finals)]
+    if isinstance(result, TraitIndividualsResult):
+        return [title_emote_token(t.final, T_value, t.crit) for t in result.tests]
+    if isinstance(result, DamageResult):
+        return [f"{title_emote_damage(r.final, T_value)} · {r.final}" for r in result.rolls]
+    tokens = [f"✅ {result.successes}/{result.count}", f"🏅 {result.total_raises}"]
+    if isinstance(result.cmd, TraitCommand):
+        tokens.append(f"💀 {result.crits}")
+    return tokens
+
+def join_tokens(tokens) -> str:
+    title = " | ".join(tokens)
+    return title if len(title) <= TITLE_CHARS else title[:TITLE_CHARS - 3] + "…"
+
+def add_chunked_field(embed: discord.Embed, name: str, lines):
+    """
+    Linhas em fields de até FIELD_CHARS: `name`, ou `name (parte k)` quando
+    não cabem num só. Se o embed passaria de EMBED_CHARS, o resto vira uma
+    linha `… mais N linha(s)`.
+    """
+    lines = list(lines)
+    room = EMBED_CHARS - len(embed)
+    chunks, chunk = [], ""
+    for shown, line in enumerate(lines):
+        if chunk and len(chunk) + len(line) + 1 > FIELD_CHARS:
+            chunks.append(chunk)
+            chunk = ""
+        if not chunk:
+            room -= len(name) + 12   # nome do field, com " (parte k)"
+        room -= len(line) + 1
+        if room < 0:
+            # FIELD_CHARS deixa folga no field para esta linha
+            chunk += f"… mais {len(lines) - shown} linha(s)\n"
+            break
+        chunk += line + "\n"
+    if chunk:
+        chunks.append(chunk)
+    for k, value in enumerate(chunks, start=1):
+        embed.add_field(name=name if len(chunks) == 1 else f"{name} (parte {k})", value=value, inline=False)
+
+# ------------------------------------------------------------
+# Embeds — Testes com Selvagem
+# ------------------------------------------------------------
+def build_group_embed(result: TraitGroupResult):
+    cmd = result.cmd
+    die, T_value, wild_size = cmd.die, cmd.target, cmd.wild
+    eff_finals = result.finals
+
+    # Melhor efetivo para cor/resultado
+    best_value = max(eff_finals) if eff_finals else result.wild_final
+
+    # Descrição
+    desc_parts = [f"Dif={T_value}"]
+    if cmd.mod:
+        desc_parts.append(f"mod {cmd.mod:+d}")
+    if wild_size != WILD_DEFAULT:
+        desc_parts.append(f"selv=d{wild_size}")
+    description = " | ".join(desc_parts)
+
+    embed = discord.Embed(title=join_tokens(title_tokens(result)), description=description,
+                          color=color_for(best_value, T_value))
+
+    # Selvagem
+    embed.add_field(
+        name=f"d{wild_size} (Selvagem)",
+        value=f"{fmt_rolls(result.wild_rolls, wild_size)}\nTotal: **{result.wild_total}** ⇒ **{result.wild_final}**",
+        inline=False
+    )
+
+    # Traços (sem a palavra "Traços")
+    if cmd.count == 1:
+        total = result.trait_totals[0]
+        crit = " • ⚠️ Falha Crítica" if (result.crit_idx == 0) else ""
+        embed.add_field(
+            name=f"d{die}",
+            value=f"{fmt_rolls(result.trait_rolls[0], die)}\nTotal: **{total}** ⇒ **{total + cmd.mod}**{crit}",
+            inline=False
+        )
+    else:
+        add_chunked_field(embed, f"d{die}", (
+            f"#{i}: {fmt_rolls(rolls, die)} ⇒ **{total + cmd.mod}**"
+            for i, (total, rolls) in enumerate(zip(result.trait_totals, result.trait_rolls), start=1)
+        ))
+
+    # Resultado: Final & Ampliações
+    _, raises = assess(best_value, T_value)
+    embed.add_field(name="Resultado", value=f"Final: **{best_value}**  |  Ampliações: **{raises}**", inline=False)
+
+    if result.used_idx is not None and cmd.count > 1:
+        embed.set_footer(text=f"Selvagem aplicado ao teste #{result.used_idx + 1}")
+
+    return embed
+
+def build_individuals_embed(result: TraitIndividualsResult, compact: bool = False):
+    cmd, tests = result.cmd, result.tests
+    die, T_value, wild_size = cmd.die, cmd.target, cmd.wild
+
+    ref = tests[0].final if tests else 0
+    desc = f"Dif={T_value}"
+    if cmd.mod:
+        desc += f" | mod {cmd.mod:+d}"
+    if wild_size != WILD_DEFAULT:
+        desc += f" | selv=d{wild_size}"
+
+    embed = discord.Embed(title=join_tokens(title_tokens(result)), description=desc, color=color_for(ref, T_value))
+
+    if cmd.count > 10 or compact:
+        lines = []
+        for i, t in enumerate(tests, start=1):
+            _, raises = assess(t.final, T_value)
+            crit = " ⚠️" if t.crit else ""
+            lines.append(
+                f"#{i}: d{die} {fmt_rolls(t.trait_rolls, die)} ⇒ **{t.trait_final}** | "
+                f"Selv {fmt_rolls(t.wild_rolls, wild_size)} ⇒ **{t.wild_final}** | "
+                f"Final: **{t.final}**  |  Ampliações: **{raises}**{crit}"
+            )
+        add_chunked_field(embed, "Testes", lines)
+    else:
+        for i, t in enumerate(tests, start=1):
+            _, raises = assess(t.final, T_value)
+            crit = " • ⚠️ Falha Crítica" if t.crit else ""
+            embed.add_field(
+                name=f"Teste #{i}",
+                value=(
+                    f"• Resultado: Final **{t.final}**  |  Ampliações: **{raises}**{crit}\n"
+                    f"• d{die}: {fmt_rolls(t.trait_rolls, die)} ⇒ **{t.trait_final}**\n"
+                    f"• d{wild_size} (Selvagem): {fmt_rolls(t.wild_rolls, wild_size)} ⇒ **{t.wild_final}**"
+                ),
+                inline=False
+            )
+
+    successes = sum(1 for t in tests if t.final >= T_value)
+    total_raises = sum((t.final - T_value) // 4 for t in tests if t.final >= T_value)
+    embed.add_field(name="Resumo", value=f"{successes}/{cmd.count} sucesso(s) | ampliações totais: {total_raises}",
+                    inline=False)
+    return embed
+
+# ------------------------------------------------------------
+# DANO (SEM selvagem) — com Dif/T, ampliações e qualquer número de termos
+# ------------------------------------------------------------
+def format_terms(terms) -> str:
+    """(DiceTerm, ...) -> `2d6 + 1d8 - 1d4`, `4d6k3`."""
+    parts = []
+    for term in terms:
+        if parts:
+            parts.append("+" if term.sign > 0 else "-")
+        parts.append(f"{term.count}d{term.die}" + (f"k{term.keep}" if term.keep else ""))
+    return " ".join(parts)
+
+@lru_cache(maxsize=COMMAND_CACHE_SIZE)
+def damage_plan(terms: tuple):
+    """
+    Plano de rolagem de uma expressão de dano: os termos agrupados por lado
+    de dado, para um único sorteio em lote por lado (e não um por termo).
+    Retorna ((lado, dados por instância, ((índice do termo, coluna), ...)), ...).
+    """
+    groups = {}
+    for idx, term in enumerate(terms):
+        groups.setdefault(term.die, []).append(idx)
+    plan = []
+    for die, idxs in groups.items():
+        slots, width = [], 0
+        for idx in idxs:
+            slots.append((idx, width))
+            width += terms[idx].count
+        plan.append((die, width, tuple(slots)))
+    return tuple(plan)
+
+def roll_damage_batch(instances: int, terms, with_chains: bool = True, rng=None):
+    """
+    Rola `instances` vezes a expressão de dano `terms` = (DiceTerm, ...),
+    seguindo damage_plan: um sorteio em lote por lado de dado.
+    Retorna:
+      raw_sums,  # ndarray int64: soma dos dados (sem mod) de cada instância
+      per_inst   # por instância, a lista de DamagePart na ordem da expressão
+                 # (None se with_chains=False)
+    """
+    raw_sums = np.zeros(instances, dtype=np.int64)
+    per_inst = [[None] * len(terms) for _ in range(instances)] if with_chains else None
+    for die, width, slots in damage_plan(terms):
+        totals, _, chains = roll_ace_batch(instances * width, die, with_chains, rng)
+        totals = totals.reshape(instances, width)
+        for idx, start in slots:
+            term = terms[idx]
+            block = totals[:, start:start + term.count]
+            dropped = None
+            if term.keep:
+                # Mantém os `keep` maiores: descarta as primeiras colunas da ordenação
+                order = np.argsort(block, axis=1, kind="stable")
+                raw_sums += term.sign * np.take_along_axis(block, order[:, term.count - term.keep:], axis=1).sum(axis=1)
+                if with_chains:
+                    dropped = order[:, :term.count - term.keep].tolist()
+            else:
+                raw_sums += term.sign * block.sum(axis=1)
+            if with_chains:
+                for k, row in enumerate(block.tolist()):
+                    first = k * width + start
+                    per_inst[k][idx] = DamagePart(term, row, chains[first:first + term.count],
+                                                  frozenset(dropped[k]) if dropped else frozenset())
+    return raw_sums, per_inst
+
+def roll_damage_once(terms, rng=None):
+    """
+    Rola a expressão de dano uma vez.
+    Retorna:
+      raw_sum,  # soma dos termos (sem mod), com os sinais e só os dados mantidos
+      parts     # lista de DamagePart, como em roll_damage_batch
+    """
+    if sum(term.count for term in terms) > ACE_SCALAR_MAX:
+        raw_sums, per_inst = roll_damage_batch(1, terms, rng=rng)
+        return int(raw_sums[0]), per_inst[0]
+    # Poucos dados: o mesmo plano de roll_damage_batch, em listas
+    raw_sum = 0
+    parts = [None] * len(terms)
+    for die, width, slots in damage_plan(terms):
+        totals, chains = roll_aces(width, die, rng)
+        for idx, start in slots:
+            term = terms[idx]
+            block = totals[start:start + term.count]
+            dropped = ()
+            kept = block
+            if term.keep:
+                order = sorted(range(term.count), key=block.__getitem__)
+                dropped = order[:term.count - term.keep]
+                kept = [block[i] for i in order[term.count - term.keep:]]
+            raw_sum += term.sign * sum(kept)
+            parts[idx] = DamagePart(term, block, chains[start:start + term.count], frozenset(dropped))
+    return raw_sum, parts
+
+def roll_damage(cmd: DamageCommand, rng=None) -> DamageResult:
+    """XdY (uma rolagem) ou M#XdY (uma por instância), num único roll_damage_batch."""
+    instances = max(1, cmd.instances) if cmd.individual else 1
+    if instances == 1:
+        raw_sum, parts = roll_damage_once(cmd.terms, rng)
+        return DamageResult(cmd, [DamageRoll(raw_sum, raw_sum + cmd.mod, parts)])
+    raw_sums, per_inst = roll_damage_batch(instances, cmd.terms, rng=rng)
+    return DamageResult(cmd, [
+        DamageRoll(raw_sum, raw_sum + cmd.mod, parts) for raw_sum, parts in zip(raw_sums.tolist(), per_inst)
+    ])
+
+def damage_term_label(term: DiceTerm) -> str:
+    return ("-" if term.sign < 0 else "") + f"d{term.die}"
+
+def damage_term_lines(part: DamagePart, label: str = ""):
+    """Uma linha por dado do termo; os descartados pelo k aparecem riscados."""
+    die = part.term.die
+    lines = []
+    for k, (tot, rolls) in enumerate(zip(part.totals, part.rolls)):
+        line = f"{label}#{k + 1}: {fmt_rolls(rolls, die)} ⇒ **{tot}**"
+        lines.append(f"~~{line}~~" if k in part.dropped else line)
+    return lines
+
+def add_damage_roll_fields(embed: discord.Embed, roll: DamageRoll):
+    """Um field por termo (sem label 'Rolagens') e o Total (soma e final)."""
+    for part in roll.parts:
+        term = part.term
+        name = damage_term_label(term) + (f" ({term.keep} maiores)" if term.keep else "")
+        add_chunked_field(embed, name, damage_term_lines(part))
+    embed.add_field(name="Total", value=f"Soma: **{roll.raw_sum}** ⇒ Final: **{roll.final}**", inline=False)
+
+def build_damage_group_embed(result: DamageResult):
+    cmd, roll = result.cmd, result.rolls[0]
+    T_value, final = cmd.target, roll.final
+
+    # Descrição: Dif, expressão e mod
+    description = " | ".join(
+        part for part in [
+            f"Dif={T_value}",
+            "Expr=" + format_terms(cmd.terms),
+            f"mod {cmd.mod:+d}" if cmd.mod else None
+        ] if part
+    )
+
+    # Título com EMOTE de dano + número
+    embed = discord.Embed(title=title_tokens(result)[0], description=description, color=color_for(final, T_value))
+    add_damage_roll_fields(embed, roll)
+
+    # Resultado (ampliações)
+    _, raises = assess(final, T_value)
+    embed.add_field(name="Resultado", value=f"Final: **{final}**  |  Ampliações: **{raises}**", inline=False)
+    return embed
+
+def build_damage_individuals_embed(result: DamageResult, compact: bool = False):
+    cmd, rolls = result.cmd, result.rolls
+    T_value = cmd.target
+
+    # Descrição
+    desc = f"Dif={T_value} | Expr={format_terms(cmd.terms)}" + (f" | mod {cmd.mod:+d}" if cmd.mod else "")
+    # cor baseada no primeiro (apenas estética)
+    embed = discord.Embed(title=join_tokens(title_tokens(result)), description=desc,
+                          color=color_for(rolls[0].final, T_value))
+
+    if len(rolls) > 10 or compact:
+        lines = []
+        for i, r in enumerate(rolls, start=1):
+            _, raises = assess(r.final, T_value)
+            lines.append(f"#{i}: Soma **{r.raw_sum}** ⇒ Final **{r.final}** | Ampliações: **{raises}**")
+        add_chunked_field(embed, "Danos", lines)
+    else:
+        # Um field por instância
+        for i, r in enumerate(rolls, start=1):
+            lines = [f"• #{i}"]
+            for part in r.parts:
+                label = damage_term_label(part.term) + " "
+                lines.extend(f"  - {line}" for line in damage_term_lines(part, label))
+            _, raises = assess(r.final, T_value)
+            lines.append(f"  - Soma: **{r.raw_sum}** ⇒ Final: **{r.final}**  |  Ampliações: **{raises}**")
+            embed.add_field(name=f"Dano #{i}", value="\n".join(lines), inline=False)
+
+    return embed
+
+# ------------------------------------------------------------
+# DANO EM ÁREA (`3d6+2 vs 5,6,8x30`) — Resistência de cada alvo como Dif
+# ------------------------------------------------------------
+def area_effects(finals, toughness):
+    """assess() contra todos os alvos de uma vez: -1 = nada, 0 = Abalado, k = k ferimentos."""
+    return np.where(finals >= toughness, (finals - toughness) // 4, -1)
+
+def roll_area_damage(cmd: AreaDamageCommand, detailed: bool, rng=None) -> AreaDamageResult:
+    """Uma rolagem para todos (roll_damage_once) ou uma por alvo, num só roll_damage_batch."""
+    toughness = np.repeat(np.array([r for r, _ in cmd.targets], dtype=np.int64),
+                          [n for _, n in cmd.targets])
+    roll = None
+    if cmd.individual:
+        raw_sums, _ = roll_damage_batch(toughness.size, cmd.terms, with_chains=False, rng=rng)
+        finals = raw_sums + cmd.mod
+    else:
+        raw_sum, parts = roll_damage_once(cmd.terms, rng)
+        roll = DamageRoll(raw_sum, raw_sum + cmd.mod, parts)
+        finals = np.full(toughness.size, roll.final, dtype=np.int64)
+    return AreaDamageResult(cmd, roll, toughness, finals, area_effects(finals, toughness), detailed)
+
+def effect_counts(effects):
+    """(sem efeito, só Abalados, feridos, total de ferimentos)."""
+    wounded = effects > 0
+    return int((effects < 0).sum()), int((effects == 0).sum()), int(wounded.sum()), int(effects[wounded].sum())
+
+def effect_label(effect: int) -> str:
+    if effect < 0:
+        return "❌"
+    if effect == 0:
+        return "😵 Abalado"
+    return f"🩸 {effect} ferimento{'s' if effect > 1 else ''}"
+
+def area_lines(result: AreaDamageResult):
+    """Tabela por alvo (detalhada) ou por Resistência, na ordem digitada."""
+    cmd = result.cmd
+    if cmd.individual and result.detailed:
+        return [
+            f"#{i} R{r}: **{final}** ⇒ {effect_label(effect)}"
+            for i, (r, final, effect) in enumerate(
+                zip(result.toughness.tolist(), result.finals.tolist(), result.effects.tolist()), start=1)
+        ]
+    lines = []
+    for r in dict.fromkeys(r for r, _ in cmd.targets):
+        effects = result.effects[result.toughness == r]
+        label = f"R{r}" + (f" ×{effects.size}" if effects.size > 1 else "")
+        if not cmd.individual:
+            # Mesmo dano para todos: mesmo efeito em quem tem a mesma Resistência
+            lines.append(f"{label}: {effect_label(int(effects[0]))}")
+        else:
+            none, shaken, wounded, wounds = effect_counts(effects)
+            lines.append(f"{label}: 🩸 {wounded} ({wounds} ferimento(s)) · 😵 {shaken} · ❌ {none}")
+    return lines
+
+def build_area_embed(result: AreaDamageResult):
+    cmd = result.cmd
+    none, shaken, wounded, wounds = effect_counts(result.effects)
+    description = " | ".join(
+        part for part in [
+            "Expr=" + format_terms(cmd.terms),
+            f"mod {cmd.mod:+d}" if cmd.mod else None,
+            f"{cmd.count} alvo(s)",
+            "uma rolagem por alvo" if cmd.individual else None,
+        ] if part
+    )
+    color = 0xF1C40F if wounded else 0x2ECC71 if shaken else 0xE24C4B
+    embed = discord.Embed(title=join_tokens(title_tokens(result)), description=description, color=color)
+    if result.roll is not None:
+        add_damage_roll_fields(embed, result.roll)
+    add_chunked_field(embed, "Alvos", area_lines(result))
+    embed.add_field(
+        name="Resumo",
+        value=f"🩸 Feridos: **{wounded}** ({wounds} ferimento(s)) | 😵 Abalados: **{shaken}** | ❌ Sem efeito: **{none}**",
+        inline=False
+    )
+    return embed
+
+# ------------------------------------------------------------
+# CHANCES EXATAS (!odds)
+# ------------------------------------------------------------
+ODDS_EPSILON = 1e-12   # cauda desprezada das distribuições explosivas
+ODDS_MIN_SHOWN = 0.0005  # ampliações abaixo disso viram uma linha "≥N"
+ODDS_MAX_DICE = 60       # dados por rolagem de dano no cálculo exato
+# Termo com k (manter os maiores): dados × lados por termo. O custo cresce
+# com dados, k e lados; no limite fica em ~0,3 s (fora do event loop).
+ODDS_MAX_KEEP_WORK = 120
+
+@lru_cache(maxsize=None)
+def ace_distribution(die: int):
+    """
+    pmf do total de UM dado explosivo de `die` lados (índice = total),
+    truncada quando a probabilidade cai abaixo de ODDS_EPSILON.
+    """
+    explosions = math.ceil(math.log(ODDS_EPSILON) / math.log(1 / die))
+    pmf = np.zeros((explosions + 1) * die)
+    for k in range(explosions + 1):
+        pmf[k * die + 1:(k + 1) * die] = (1 / die) ** (k + 1)
+    pmf.flags.writeable = False
+    return pmf
+
+@lru_cache(maxsize=None)
+def dice_sum_distribution(count: int, die: int):
+    """pmf da soma de `count` dados explosivos de `die` lados."""
+    pmf = ace_distribution(die)
+    acc = pmf
+    for _ in range(count - 1):
+        acc = np.convolve(acc, pmf)
+        acc = acc[:np.flatnonzero(acc >= ODDS_EPSILON)[-1] + 1]
+    acc.flags.writeable = False
+    return acc
+
+def _score_buckets(value_pmf, mod_all: int, T_value: int):
+    """Agrupa uma pmf de valores (sem mod) por score(): [falha, sucesso, 1 amp., 2 amp., ...]."""
+    scores = [score(v + mod_all, T_value) for v in range(len(value_pmf))]
+    return np.bincount(scores, weights=value_pmf)
+
+@lru_cache(maxsize=4096)
+def trait_odds(count: int, die: int, wild: int, mod_all: int, T_value: int):
+    """
+    Chances de um teste de grupo [N]sX com selvagem.
+    O resultado segue build_group_embed: o melhor valor efetivo depois de
+    apply_wild_to_best_slot tem o mesmo score que max(traços, selvagem).
+    Retorna (p_crit, buckets) — buckets como em _score_buckets, sem os casos críticos.
+    """
+    trait_cdf = np.cumsum(ace_distribution(die))
+    wild_cdf = np.cumsum(ace_distribution(wild))
+    size = max(len(trait_cdf), len(wild_cdf))
+    trait_cdf = np.pad(trait_cdf, (0, size - len(trait_cdf)), constant_values=trait_cdf[-1])
+    wild_cdf = np.pad(wild_cdf, (0, size - len(wild_cdf)), constant_values=wild_cdf[-1])
+
+    best_pmf = np.diff(trait_cdf ** count * wild_cdf, prepend=0.0)
+
+    # Crítica: selvagem = 1 e pelo menos um traço = 1. A mão fica com o
+    # melhor traço (o selvagem em 1 não melhora nada).
+    p_trait1 = 1 / die
+    p_wild1 = 1 / wild
+    with_one = trait_cdf ** count - np.clip(trait_cdf - p_trait1, 0.0, None) ** count
+    with_one[0] = 0.0
+    crit_pmf = p_wild1 * np.diff(with_one, prepend=0.0)
+
+    buckets = _score_buckets(best_pmf - crit_pmf, mod_all, T_value)
+    return float(crit_pmf.sum()), tuple(buckets.tolist())
+
+@lru_cache(maxsize=256)
+def keep_highest_distribution(count: int, die: int, keep: int):
+    """
+    pmf da soma dos `keep` maiores entre `count` dados explosivos.
+    Percorre os valores do maior para o menor: dado que os dados ainda não
+    colocados são todos <= v, quantos deles são exatamente v é binomial com
+    p = P(v) / P(<= v); os primeiros `keep` colocados entram na soma.
+    Completados os `keep`, a soma não muda mais: esses casos saem de `dist`
+    (de uma vez, pela cauda da binomial) e vão direto para o resultado.
+    """
+    pmf = ace_distribution(die)
+    cdf = np.cumsum(pmf)
+
+    def add(into, part):
+        if len(part) > len(into):
+            into = np.pad(into, (0, len(part) - len(into)))
+        into[:len(part)] += part
+        return into
+
+    # dist[j] = pmf da soma mantida com j < keep dados já colocados
+    dist = {0: np.ones(1)}
+    done = np.zeros(1)
+    for v in range(len(pmf) - 1, 0, -1):
+        q = pmf[v] / cdf[v] if cdf[v] > 0 else 0.0
+        if q == 0.0:
+            continue
+        nxt = {}
+        for j, acc in dist.items():
+            rest = count - j
+            need = keep - j
+            probs = [math.comb(rest, m) * q ** m * (1 - q) ** (rest - m) for m in range(min(need, rest + 1))]
+            for m, p in enumerate(probs):
+                if p >= ODDS_EPSILON:
+                    nxt[j + m] = add(nxt.get(j + m, np.zeros(1)), np.pad(acc * p, (m * v, 0)))
+            tail = 1.0 - sum(probs)
+            if need <= rest and tail >= ODDS_EPSILON:
+                done = add(done, np.pad(acc * tail, (need * v, 0)))
+        dist = nxt
+    done.flags.writeable = False
+    return done
+
+def term_distribution(term: DiceTerm):
+    """(pmf, menor valor) de um termo, com o sinal aplicado."""
+    if term.keep:
+        pmf = keep_highest_distribution(term.count, term.die, term.keep)
+    else:
+        pmf = dice_sum_distribution(term.count, term.die)
+    if term.sign > 0:
+        return pmf, 0
+    return pmf[::-1], -(len(pmf) - 1)
+
+@lru_cache(maxsize=4096)
+def damage_odds(terms: tuple, mod_all: int, T_value: int):
+    """Chances de uma rolagem de dano (sem selvagem, sem crítica). Retorna os buckets de _score_buckets."""
+    pmf, offset = np.ones(1), 0
+    for term in terms:
+        term_pmf, term_offset = term_distribution(term)
+        pmf = np.convolve(pmf, term_pmf)
+        offset += term_offset
+    return tuple(_score_buckets(pmf, mod_all + offset, T_value).tolist())
+
+def fmt_pct(p: float) -> str:
+    return f"{p * 100:.2f}%"
+
+def describe_command(cmd):
+    """Partes da descrição (Dif, Expr, selv, mod) comuns a !odds e !sim."""
+    prefix = f"{cmd.instances if isinstance(cmd, DamageCommand) else cmd.count}#" if cmd.individual else ""
+    if isinstance(cmd, DamageCommand):
+        expr = format_terms(cmd.terms)
+        expr = prefix + (f"({expr})" if prefix and len(cmd.terms) > 1 else expr)
+    else:
+        expr = prefix + (f"s{cmd.die}" if cmd.individual else f"{cmd.count}s{cmd.die}")
+    parts = [f"Dif={cmd.target}", f"Expr={expr}"]
+    if isinstance(cmd, TraitCommand) and cmd.wild != WILD_DEFAULT:
+        parts.append(f"selv=d{cmd.wild}")
+    if cmd.mod:
+        parts.append(f"mod {cmd.mod:+d}")
+    return parts
+
+def build_odds_embed(cmd, p_crit: float, buckets):
+    desc_parts = describe_command(cmd)
+    if cmd.individual:
+        desc_parts.append("chances por teste" if isinstance(cmd, TraitCommand) else "chances por rolagem")
+
+    p_fail = buckets[0] if buckets else 0.0
+    p_success = 1 - p_fail - p_crit
+    embed = discord.Embed(
+        title=f"🎲 Chances · ✅ {fmt_pct(p_success)}",
+        description=" | ".join(desc_parts),
+        color=0x3498DB
+    )
+
+    lines = []
+    if isinstance(cmd, TraitCommand):
+        lines.append(f"💀 Falha Crítica: **{fmt_pct(p_crit)}**")
+    lines.append(f"❌ Falha: **{fmt_pct(p_fail)}**")
+    if len(buckets) > 1:
+        lines.append(f"✅ Sucesso: **{fmt_pct(buckets[1])}**")
+    for raises in range(1, len(buckets) - 1):
+        rest = sum(buckets[raises + 1:])
+        if rest < ODDS_MIN_SHOWN:
+            lines.append(f"🏅x{raises}+: **{fmt_pct(rest)}**")
+            break
+        lines.append(f"🏅x{raises}: **{fmt_pct(buckets[raises + 1])}**")
+    embed.add_field(name="Resultado", value="\n".join(lines), inline=False)
+    return embed
+
+def odds_cost(cmd) -> int:
+    """Custo de !odds para o agendador: os termos com k pesam dados × lados."""
+    if isinstance(cmd, DamageCommand):
+        return sum(term.count * term.die if term.keep else term.count for term in cmd.terms)
+    return 1
+
+def odds_args_cost(args: str) -> int:
+    cmd = parse_command(args)
+    return odds_cost(cmd) if cmd is not None else 0
+
+def cmd_odds(args: str):
+    cmd = parse_command(args)
+    if cmd is None:
+        return "❌ Use `!odds <rolagem>`, ex.: `!odds 3s8+2 T6 DS10` ou `!odds 2d6+d8 T5`."
+    return odds_for(cmd)
+
+def odds_for(cmd):
+    if isinstance(cmd, AreaDamageCommand):
+        return "❌ Dano em área não tem chances exatas; use `!odds` com a expressão e `T<resistência>`."
+    if isinstance(cmd, DamageCommand):
+        if sum(term.count for term in cmd.terms) > ODDS_MAX_DICE:
+            return f"❌ Chances exatas só até {ODDS_MAX_DICE} dados por rolagem; use `!sim`."
+        if any(term.keep and term.count * term.die > ODDS_MAX_KEEP_WORK for term in cmd.terms):
+            return (f"❌ Chances exatas com `k` só até {ODDS_MAX_KEEP_WORK} em dados × lados por termo "
+                    "(ex.: `20d6k10`, `6d20k3`); use `!sim`.")
+        return build_odds_embed(cmd, 0.0, damage_odds(cmd.terms, cmd.mod, cmd.target))
+    if cmd.count < 1 or cmd.count > MAX_COUNT:
+        return f"❌ Quantidade inválida. Use 1 a {MAX_COUNT}."
+    count = 1 if cmd.individual else cmd.count
+    p_crit, buckets = trait_odds(count, cmd.die, cmd.wild, cmd.mod, cmd.target)
+    return build_odds_embed(cmd, p_crit, buckets)
+
+# ------------------------------------------------------------
+# ROLAGENS GRANDES (N# acima de MAX_COUNT) — resumo em vez de um por teste
+# ------------------------------------------------------------
+# Os testes são gerados em blocos de BIG_CHUNK e só os agregados ficam:
+# a memória não depende de N.
+BIG_CHUNK = 4096
+BIG_TOP_N = 5
+BIG_HIST_BINS = 10
+
+@dataclass(slots=True)
+class BigRollSummary:
+    cmd: object = None                # TraitCommand ou DamageCommand
+    count: int = 0
+    successes: int = 0
+    total_raises: int = 0
+    crits: int = 0
+    sum_finals: int = 0
+    raise_counts: np.ndarray = None   # índice = nº de ampliações (só sucessos)
+    final_hist: np.ndarray = None     # índice = final - final_offset
+    final_offset: int = 0
+    top: np.ndarray = None            # pares (final, nº do teste), maiores finais
+
+def _add_hist(acc, hist):
+    if len(hist) > len(acc):
+        acc = np.pad(acc, (0, len(hist) - len(acc)))
+    acc[:len(hist)] += hist
+    return acc
+
+def _roll_big_chunk(cmd, size: int, rng=None):
+    """Finais (int32) e críticas (bool) de `size` testes/instâncias."""
+    if isinstance(cmd, DamageCommand):
+        raw_sums, _ = roll_damage_batch(size, cmd.terms, with_chains=False, rng=rng)
+        return (raw_sums + cmd.mod).astype(np.int32), None
+    t_totals, t_firsts, _ = roll_ace_batch(size, cmd.die, with_chains=False, rng=rng)
+    w_totals, w_firsts, _ = roll_ace_batch(size, cmd.wild, with_chains=False, rng=rng)
+    finals = (np.maximum(t_totals, w_totals) + cmd.mod).astype(np.int32)
+    return finals, (t_firsts == 1) & (w_firsts == 1)
+
+def roll_big_individuals(cmd, rng=None) -> BigRollSummary:
+    """Rola N#sX ou M#XdY em blocos, acumulando o resumo."""
+    total = cmd.instances if isinstance(cmd, DamageCommand) else cmd.count
+    T_value = cmd.target
+    summary = BigRollSummary(
+        cmd=cmd,
+        raise_counts=np.zeros(1, dtype=np.int64),
+        final_hist=np.zeros(1, dtype=np.int64),
+        top=np.empty((0, 2), dtype=np.int32),
+    )
+
+    for start in range(0, total, BIG_CHUNK):
+        size = min(BIG_CHUNK, total - start)
+        finals, crit = _roll_big_chunk(cmd, size, rng)
+
+        # O histograma começa no menor final visto (com termos negativos não
+        # há um mínimo fixo); um final menor num bloco seguinte estende à esquerda.
+        lo = int(finals.min())
+        if not summary.count:
+            summary.final_offset = lo
+        elif lo < summary.final_offset:
+            summary.final_hist = np.pad(summary.final_hist, (summary.final_offset - lo, 0))
+            summary.final_offset = lo
+
+        ok = finals >= T_value
+        raises = (finals[ok] - T_value) // 4
+        summary.count += size
+        summary.successes += int(ok.sum())
+        summary.total_raises += int(raises.sum())
+        summary.sum_finals += int(finals.sum(dtype=np.int64))
+        if crit is not None:
+            summary.crits += int(crit.sum())
+        summary.raise_counts = _add_hist(summary.raise_counts, np.bincount(raises))
+        summary.final_hist = _add_hist(summary.final_hist, np.bincount(finals - summary.final_offset))
+
+        # Top-N: junta os melhores do bloco com os atuais e corta de novo
+        k = min(BIG_TOP_N, size)
+        best = np.argpartition(finals, size - k)[size - k:]
+        chunk_top = np.stack([finals[best], best.astype(np.int32) + start + 1], axis=1)
+        merged = np.concatenate([summary.top, chunk_top])
+        order = np.lexsort((merged[:, 1], -merged[:, 0]))[:BIG_TOP_N]
+        summary.top = merged[order]
+    return summary
+
+def _hist_lines(hist, offset: int, bins: int = BIG_HIST_BINS, width: int = 16):
+    """Histograma em texto (até `bins` faixas) com barras de largura proporcional."""
+    nz = np.flatnonzero(hist)
+    lo, hi = int(nz[0]), int(nz[-1])
+    step = max(1, -(-(hi - lo + 1) // bins))
+    counts = [int(hist[i:i + step].sum()) for i in range(lo, hi + 1, step)]
+    peak = max(counts)
+    lines = []
+    for j, c in enumerate(counts):
+        a = lo + j * step + offset
+        b = min(a + step - 1, hi + offset)
+        label = f"{a}" if a == b else f"{a} a {b}"
+        bar = "█" * max(1 if c else 0, round(width * c / peak))
+        lines.append(f"`{label:>7}` {bar} {c}")
+    return lines
+
+def build_big_summary_embed(summary: BigRollSummary):
+    cmd = summary.cmd
+    n, T_value = summary.count, cmd.target
+    embed = discord.Embed(
+        title=join_tokens(title_tokens(summary)),
+        description=" | ".join(describe_command(cmd)),
+        color=color_for(summary.sum_finals // n, T_value)
+    )
+
+    lines = [
+        f"{summary.successes}/{n} sucesso(s) | ampliações totais: {summary.total_raises}",
+        f"Final médio: **{summary.sum_finals / n:.2f}**",
+    ]
+    if isinstance(cmd, TraitCommand):
+        lines.append(f"Falhas Críticas: **{summary.crits}**")
+    embed.add_field(name="Resumo", value="\n".join(lines), inline=False)
+
+    raise_lines = [f"✅ Sucesso: **{int(summary.raise_counts[0])}**"]
+    for k, c in enumerate(summary.raise_counts.tolist()[1:], start=1):
+        if k >= 6:
+            raise_lines.append(f"🏅x{k}+: **{int(summary.raise_counts[k:].sum())}**")
+            break
+        raise_lines.append(f"🏅x{k}: **{c}**")
+    raise_lines.insert(0, f"❌ Falha: **{n - summary.successes}**")
+    embed.add_field(name="Por resultado", value="\n".join(raise_lines), inline=False)
+
+    embed.add_field(name="Finais", value="\n".join(_hist_lines(summary.final_hist, summary.final_offset)), inline=False)
+
+    top = " | ".join(f"#{idx}: **{final}**" for final, idx in summary.top.tolist())
+    embed.add_field(name=f"Maiores ({len(summary.top)})", value=top, inline=False)
+    return embed
+
+# ------------------------------------------------------------
+# SIMULAÇÃO (!sim) — lotes vetorizados num pool de processos
+# ------------------------------------------------------------
+SIM_MAX_TRIALS = 1_000_000
+SIM_TIME_BUDGET = 5.0          # segundos de relógio por pedido
+SIM_DICE_PER_BATCH = 200_000   # dados por lote enviado a um processo
+SIM_WORKERS = int(os.getenv("SIM_WORKERS", "0")) or (os.cpu_count() or 1)
+SIM_RAISE_LINES = 9            # linhas do miolo no campo de ampliações
+SIM_RAISE_TAIL = 0.005         # massa de cada ponta que vira "<N"/"N+"
+
+_sim_pool = None
+
+def get_sim_pool():
+    global _sim_pool
+    if _sim_pool is None:
+        _sim_pool = ProcessPoolExecutor(max_workers=SIM_WORKERS)
+    return _sim_pool
+
+def score_array(finals, T_value: int):
+    """score() para um ndarray inteiro de finais."""
+    return np.where(finals < T_value, 0, 1 + (finals - T_value) // 4)
+
+def apply_wild_to_best_slot_batch(trait_finals, wild_finals, T_value, trait_firsts, wild_firsts):
+    """
+    apply_wild_to_best_slot para vários grupos de uma vez (uma linha por grupo).
+    Retorna (eff_finals, crit_idx), com crit_idx = -1 onde não há crítica.
+    """
+    base = score_array(trait_finals, T_value)
+    alt_vals = np.maximum(trait_finals, wild_finals[:, None])
+    improvements = score_array(alt_vals, T_value) - base
+    best_imp = improvements.max(axis=1)
+    # Entre os de maior melhora, o de menor score base (arruma falha primeiro)
+    key = np.where(improvements == best_imp[:, None], base, np.iinfo(base.dtype).max)
+    used = key.argmin(axis=1)
+    rows = np.flatnonzero(best_imp > 0)
+    eff_finals = trait_finals.copy()
+    eff_finals[rows, used[rows]] = alt_vals[rows, used[rows]]
+
+    ones = trait_firsts == 1
+    crit_idx = np.where((wild_firsts == 1) & ones.any(axis=1), ones.argmax(axis=1), -1)
+    return eff_finals, crit_idx
+
+def simulate_batch(cmd, trials: int, seed):
+    """
+    Roda o comando `trials` vezes (dentro de um processo do pool).
+    Retorna (trials, hist. de sucessos, hist. de ampliações somadas, rolagens com crítica).
+    Falha crítica conta como falha.
+    """
+    # Sempre PCG64: a simulação sorteia milhões de dados por lote
+    rng = make_dice("numpy", seed)
+    mod_all, T_value = cmd.mod, cmd.target
+    if isinstance(cmd, DamageCommand):
+        n = cmd.instances
+        raw_sums, _ = roll_damage_batch(trials * n, cmd.terms, with_chains=False, rng=rng)
+        finals = (raw_sums + mod_all).reshape(trials, n)
+        crit = np.zeros((trials, n), dtype=bool)
+    elif cmd.individual:
+        n = cmd.count
+        t_totals, t_firsts, _ = roll_ace_batch(trials * n, cmd.die, False, rng)
+        w_totals, w_firsts, _ = roll_ace_batch(trials * n, cmd.wild, False, rng)
+        finals = (np.maximum(t_totals, w_totals) + mod_all).reshape(trials, n)
+        crit = ((t_firsts == 1) & (w_firsts == 1)).reshape(trials, n)
+    else:
+        n = cmd.count
+        t_totals, t_firsts, _ = roll_ace_batch(trials * n, cmd.die, False, rng)
+        w_totals, w_firsts, _ = roll_ace_batch(trials, cmd.wild, False, rng)
+        finals, crit_idx = apply_wild_to_best_slot_batch(
+            (t_totals + mod_all).reshape(trials, n), w_totals + mod_all, T_value,
+            t_firsts.reshape(trials, n), w_firsts
+        )
+        crit = np.zeros((trials, n), dtype=bool)
+        rows = np.flatnonzero(crit_idx >= 0)
+        crit[rows, crit_idx[rows]] = True
+
+    scores = np.where(crit, 0, score_array(finals, T_value))
+    successes = (scores > 0).sum(axis=1)
+    raises = np.maximum(scores - 1, 0).sum(axis=1)
+    return trials, np.bincount(successes, minlength=n + 1), np.bincount(raises), int(crit.any(axis=1).sum())
+
+async def run_simulation(cmd, trials: int):
+    """
+    Espalha `trials` rolagens em lotes pelo pool, sem bloquear o event loop.
+    Para no que terminar primeiro: todas as rolagens ou SIM_TIME_BUDGET.
+    Retorna (feitas, hist. sucessos, hist. ampliações, críticas, segundos).
+    """
+    batch = max(1, SIM_DICE_PER_BATCH // command_cost(cmd))
+
+    pool = get_sim_pool()
+    seeds = np.random.SeedSequence()
+    start = time.perf_counter()
+    deadline = start + SIM_TIME_BUDGET
+
+    done_trials, crits = 0, 0
+    success_hist = np.zeros(1, dtype=np.int64)
+    raise_hist = np.zeros(1, dtype=np.int64)
+    submitted = 0
+    pending = set()
+    while True:
+        while submitted < trials and len(pending) < 2 * SIM_WORKERS:
+            size = min(batch, trials - submitted)
+            future = pool.submit(simulate_batch, cmd, size, seeds.spawn(1)[0])
+            pending.add(asyncio.wrap_future(future))
+            submitted += size
+        timeout = deadline - time.perf_counter()
+        if not pending or timeout <= 0:
+            break
+        done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        for fut in done:
+            n_trials, s_hist, r_hist, n_crits = fut.result()
+            done_trials += n_trials
+            crits += n_crits
+            success_hist = _add_hist(success_hist, s_hist)
+            raise_hist = _add_hist(raise_hist, r_hist)
+
+    for fut in pending:
+        fut.cancel()
+    return done_trials, success_hist, raise_hist, crits, time.perf_counter() - start
+
+def build_sim_embed(cmd, requested: int, done_trials: int, success_hist, raise_hist, crits: int, elapsed: float):
+    n = len(success_hist) - 1
+    probs = success_hist / max(done_trials, 1)
+    embed = discord.Embed(
+        title=f"🎲 Simulação · {done_trials:,} rolagens",
+        description=" | ".join(describe_command(cmd)),
+        color=0x3498DB
+    )
+
+    lines = [f"{k}/{n}: **{fmt_pct(p)}**" for k, p in enumerate(probs) if p > 0]
+    embed.add_field(name="Sucessos por rolagem", value="\n".join(lines) or "—", inline=False)
+
+    raise_probs = raise_hist / max(done_trials, 1)
+    mean_raises = float((np.arange(len(raise_hist)) * raise_probs).sum())
+    lines = [f"Média: **{mean_raises:.2f}**"]
+    # Uma linha por valor só no miolo da distribuição (sem SIM_RAISE_TAIL de cada
+    # ponta), em até SIM_RAISE_LINES linhas; as pontas viram "<N" e "N+". Com
+    # muitas ampliações prováveis, cada linha do miolo junta vários valores
+    cdf = np.cumsum(raise_probs)
+    lo = int(np.searchsorted(cdf, SIM_RAISE_TAIL, side="right"))
+    hi = int(np.searchsorted(cdf, 1 - SIM_RAISE_TAIL))
+    hi = min(max(hi, lo), len(raise_probs) - 1)
+    width = -(-(hi - lo + 1) // SIM_RAISE_LINES)
+    head, tail = raise_probs[:lo].sum(), raise_probs[hi + 1:].sum()
+    if head >= ODDS_MIN_SHOWN:
+        lines.append(f"🏅x<{lo}: **{fmt_pct(head)}**")
+    for a in range(lo, hi + 1, width):
+        b = min(a + width, hi + 1) - 1
+        label = f"🏅x{a}" if a == b else f"🏅x{a}–{b}"
+        lines.append(f"{label}: **{fmt_pct(raise_probs[a:b + 1].sum())}**")
+    if tail >= ODDS_MIN_SHOWN:
+        lines.append(f"🏅x{hi + 1}+: **{fmt_pct(tail)}**")
+    embed.add_field(name="Ampliações (soma por rolagem)", value="\n".join(lines), inline=False)
+
+    if isinstance(cmd, TraitCommand):
+        embed.add_field(name="Falha Crítica", value=f"**{fmt_pct(crits / max(done_trials, 1))}** das rolagens", inline=False)
+
+    rate = done_trials / elapsed if elapsed > 0 else 0.0
+    footer = f"{done_trials:,} rolagens em {elapsed:.2f}s · {rate:,.0f} rolagens/s"
+    if done_trials < requested:
+        footer += f" · limite de tempo ({SIM_TIME_BUDGET:g}s)"
+    embed.set_footer(text=footer)
+    return embed
+
+def parse_sim_args(args: str):
+    """`<rolagens> <comando>` -> (rolagens, comando), ou None."""
+    trials_str, _, rest = args.strip().partition(" ")
+    if not trials_str.isdigit() or int(trials_str) < 1:
+        return None
+    cmd = parse_command(rest)
+    if cmd is None or isinstance(cmd, AreaDamageCommand):
+        return None
+    return min(int(trials_str), SIM_MAX_TRIALS), cmd
+
+def sim_cost(args: str) -> int:
+    parsed = parse_sim_args(args)
+    return parsed[0] * command_cost(parsed[1]) if parsed else 0
+
+async def cmd_sim(args: str):
+    parsed = parse_sim_args(args)
+    if parsed is None:
+        return f"❌ Use `!sim <rolagens> <comando>`, ex.: `!sim 100000 4s8 DS10 T6` (máx. {SIM_MAX_TRIALS:,})."
+    trials, cmd = parsed
+    count = cmd.instances if isinstance(cmd, DamageCommand) else cmd.count
+    if count < 1 or count > MAX_COUNT:
+        return f"❌ Quantidade inválida. Use 1 a {MAX_COUNT}."
+    done_trials, success_hist, raise_hist, crits, elapsed = await run_simulation(cmd, trials)
+    return build_sim_embed(cmd, trials, done_trials, success_hist, raise_hist, crits, elapsed)
+
+# ------------------------------------------------------------
+# HELP
+# ------------------------------------------------------------
+def build_help_embed():
+    e = discord.Embed(
+        title="Comandos Disponíveis",
+        description="Sintaxe resumida (maiúsculas/minúsculas tanto faz).",
+        color=0x3498DB
+    )
+    e.add_field(
+        name="Testes com Selvagem (modelo SWADE)",
+        value=(
+            "**Grupo (um selvagem p/ o conjunto):**\n"
+            "`[N]s<lado> [±mod] [T<dif>] [DS<6|8|10|12>]`\n"
+            "• Ex.: `s8`, `3s6 +2`, `2s10 T6`, `4s8 DS10`\n"
+            "• Título mostra um token por teste (✅/❌/💀 e 🏅xN)\n"
+            "• `DS` troca o dado selvagem só nesta jogada\n\n"
+            "**Individuais (#):**\n"
+            "`N#s<lado> [±mod] [T<dif>] [DS<6|8|10|12>]`\n"
+            "• Ex.: `3#s10`, `5#s6 +1 T6 DS8`\n"
+            "• Cada teste tem seu próprio selvagem\n"
+            f"• Acima de {MAX_COUNT} testes (até {MAX_BIG_COUNT:,}) vem um resumo: histograma, sucessos, críticas e maiores"
+        ),
+        inline=False
+    )
+    e.add_field(
+        name="Dano / Extras (SEM selvagem) — com Dif",
+        value=(
+            "**Uma rolagem:**\n"
+            "`XdY [± WdZ ...] [±mod] [T<dif>]`\n"
+            "• Ex.: `2d6 +1`, `d10 T6`, `2d6 + d8`, `3d8 + 2d6 -2 T5`, `2d8 - d6 + d4`\n"
+            "• `k<N>` mantém os N maiores do termo: `4d6k3` (os outros aparecem riscados)\n"
+            "_Obs.: o modificador aplica **uma vez no total**._\n\n"
+            "**Várias rolagens:**\n"
+            "`M#XdY [± WdZ ...] [±mod] [T<dif>]` ou `M#(expressão) [±mod] [T<dif>]`\n"
+            "• Ex.: `4#2d6 +1`, `3#(2d6 + d8) -2 T6`, `5#d12 T4`\n"
+            f"• Acima de {MAX_COUNT} rolagens (até {MAX_BIG_COUNT:,}) vem um resumo\n"
+            "**Títulos de dano mostram emote e número** (ex.: `✅ 🏅x2 · 17`)."
+        ),
+        inline=False
+    )
+    e.add_field(
+        name="Dano em área",
+        value=(
+            "`[#]<dano> vs <R>[x<quantos>], ...` — um dano contra a Resistência de cada alvo\n"
+            "• Ex.: `3d6 vs 5,6,8`, `2d6+d8 vs 5x12,8`, `#2d6 vs 4x500`\n"
+            "• Sem `#`: uma rolagem para todos; com `#`: uma por alvo\n"
+            "• Sucesso deixa 😵 Abalado; cada ampliação é 🩸 um ferimento\n"
+            f"• Acima de {MAX_COUNT} alvos a tabela agrupa por Resistência (até {MAX_BIG_COUNT:,} alvos)"
+        ),
+        inline=False
+    )
+    e.add_field(
+        name="Várias rolagens numa mensagem",
+        value=(
+            f"Separe com `;` ou quebra de linha (até {MAX_COMMANDS_PER_MESSAGE}); tudo volta numa resposta só.\n"
+            "Um trecho só com `T<dif>`/`DS<n>` vale para todas as rolagens.\n"
+            "• Ex.: `s8 +1; 2d6+d8`, `3s6; s10 +2; T6 DS8`"
+        ),
+        inline=False
+    )
+    e.add_field(
+        name="Chances e simulação",
+        value=(
+            "`!odds <rolagem>` — probabilidade de falha, sucesso, cada ampliação e falha crítica\n"
+            "• Ex.: `!odds 3s8+2 T6 DS10`, `!odds 2d6+d8 T5`, `!odds 3#s10`\n"
+            f"`!sim <rolagens> <rolagem>` — simula até {SIM_MAX_TRIALS:,} rolagens\n"
+            "• Ex.: `!sim 100000 4s8 DS10 T6`"
+        ),
+        inline=False
+    )
+    e.add_field(
+        name="Iniciativa (baralho de ação)",
+        value=(
+            "`!init deal <nome>, <nome> x<quantos>, ...` — começa o combate e dá uma carta a cada um\n"
+            "`!init deal` — nova rodada com os mesmos combatentes\n"
+            "`!init redraw <nome>` troca de carta (fica com a melhor) · `!init hold <nome>` põe/tira da espera\n"
+            "`!init shuffle` embaralha · `!init` mostra a ordem · `!init fim` encerra\n"
+            "• Ex.: `!init deal Ana, Beto, Orc x6`\n"
+            "• Saiu Coringa: o baralho é embaralhado antes da rodada seguinte"
+        ),
+        inline=False
+    )
+    e.add_field(
+        name="Slash commands",
+        value=(
+            "`/s`, `/dano`, `/odds s` e `/odds dano` fazem o mesmo com campos para preencher\n"
+            "• Ex.: `/s dado:d8 quantidade:3 mod:2 dif:6`, `/dano dado:d6 quantidade:2 dado2:d8`"
+        ),
+        inline=False
+    )
+    e.add_field(
+        name="Dicas",
+        value=(
+            "• `Dif` padrão é **4**; mude com `T<valor>`.\n"
+            "• `!config` mostra/muda os padrões do canal: `dif`, `selvagem`, `saida compacta|texto`, `limite` (quem gerencia o canal).\n"
+            "• `DS<8|10|12>` muda o dado selvagem só na jogada (ignorado em dano).\n"
+            "• Explosões aparecem **em negrito** dentro dos colchetes.\n"
+            "• Com semente no rodapé, `!replay <semente> <rolagem>` repete exatamente a mesma rolagem.\n"
+            "• `!stats` mostra seus testes por dado (sucessos, ampliações, críticas); `!stats canal` os do canal."
+        ),
+        inline=False
+    )
+    return e
+
+# ------------------------------------------------------------
+# BOT
+# ------------------------------------------------------------
+@client.event
+async def on_ready():
+    print(f"Logado como {client.user} (id: {client.user.id})")
+    print("Uso rápido:")
+    print("  • Teste grupo: [N]s<lado> [±mod] [T<dif>] [DS<6|8|10|12>]")
+    print("  • Teste individuais: N#s<lado> [±mod] [T<dif>] [DS<6|8|10|12>]")
+    print("  • Dano: XdY [± WdZ ...] [±mod] [T<dif>]   |   M#(expressão) [±mod] [T<dif>]   |   k<N>: N maiores")
+    print("  • Chances: !odds <rolagem>   |   Simulação: !sim <rolagens> <rolagem>")
+    print("  • !help para ver tudo")
+    print("  • Slash: /s, /dano, /odds" + ("" if TEXT_COMMANDS else " (comandos de texto desligados)"))
+    if isinstance(client, discord.AutoShardedClient):
+        print(f"Shards {sorted(client.shards)} de {client.shard_count}")
+
+# Saúde dos shards no log
+@client.event
+async def on_shard_connect(shard_id: int):
+    log.info("shard %s: conectado", shard_id)
+
+@client.event
+async def on_shard_ready(shard_id: int):
+    log.info("shard %s: pronto", shard_id)
+
+@client.event
+async def on_shard_resumed(shard_id: int):
+    log.info("shard %s: sessão retomada", shard_id)
+
+@client.event
+async def on_shard_disconnect(shard_id: int):
+    log.warning("shard %s: desconectado", shard_id)
+
+async def log_shard_health():
+    """A cada HEALTH_LOG_INTERVAL: latência e servidores de cada shard."""
+    await client.wait_until_ready()
+    while not client.is_closed():
+        guilds_per_shard = Counter(guild.shard_id for guild in client.guilds)
+        if isinstance(client, discord.AutoShardedClient):
+            for shard_id, latency in client.latencies:
+                shard = client.get_shard(shard_id)
+                state = "fechado" if shard is None or shard.is_closed() else "ok"
+                log.info("shard %s: %s | latência %.0f ms | %d servidor(es)",
+                         shard_id, state, latency * 1000, guilds_per_shard[shard_id])
+        else:
+            log.info("latência %.0f ms | %d servidor(es)", client.latency * 1000, len(client.guilds))
+        await asyncio.sleep(HEALTH_LOG_INTERVAL)
+
+# ------------------------------------------------------------
+# Execução dos comandos
+# ------------------------------------------------------------
+def roll_trait_individuals(cmd: TraitCommand, rng=None) -> TraitIndividualsResult:
+    """N#sX: cada teste com seu próprio selvagem."""
+    mod_all = cmd.mod
+    trait_totals, trait_chains = roll_aces(cmd.count, cmd.die, rng)
+    wild_totals,  wild_chains  = roll_aces(cmd.count, cmd.wild, rng)
+    tests = [
+        TraitTest(trait_rolls, trait_total + mod_all, wild_rolls, wild_total + mod_all,
+                  trait_rolls[0] == 1 and wild_rolls[0] == 1)
+        for trait_total, trait_rolls, wild_total, wild_rolls in zip(
+            trait_totals, trait_chains, wild_totals, wild_chains
+        )
+    ]
+    return TraitIndividualsResult(cmd, tests)
+
+def roll_trait_group(cmd: TraitCommand, rng=None) -> TraitGroupResult:
+    """[N]sX: um selvagem para o conjunto, aplicado ao teste que mais ganha com ele."""
+    wild_total, wild_rolls = roll_ace(cmd.wild, rng)
+    totals, chains = roll_aces(cmd.count, cmd.die, rng)
+    finals, used_idx, crit_idx = apply_wild_to_best_slot(
+        [t + cmd.mod for t in totals], wild_total + cmd.mod, cmd.target, [c[0] for c in chains], wild_rolls[0]
+    )
+    return TraitGroupResult(cmd, wild_total, wild_rolls, totals, chains, finals, used_idx, crit_idx)
+
+def command_cost(cmd) -> int:
+    """Estimativa do custo de um comando: quantos dados (sem contar explosões)."""
+    if isinstance(cmd, DamageCommand):
+        return cmd.instances * sum(term.count for term in cmd.terms)
+    if isinstance(cmd, AreaDamageCommand):
+        # Mais um por alvo: a comparação com a Resistência
+        dice = sum(term.count for term in cmd.terms)
+        return (dice + 1) * cmd.count if cmd.individual else dice + cmd.count
+    return cmd.count * 2 if cmd.individual else cmd.count + 1
+
+def command_type(cmd) -> str:
+    """Rótulo do comando nas métricas: trait/damage/area + group/individual/big."""
+    if isinstance(cmd, DamageCommand):
+        kind, count = "damage", cmd.instances
+    else:
+        kind, count = ("area" if isinstance(cmd, AreaDamageCommand) else "trait"), cmd.count
+    if not cmd.individual:
+        return f"{kind}_group"
+    return f"{kind}_big" if count > MAX_COUNT else f"{kind}_individual"
+
+def execute_command(cmd, seed: int | None = None, outcomes: list | None = None,
+                    config: ChannelConfig = DEFAULT_CONFIG):
+    """
+    Rola e monta a resposta: discord.Embed (str na saída `texto` do canal),
+    ou str com a mensagem de erro. Com `seed` (ou ROLL_SEEDS), usa um gerador
+    só desta rolagem e mostra a semente. Com `outcomes`, acrescenta nela o
+    desfecho (render_json): é daí que saem o histórico e as estatísticas.
+    """
+    if seed is None and ROLL_SEEDS:
+        seed = new_seed()
+    result = roll_command(cmd, None if seed is None else make_dice(RNG_BACKEND, seed), config)
+    if isinstance(result, str):
+        return result
+    if outcomes is not None:
+        outcome = render_json(result)
+        if seed is not None:
+            outcome["seed"] = seed
+        outcomes.append(outcome)
+    if config.text:
+        reply = render_text(result)
+        return reply if seed is None else f"{reply}\n{seed_note(seed)}"
+    reply = render_embed(result, config.compact)
+    if seed is not None:
+        add_seed_footer(reply, seed)
+    return reply
+
+def command_error(cmd, config: ChannelConfig = DEFAULT_CONFIG):
+    """Mensagem de erro se o comando passa dos limites (do canal, em N# e alvos); None se pode rolar."""
+    if command_cost(cmd) > MAX_COMMAND_COST:
+        return f"❌ Rolagem grande demais: no máximo {MAX_COMMAND_COST:,} dados por comando."
+    if isinstance(cmd, AreaDamageCommand):
+        if cmd.count > config.max_big:
+            return f"❌ Alvos demais. Use até {config.max_big}."
+    elif cmd.individual:
+        count = cmd.instances if isinstance(cmd, DamageCommand) else cmd.count
+        if count < 1 or count > config.max_big:
+            return f"❌ Quantidade inválida. Use 1 a {config.max_big}."
+    elif isinstance(cmd, TraitCommand) and not 1 <= cmd.count <= MAX_COUNT:
+        return f"❌ Quantidade inválida. Use 1 a {MAX_COUNT}."
+    return None
+
+def roll_command(cmd, rng=None, config: ChannelConfig = DEFAULT_CONFIG):
+    """
+    Rola o comando: TraitGroupResult, TraitIndividualsResult, DamageResult,
+    AreaDamageResult ou BigRollSummary (N# acima do limite do canal), ou
+    str de erro (command_error). `config` traz os limites de N# do canal (no
+    dano em área, de alvos).
+    """
+    error = command_error(cmd, config)
+    if error:
+        return error
+    if isinstance(cmd, AreaDamageCommand):
+        return roll_area_damage(cmd, cmd.count <= config.max_count, rng)
+    if cmd.individual:
+        count = cmd.instances if isinstance(cmd, DamageCommand) else cmd.count
+        if count > config.max_count:
+            return roll_big_individuals(cmd, rng)
+    if isinstance(cmd, DamageCommand):
+        return roll_damage(cmd, rng)
+    if cmd.individual:
+        return roll_trait_individuals(cmd, rng)
+    return roll_trait_group(cmd, rng)
+
+# ------------------------------------------------------------
+# Renderização: embed, texto puro e JSON (desfecho) de um resultado
+# ------------------------------------------------------------
+MAX_TEXT_CHARS = 2000   # conteúdo de uma mensagem do Discord
+
+def render_embed(result, compact: bool = False) -> discord.Embed:
+    if isinstance(result, AreaDamageResult):
+        return build_area_embed(result)
+    if isinstance(result, TraitGroupResult):
+        return build_group_embed(result)
+    if isinstance(result, TraitIndividualsResult):
+        return build_individuals_embed(result, compact)
+    if isinstance(result, DamageResult):
+        if result.cmd.individual:
+            return build_damage_individuals_embed(result, compact)
+        return build_damage_group_embed(result)
+    return build_big_summary_embed(result)
+
+def damage_parts_text(roll: DamageRoll) -> str:
+    """`d6 [3] [**6**, 2] d8 [5]`; dados descartados pelo k riscados."""
+    out = []
+    for part in roll.parts:
+        die = part.term.die
+        dice = " ".join(
+            f"~~{fmt_rolls(rolls, die)}~~" if k in part.dropped else fmt_rolls(rolls, die)
+            for k, rolls in enumerate(part.rolls)
+        )
+        out.append(f"{damage_term_label(part.term)} {dice}")
+    return " ".join(out)
+
+def render_text(result) -> str:
+    """
+    Resposta em texto puro (!config saida texto): o comando com os tokens do
+    título e uma linha curta de dados, sem a estrutura do embed.
+    """
+    cmd = result.cmd
+    lines = [f"`{command_text(cmd)}` {join_tokens(title_tokens(result))}"]
+    if isinstance(result, TraitGroupResult):
+        trait = " ".join(fmt_rolls(rolls, cmd.die) for rolls in result.trait_rolls)
+        line = f"selv {fmt_rolls(result.wild_rolls, cmd.wild)} · d{cmd.die} {trait} ⇒ **{max(result.finals)}**"
+        if result.used_idx is not None and cmd.count > 1:
+            line += f" (selvagem no #{result.used_idx + 1})"
+        lines.append(line)
+    elif isinstance(result, TraitIndividualsResult):
+        lines.extend(
+            f"#{i} {fmt_rolls(t.trait_rolls, cmd.die)} / {fmt_rolls(t.wild_rolls, cmd.wild)} ⇒ **{t.final}**"
+            for i, t in enumerate(result.tests, start=1)
+        )
+    elif isinstance(result, DamageResult):
+        if cmd.individual:
+            lines.extend(f"#{i} {damage_parts_text(r)} ⇒ **{r.final}**" for i, r in enumerate(result.rolls, start=1))
+        else:
+            lines.append(f"{damage_parts_text(result.rolls[0])} ⇒ **{result.rolls[0].final}**")
+    elif isinstance(result, AreaDamageResult):
+        if result.roll is not None:
+            lines.append(f"{damage_parts_text(result.roll)} ⇒ **{result.roll.final}**")
+        lines.extend(area_lines(result))
+    else:
+        lines.append(f"Final médio: **{result.sum_finals / result.count:.2f}**")
+    text = "\n".join(lines)
+    return text if len(text) <= MAX_TEXT_CHARS else text[:MAX_TEXT_CHARS - 1] + "…"
+
+def pack_text(replies, limit: int = MAX_TEXT_CHARS):
+    """Junta respostas em texto no menor número de mensagens de até `limit` caracteres."""
+    messages, current = [], ""
+    for reply in replies:
+        if current and len(current) + len(reply) + 1 > limit:
+            messages.append(current)
+            current = ""
+        current = f"{current}\n{reply}" if current else reply
+    if current:
+        messages.append(current)
+    return messages
+
+# Desfecho (render_json): um dict por comando, pronto para json.dumps, com
+# type, expr, die, wild, target, count (testes/instâncias), finals (lista,
+# ou None nas grandes), crit_idx (testes com falha crítica), successes,
+# raises (soma), crits, wild_saves (falhas que o selvagem virou sucesso) e
+# dice (faces sorteadas). O histórico e as estatísticas usam este dict.
+# No dano em área: successes = alvos afetados, raises = ferimentos, e mais
+# targets ([resistência, quantos], ...) e effects (por alvo, se detalhado).
+def command_text(cmd) -> str:
+    """Texto canônico do comando, do jeito que se digita (`3#s8 +1 T6 DS10`)."""
+    if isinstance(cmd, AreaDamageCommand):
+        targets = ",".join(f"{r}x{n}" if n > 1 else str(r) for r, n in cmd.targets)
+        mod = f" {cmd.mod:+d}" if cmd.mod else ""
+        return f"{'#' if cmd.individual else ''}{format_terms(cmd.terms)}{mod} vs {targets}"
+    if isinstance(cmd, DamageCommand):
+        expr = format_terms(cmd.terms)
+        if cmd.individual:
+            expr = f"{cmd.instances}#" + (f"({expr})" if len(cmd.terms) > 1 else expr)
+    else:
+        expr = f"{cmd.count}#s{cmd.die}" if cmd.individual else f"{cmd.count}s{cmd.die}"
+    parts = [expr]
+    if cmd.mod:
+        parts.append(f"{cmd.mod:+d}")
+    parts.append(f"T{cmd.target}")
+    if isinstance(cmd, TraitCommand) and cmd.wild != WILD_DEFAULT:
+        parts.append(f"DS{cmd.wild}")
+    return " ".join(parts)
+
+def _outcome(cmd, count: int, finals, crit_idx=(), wild_saves: int = 0, dice=None,
+             successes: int | None = None, raises: int | None = None, crits: int | None = None):
+    T_value = None if isinstance(cmd, AreaDamageCommand) else cmd.target
+    if successes is None:
+        # Crítica conta como falha
+        ok = [v for i, v in enumerate(finals) if v >= T_value and i not in crit_idx]
+        successes = len(ok)
+        raises = sum((v - T_value) // 4 for v in ok)
+    trait = isinstance(cmd, TraitCommand)
+    return {
+        "type": command_type(cmd), "expr": command_text(cmd),
+        "die": cmd.die if trait else None, "wild": cmd.wild if trait else None, "target": T_value,
+        "count": count, "finals": finals, "crit_idx": crit_idx,
+        "successes": successes, "raises": raises, "crits": len(crit_idx) if crits is None else crits,
+        "wild_saves": wild_saves, "dice": dice,
+    }
+
+def render_json(result) -> dict:
+    cmd = result.cmd
+    if isinstance(result, AreaDamageResult):
+        _, shaken, wounded, wounds = effect_counts(result.effects)
+        dice = None if result.roll is None else [[part.rolls for part in result.roll.parts]]
+        outcome = _outcome(cmd, cmd.count, result.finals.tolist() if result.detailed else None, dice=dice,
+                           successes=shaken + wounded, raises=wounds, crits=0)
+        outcome["targets"] = [[r, n] for r, n in cmd.targets]
+        outcome["effects"] = result.effects.tolist() if result.detailed else None
+        return outcome
+    if isinstance(result, TraitGroupResult):
+        used = result.used_idx
+        saved = used is not None and result.trait_totals[used] + cmd.mod < cmd.target <= result.finals[used]
+        crit_idx = () if result.crit_idx is None else (result.crit_idx,)
+        return _outcome(cmd, cmd.count, result.finals, crit_idx, int(saved),
+                        {"wild": result.wild_rolls, "trait": result.trait_rolls})
+    if isinstance(result, TraitIndividualsResult):
+        T_value, tests = cmd.target, result.tests
+        crit_idx = tuple(i for i, t in enumerate(tests) if t.crit)
+        saves = sum(1 for t in tests if not t.crit and t.trait_final < T_value <= t.wild_final)
+        return _outcome(cmd, cmd.count, [t.final for t in tests], crit_idx, saves,
+                        [{"trait": t.trait_rolls, "wild": t.wild_rolls} for t in tests])
+    if isinstance(result, DamageResult):
+        dice = [[part.rolls for part in r.parts] for r in result.rolls]
+        return _outcome(cmd, len(result.rolls), [r.final for r in result.rolls], dice=dice)
+    return _outcome(cmd, result.count, None, successes=result.successes,
+                    raises=result.total_raises, crits=result.crits)
+
+def seed_note(seed: int) -> str:
+    return f"🎲 semente {seed} ({RNG_BACKEND}) · !replay {seed} …"
+
+def add_seed_footer(embed: discord.Embed, seed: int):
+    note = seed_note(seed)
+    text = embed.footer.text
+    embed.set_footer(text=f"{text} · {note}" if text else note)
+
+def parse_replay_args(args: str, target: int = T_DEFAULT, wild: int = WILD_DEFAULT):
+    """`<semente> <rolagem>` -> (semente, comando), ou None. `target`/`wild` como em parse_command."""
+    seed, _, rest = args.strip().partition(" ")
+    if not seed.isdigit():
+        return None
+    cmd = parse_command(rest.strip(), target, wild)
+    return (int(seed), cmd) if cmd else None
+
+def replay_cost(args: str) -> int:
+    parsed = parse_replay_args(args)
+    cost = command_cost(parsed[1]) if parsed else 0
+    return cost if cost <= MAX_COMMAND_COST else 0   # recusado na hora, como em run_commands
+
+async def cmd_replay(message, args: str):
+    """Repete a rolagem com a config do canal (dif, selvagem, limites, saída), como a original."""
+    config = await channel_config(message.channel.id)
+    parsed = parse_replay_args(args, config.target, config.wild)
+    if parsed is None:
+        return "❌ Use `!replay <semente> <rolagem>`, com a semente do rodapé, ex.: `!replay 123456 3s8 +1`."
+    seed, cmd = parsed
+    return await asyncio.get_running_loop().run_in_executor(
+        scheduler.pool, execute_command, cmd, seed, None, config
+    )
+
+def build_error_embed(text: str):
+    return discord.Embed(description=text, color=0xE24C4B)
+
+def execute_commands(cmds, source=None, config: ChannelConfig = DEFAULT_CONFIG):
+    """
+    Várias rolagens de uma mensagem. Com mais de uma, os erros viram embed
+    para irem todos na mesma resposta; na saída `texto`, tudo vai junto em
+    o mínimo de mensagens. Os desfechos vão para as estatísticas (e o
+    histórico, se ligado) em nome de `source` (Message/Interaction).
+    """
+    run = execute_command_timed if metrics else execute_command
+    outcomes = [] if source is not None else None
+    results = [run(cmd, None, outcomes, config) for cmd in cmds]
+    if outcomes:
+        record_outcomes(source, outcomes)
+    if config.text:
+        return pack_text(results)
+    if len(results) > 1:
+        results = [build_error_embed(r) if isinstance(r, str) else r for r in results]
+    return results
+
+def execute_command_timed(cmd, seed: int | None = None, outcomes: list | None = None,
+                          config: ChannelConfig = DEFAULT_CONFIG):
+    """execute_command medindo as fases: rolagem (tempo dentro de roll_ace_batch) e o resto (embed)."""
+    type_ = command_type(cmd)
+    metrics.reset_roll_time()
+    t0 = time.perf_counter()
+    result = execute_command(cmd, seed, outcomes, config)
+    elapsed = time.perf_counter() - t0
+    roll = metrics.roll_time()
+    metrics.phase("roll", type_, roll)
+    metrics.phase("embed", type_, max(0.0, elapsed - roll))
+    metrics.inc("swade_commands_total", type=type_)
+    # Na saída texto a resposta também é str; erro é o que começa com ❌
+    if isinstance(result, str) and result.startswith("❌"):
+        metrics.inc("swade_command_errors_total", type=type_)
+    return result
+
+def source_ids(source):
+    """(servidor, canal, usuário) de uma Message ou Interaction; servidor None em DM."""
+    user = getattr(source, "author", None) or source.user
+    guild, channel = source.guild, source.channel
+    return (guild.id if guild else None), (channel.id if channel else None), user.id
+
+def record_outcomes(source, outcomes):
+    guild_id, channel_id, user_id = source_ids(source)
+    now = time.time()
+    for outcome in outcomes:
+        if history:
+            history.log(now, guild_id, channel_id, user_id, outcome)
+        stats.record(user_id, channel_id, outcome, now)
+
+# ------------------------------------------------------------
+# Agendador: trabalho pesado fora do event loop, com fila limitada
+# ------------------------------------------------------------
+INLINE_COST_LIMIT = 64                # até aqui roda direto no event loop
+MAX_COMMAND_COST = 2_000_000          # acima disso o comando é recusado (nem entra na fila)
+MAX_QUEUED_COST_PER_CHANNEL = 400_000  # dados na fila por canal
+MAX_QUEUED_COST_PER_GUILD = 1_600_000  # dados na fila por servidor
+ROLL_WORKERS = int(os.getenv("ROLL_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+
+class RollScheduler:
+    """
+    Manda comandos caros para um pool de threads e limita o custo na fila
+    por canal e por servidor. Um comando sozinho sempre entra (mesmo acima
+    do limite); com a fila cheia, a resposta é o embed de "ocupado".
+    """
+
+    def __init__(self, workers: int, per_channel: int, per_guild: int):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rolagem")
+        self.per_channel = per_channel
+        self.per_guild = per_guild
+        self.channel_cost = {}
+        self.guild_cost = {}
+
+    def _fits(self, queued: int, cost: int, limit: int) -> bool:
+        return queued == 0 or queued + cost <= limit
+
+    async def run(self, message, cost: int, fn, *args):
+        """Executa fn(*args) (no pool, ou aguardando se for corrotina) ou devolve o embed de ocupado."""
+        channel_id = message.channel.id
+        guild_id = message.guild.id if message.guild else None
+        if not self._fits(self.channel_cost.get(channel_id, 0), cost, self.per_channel):
+            return self._busy("canal")
+        if guild_id is not None and not self._fits(self.guild_cost.get(guild_id, 0), cost, self.per_guild):
+            return self._busy("servidor")
+
+        self.channel_cost[channel_id] = self.channel_cost.get(channel_id, 0) + cost
+        if guild_id is not None:
+            self.guild_cost[guild_id] = self.guild_cost.get(guild_id, 0) + cost
+        try:
+            if asyncio.iscoroutinefunction(fn):
+                return await fn(*args)
+            return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+        finally:
+            self._release(self.channel_cost, channel_id, cost)
+            if guild_id is not None:
+                self._release(self.guild_cost, guild_id, cost)
+
+    @staticmethod
+    def _busy(scope: str):
+        if metrics:
+            metrics.inc("swade_busy_total", scope=scope)
+        return build_busy_embed(scope)
+
+    @staticmethod
+    def _release(table: dict, key, cost: int):
+        left = table[key] - cost
+        if left:
+            table[key] = left
+        else:
+            del table[key]
+
+def build_busy_embed(scope: str):
+    return discord.Embed(
+        title="⏳ Ocupado",
+        description=f"Muitas rolagens na fila deste {scope}. Tente de novo em alguns segundos.",
+        color=0xE67E22
+    )
+
+scheduler = RollScheduler(ROLL_WORKERS, MAX_QUEUED_COST_PER_CHANNEL, MAX_QUEUED_COST_PER_GUILD)
+
+# ------------------------------------------------------------
+# Envio: fila por canal, junta respostas próximas e respeita o limite
+# ------------------------------------------------------------
+REPLY_COALESCE_WINDOW = 0.15   # segundos esperando outras respostas do canal
+CHANNEL_SEND_RATE = 5          # mensagens por canal...
+CHANNEL_SEND_PER = 5.0         # ...a cada N segundos (balde do Discord)
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+@dataclass(slots=True)
+class ChannelSendQueue:
+    items: deque = field(default_factory=deque)   # (message, result, future)
+    sent: deque = field(default_factory=lambda: deque(maxlen=CHANNEL_SEND_RATE))
+    task: asyncio.Task | None = None
+    wakeup: asyncio.Event = field(default_factory=asyncio.Event)   # chegou item com a fila ociosa
+
+class ReplySender:
+    """
+    Todas as respostas passam por aqui. Cada canal tem uma fila: o que chega
+    dentro de `window` segundos sai numa mensagem só (até 10 embeds /
+    6000 caracteres), respondendo à primeira rolagem; cada embed leva no
+    autor o link da rolagem que o gerou. Os envios por canal respeitam
+    `rate` mensagens a cada `per` segundos.
+    """
+
+    def __init__(self, window: float, rate: int, per: float):
+        self.window = window
+        self.rate = rate
+        self.per = per
+        self.channels = {}
+
+    async def send(self, message, results):
+        """Enfileira um resultado (ou uma lista, que entra junta na fila) e espera o envio."""
+        if not isinstance(results, list):
+            results = [results]
+        channel_id = message.channel.id
+        queue = self.channels.get(channel_id)
+        if queue is None:
+            queue = self.channels[channel_id] = ChannelSendQueue()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for result in results:
+            future = loop.create_future()
+            queue.items.append((message, result, future))
+            futures.append(future)
+        queue.wakeup.set()
+        if queue.task is None:
+            queue.task = asyncio.create_task(self._drain(channel_id, queue))
+        await asyncio.gather(*futures)
+
+    async def _drain(self, channel_id, queue: ChannelSendQueue):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                if not queue.items:
+                    # Segura o balde até esvaziar (ou até chegar outra resposta);
+                    # se nada chegou, libera o canal
+                    if queue.sent:
+                        queue.wakeup.clear()
+                        with contextlib.suppress(asyncio.TimeoutError):
+                            await asyncio.wait_for(queue.wakeup.wait(),
+                                                   max(0.0, queue.sent[-1] + self.per - loop.time()))
+                    if not queue.items:
+                        break
+                if self.window:
+                    await asyncio.sleep(self.window)
+                if len(queue.sent) == self.rate:
+                    await asyncio.sleep(max(0.0, queue.sent[0] + self.per - loop.time()))
+                batch = self._take_batch(queue.items)
+                await self._send_batch(batch)
+                queue.sent.append(loop.time())
+        finally:
+            queue.task = None
+            if not queue.items:
+                self.channels.pop(channel_id, None)
+
+    @staticmethod
+    def _embed_chars(message, embed) -> int:
+        """Tamanho do embed já contando o autor que _send_batch pode pôr nele."""
+        return len(embed) + len(message.author.display_name)
+
+    @staticmethod
+    def _take_batch(items: deque):
+        """Tira da fila o que cabe numa mensagem. Texto (erros) sai sozinho."""
+        batch = [items.popleft()]
+        if isinstance(batch[0][1], str):
+            return batch
+        chars = ReplySender._embed_chars(*batch[0][:2])
+        while items and len(batch) < MAX_EMBEDS_PER_MESSAGE:
+            message, result, _ = items[0]
+            if isinstance(result, str):
+                break
+            size = ReplySender._embed_chars(message, result)
+            if chars + size > MAX_EMBED_CHARS_PER_MESSAGE:
+                break
+            chars += size
+            batch.append(items.popleft())
+        return batch
+
+    async def _send_batch(self, batch):
+        first = batch[0][0]
+        if isinstance(batch[0][1], str):
+            kwargs = {"content": batch[0][1]}
+        else:
+            embeds = [result for _, result, _ in batch]
+            if len({id(message) for message, _, _ in batch}) > 1:
+                for message, embed, _ in batch:
+                    embed.set_author(name=message.author.display_name, url=message.jump_url)
+            kwargs = {"embeds": embeds}
+        t0 = time.perf_counter() if metrics else 0.0
+        try:
+            for attempt in range(2):
+                try:
+                    await first.reply(**kwargs)
+                    break
+                except (discord.HTTPException, discord.RateLimited) as exc:
+                    limited = isinstance(exc, discord.RateLimited) or exc.status == 429
+                    if not limited or attempt:
+                        raise
+                    await asyncio.sleep(getattr(exc, "retry_after", None) or self.per / self.rate)
+        except Exception as exc:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        if metrics:
+            metrics.phase("reply", "embeds" if "embeds" in kwargs else "text", time.perf_counter() - t0)
+        for _, _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+sender = ReplySender(REPLY_COALESCE_WINDOW, CHANNEL_SEND_RATE, CHANNEL_SEND_PER)
+
+# ------------------------------------------------------------
+# Métricas: tempo de rolagem e gauges das filas (só com METRICS_PORT)
+# ------------------------------------------------------------
+def queue_gauges():
+    return {
+        (("queue", "scheduler_cost"),): sum(scheduler.channel_cost.values()),
+        (("queue", "scheduler_channels"),): len(scheduler.channel_cost),
+        (("queue", "sender_items"),): sum(len(q.items) for q in sender.channels.values()),
+        (("queue", "sender_channels"),): len(sender.channels),
+    }
+
+if metrics:
+    # Todas as rolagens passam por roll_ace_batch ou roll_ace_lists (nomes
+    # globais, resolvidos na chamada)
+    roll_ace_batch = metrics.track_roll_time(roll_ace_batch)
+    roll_ace_lists = metrics.track_roll_time(roll_ace_lists)
+    metrics.gauge("swade_queue_depth", "Tamanho das filas do agendador e do envio", queue_gauges)
+    metrics.gauge("swade_stats_entries", "Entradas de estatística em memória (usuários + canais)",
+                  lambda: {(): len(stats.entries)})
+    if history:
+        metrics.gauge("swade_history_rolls", "Histórico: rolagens na fila, gravadas, descartadas e com erro",
+                      lambda: {
+                          (("state", "queued"),): history.queue.qsize(),
+                          (("state", "written"),): history.written,
+                          (("state", "dropped"),): history.dropped,
+                          (("state", "failed"),): history.failed,
+                      })
+
+async def send_result(message: discord.Message, result):
+    await sender.send(message, result)
+
+# ------------------------------------------------------------
+# PROFILER (!profile / SIGUSR1) — amostragem das pilhas por N segundos
+# ------------------------------------------------------------
+PROFILE_DEFAULT_SECONDS = 10
+PROFILE_MAX_SECONDS = 120
+PROFILE_INTERVAL = 0.005
+
+_profile_lock = asyncio.Lock()
+
+async def run_profile(seconds: float):
+    """Captura e grava um profile; (profile, caminhos), ou None se já há uma captura rodando."""
+    if _profile_lock.locked():
+        return None
+    async with _profile_lock:
+        log.info("profile: capturando %.0fs", seconds)
+        profile = await asyncio.to_thread(profiler.capture, seconds, PROFILE_INTERVAL)
+        paths = await asyncio.to_thread(profiler.write, profile, PROFILE_DIR)
+    log.info("profile: gravado em %s e %s", *paths)
+    return profile, paths
+
+async def cmd_profile(args: str):
+    args = args.strip()
+    if args and not args.isdigit():
+        return f"❌ Use `!profile [segundos]` (1 a {PROFILE_MAX_SECONDS})."
+    seconds = min(max(int(args or PROFILE_DEFAULT_SECONDS), 1), PROFILE_MAX_SECONDS)
+    captured = await run_profile(seconds)
+    if captured is None:
+        return "⏳ Já tem uma captura em andamento."
+    profile, (collapsed, text) = captured
+    busy = profile.busy or 1
+    top = "\n".join(
+        f"`{count / busy:6.1%}` {label}" for label, count in profile.own.most_common(8)
+    ) or "(nenhuma amostra trabalhando)"
+    embed = discord.Embed(
+        title=f"🔬 Profile de {seconds}s",
+        description=f"{profile.busy} amostras trabalhando, {profile.idle} esperando",
+        color=0x3498DB
+    )
+    embed.add_field(name="Funções (tempo próprio)", value=top[:1024], inline=False)
+    embed.add_field(name="Arquivos", value=f"`{collapsed}`\n`{text}`", inline=False)
+    return embed
+
+# ------------------------------------------------------------
+# ESTATÍSTICAS (!stats) — agregados por usuário e canal (ver roll_stats.py)
+# ------------------------------------------------------------
+MENTION = re.compile(r"<@!?(\d+)>")
+
+def fmt_stats_hist(hist):
+    labels = ["❌", "✅"] + [f"🏅x{k}" for k in range(1, len(hist) - 2)] + [f"🏅x{len(hist) - 2}+"]
+    last = max((i for i, c in enumerate(hist) if c), default=0)
+    return " · ".join(f"{label} {c}" for label, c in zip(labels[:last + 1], hist))
+
+def build_stats_embed(who: str, rows):
+    tests = sum(r["tests"] for r in rows)
+    successes = sum(r["success_rate"] * r["tests"] for r in rows)
+    embed = discord.Embed(
+        title=f"📊 Estatísticas · ✅ {fmt_pct(successes / tests)}",
+        description=f"{who} | {tests} teste(s) com selvagem",
+        color=0x3498DB
+    )
+    for r in rows:
+        embed.add_field(
+            name=f"d{r['die']}",
+            value=(
+                f"Testes: **{r['tests']}** em {r['rolls']} rolagem(ns) | ✅ **{fmt_pct(r['success_rate'])}**\n"
+                f"🏅 por teste: **{r['raises_per_test']:.2f}** | 💀 **{r['crits']}** | "
+                f"Selvagem salvou: **{r['wild_saves']}**\n"
+                f"Final médio: **{r['mean_final']:.1f}** ± {r['std_final']:.1f}\n"
+                f"{fmt_stats_hist(r['hist'])}"
+            ),
+            inline=False
+        )
+    embed.set_footer(text="Rolagens grandes (resumo) não entram nas estatísticas")
+    return embed
+
+async def cmd_stats(message, args: str):
+    arg = args.strip().lower()
+    mention = MENTION.fullmatch(arg)
+    if not arg:
+        scope, ident, who = "user", message.author.id, message.author.display_name
+    elif arg == "canal":
+        scope, ident, who = "channel", message.channel.id, "Este canal"
+    elif mention:
+        scope, ident, who = "user", int(mention[1]), f"<@{mention[1]}>"
+    else:
+        return "❌ Use `!stats`, `!stats canal` ou `!stats @jogador`."
+    # Pode ler o disco (entrada fora da memória)
+    data = await asyncio.to_thread(stats.lookup, scope, ident)
+    rows = describe_stats(data) if data is not None else []
+    if not rows:
+        return "Nenhum teste com selvagem registrado ainda."
+    return build_stats_embed(who, rows)
+
+async def stats_maintenance():
+    """Snapshot e limpeza das estatísticas a cada STATS_SNAPSHOT_INTERVAL segundos."""
+    while True:
+        await asyncio.sleep(STATS_SNAPSHOT_INTERVAL)
+        try:
+            saved, evicted = await asyncio.to_thread(stats.snapshot)
+        except Exception:
+            log.exception("estatísticas: falha no snapshot")
+            continue
+        if saved or evicted:
+            log.info("estatísticas: %d gravadas, %d fora da memória, %d em memória",
+                     saved, evicted, len(stats.entries))
+
+# ------------------------------------------------------------
+# CONFIG POR CANAL (!config) — ver channel_config.py
+# ------------------------------------------------------------
+CONFIG_USAGE = (
+    "❌ Use `!config`, `!config dif <n>`, `!config selvagem <6|8|10|12>`, "
+    "`!config saida <detalhada|compacta|texto>`, `!config limite <n>`, "
+    "`!config limite_grande <n>` ou `!config reset`."
+)
+
+async def channel_config(channel_id) -> ChannelConfig:
+    """Config do canal: do cache na hora; na falta, lida do disco fora do event loop."""
+    config = channel_configs.get(channel_id)
+    if config is None:
+        if channel_configs.conn is not None:
+            config = await asyncio.to_thread(channel_configs.load, channel_id)
+        else:
+            config = channel_configs.load(channel_id)
+        config = channel_configs.remember(channel_id, config)
+    return config
+
+def can_configure(message) -> bool:
+    """Admins do bot, qualquer um em DM, ou quem pode gerenciar o canal."""
+    if message.author.id in ADMIN_USER_IDS or message.guild is None:
+        return True
+    return message.channel.permissions_for(message.author).manage_channels
+
+def build_config_embed(config: ChannelConfig):
+    return discord.Embed(
+        title="⚙️ Config do canal",
+        description=(
+            f"Dif padrão: **{config.target}** | Dado selvagem: **d{config.wild}**\n"
+            f"Saída: **{'texto' if config.text else 'compacta' if config.compact else 'detalhada'}**\n"
+            f"N# com detalhe até **{config.max_count}**; resumo até **{config.max_big:,}**"
+        ),
+        color=0x3498DB
+    )
+
+def config_change(config: ChannelConfig, key: str, value: str):
+    """Nova config a partir de `!config <chave> <valor>`; str com o erro se não der."""
+    if key == "saida":
+        if value not in ("detalhada", "compacta", "texto"):
+            return "❌ Saída: `detalhada`, `compacta` ou `texto`."
+        return replace(config, compact=value == "compacta", text=value == "texto")
+    if not value.isdigit():
+        return CONFIG_USAGE
+    n = int(value)
+    if key == "dif":
+        if not 1 <= n <= 99:
+            return "❌ Dif entre 1 e 99."
+        return replace(config, target=n)
+    if key == "selvagem":
+        if n not in WILD_DIES:
+            return "❌ Dado selvagem: 6, 8, 10 ou 12."
+        return replace(config, wild=n)
+    if key == "limite":
+        if not 1 <= n <= MAX_COUNT:
+            return f"❌ Limite entre 1 e {MAX_COUNT}."
+        return replace(config, max_count=n, max_big=max(config.max_big, n))
+    if key == "limite_grande":
+        if not 1 <= n <= MAX_BIG_COUNT:
+            return f"❌ Limite grande entre 1 e {MAX_BIG_COUNT:,}."
+        return replace(config, max_big=n, max_count=min(config.max_count, n))
+    return CONFIG_USAGE
+
+async def cmd_config(message, args: str):
+    key, _, value = args.strip().lower().partition(" ")
+    channel_id = message.channel.id
+    config = await channel_config(channel_id)
+    if not key:
+        return build_config_embed(config)
+    if not can_configure(message):
+        return "❌ Só quem pode gerenciar o canal muda a config."
+    if key == "reset":
+        new = DEFAULT_CONFIG
+    else:
+        new = config_change(config, key, value.strip())
+        if isinstance(new, str):
+            return new
+    channel_configs.set(channel_id, new)
+    return build_config_embed(new)
+
+async def config_flush():
+    """Grava as alterações de !config a cada CONFIG_FLUSH_INTERVAL segundos."""
+    while True:
+        await asyncio.sleep(CONFIG_FLUSH_INTERVAL)
+        if not channel_configs.pending:
+            continue
+        try:
+            await asyncio.to_thread(channel_configs.flush)
+        except Exception:
+            log.exception("config: falha gravando alterações")
+
+# ------------------------------------------------------------
+# INICIATIVA (!init) — baralho de ação por canal (ver action_deck.py)
+# ------------------------------------------------------------
+INIT_USAGE = (
+    "❌ Use `!init`, `!init deal <nome>, <nome> x<quantos>, ...`, `!init deal` (nova rodada), "
+    "`!init redraw <nome>`, `!init hold <nome>`, `!init shuffle` ou `!init fim`."
+)
+INIT_ACTIONS = {
+    "deal": "deal", "distribuir": "deal", "rodada": "deal",
+    "redraw": "redraw", "troca": "redraw",
+    "hold": "hold", "espera": "hold",
+    "shuffle": "shuffle", "embaralhar": "shuffle",
+    "fim": "end", "reset": "end",
+}
+INIT_NAME_CHARS = 32
+# Grupo de combatentes: `Orc x12` -> Orc 1 ... Orc 12
+COMBATANT_GROUP = re.compile(r"(.+?)\s+x\s*(\d+)", re.IGNORECASE)
+
+def parse_combatants(text: str):
+    """`Ana, Beto, Orc x3` -> [Ana, Beto, Orc 1, Orc 2, Orc 3]; str com o erro se não der."""
+    names = []
+    for item in text.split(","):
+        item = " ".join(item.split())
+        if not item:
+            continue
+        m = COMBATANT_GROUP.fullmatch(item)
+        if m is None:
+            names.append(item)
+        else:
+            n = int(m[2])
+            if n > DECK_SIZE:
+                return f"❌ No máximo {DECK_SIZE} combatentes (uma carta para cada)."
+            names.extend(f"{m[1]} {k}" for k in range(1, n + 1))
+        if len(names) > DECK_SIZE:
+            return f"❌ No máximo {DECK_SIZE} combatentes (uma carta para cada)."
+    if not names:
+        return INIT_USAGE
+    if any(len(name) > INIT_NAME_CHARS for name in names):
+        return f"❌ Nomes com até {INIT_NAME_CHARS} caracteres."
+    if len({name.casefold() for name in names}) < len(names):
+        return "❌ Nomes repetidos na lista."
+    return names
+
+def build_init_embed(deck, notes=()):
+    """Ordem da rodada num embed só: quem tem carta, da maior para a menor, depois quem está sem."""
+    lines = []
+    for pos, i in enumerate(deck.ranking(), start=1):
+        card = deck.cards[i]
+        tag = " — age quando quiser, +2 em testes e dano" if is_joker(card) else ""
+        hold = " ⏸️" if deck.held[i] else ""
+        lines.append(f"`{pos:>2}.` **{card_name(card)}** {deck.names[i]}{hold}{tag}")
+    waiting, no_card = [], []
+    for name, card, held in zip(deck.names, deck.cards, deck.held):
+        if card == NO_CARD:
+            (waiting if held else no_card).append(name)
+    embed = discord.Embed(
+        title=f"🃏 Iniciativa · rodada {deck.round}",
+        description=f"{len(deck.names)} combatente(s) | {deck.available()} carta(s) no baralho",
+        color=0x9B59B6
+    )
+    add_chunked_field(embed, "Ordem", lines or ["—"])
+    if waiting:
+        add_chunked_field(embed, "⏸️ Em espera", waiting)
+    if no_card:
+        add_chunked_field(embed, "Sem carta nesta rodada", no_card)
+    footer = list(notes)
+    if deck.joker_out:
+        footer.append("Saiu Coringa: o baralho é embaralhado antes da próxima rodada")
+    if footer:
+        embed.set_footer(text=" · ".join(footer))
+    return embed
+
+async def action_deck(channel_id):
+    """Baralho do canal: da memória na hora; na falta, lido do disco fora do event loop."""
+    deck = decks.get(channel_id)
+    if deck is None:
+        if decks.conn is not None:
+            deck = await asyncio.to_thread(decks.load, channel_id)
+        else:
+            deck = decks.load(channel_id)
+    return deck
+
+def init_change(deck, action: str, arg: str):
+    """Aplica `!init <ação> <arg>` ao baralho (com decks.lock). Retorna as notas do rodapé, ou str de erro."""
+    if action == "deal":
+        names = None
+        if arg:
+            names = parse_combatants(arg)
+            if isinstance(names, str):
+                return names
+        elif not deck.names:
+            return INIT_USAGE
+        reshuffled = deck.deal(decks.gen, names)
+        return ["Coringa na rodada anterior: baralho embaralhado"] if reshuffled else []
+    if action == "shuffle":
+        deck.shuffle(decks.gen)
+        return ["Baralho embaralhado (cartas em jogo ficam na mão)"]
+    i = deck.find(arg)
+    if i is None:
+        return f"❌ Ninguém chamado `{arg}` na iniciativa." if arg else INIT_USAGE
+    name = deck.names[i]
+    if action == "hold":
+        return [f"{name} {'em espera' if deck.toggle_hold(i) else 'saiu da espera'}"]
+    # redraw
+    if deck.cards[i] == NO_CARD:
+        return f"❌ {name} está sem carta nesta rodada."
+    if len(deck.in_play()) >= DECK_SIZE:
+        return "❌ Todas as cartas estão em jogo."
+    old, new = deck.redraw(decks.gen, i)
+    kept = "ficou com a nova" if new > old else "ficou com a antiga"
+    return [f"{name} comprou {card_name(new)} no lugar de {card_name(old)}: {kept}"]
+
+async def cmd_init(message, args: str):
+    word, _, arg = args.strip().partition(" ")
+    arg = arg.strip()
+    channel_id = message.channel.id
+    action = INIT_ACTIONS.get(word.lower()) if word else None
+    if word and action is None:
+        return INIT_USAGE
+    if action == "end":
+        decks.drop(channel_id)
+        return "Iniciativa encerrada neste canal."
+    deck = await action_deck(channel_id)
+    if action is None:
+        if not deck.round:
+            return "Nenhuma iniciativa neste canal. Comece com `!init deal <nome>, <nome>, ...`."
+        return build_init_embed(deck)
+    if not deck.round and action != "deal":
+        return "Nenhuma iniciativa neste canal. Comece com `!init deal <nome>, <nome>, ...`."
+    with decks.lock:
+        notes = init_change(deck, action, arg)
+        if isinstance(notes, str):
+            return notes
+        decks.touch(deck)
+        return build_init_embed(deck, notes)
+
+async def init_maintenance():
+    """Snapshot e limpeza dos baralhos a cada INIT_SNAPSHOT_INTERVAL segundos."""
+    while True:
+        await asyncio.sleep(INIT_SNAPSHOT_INTERVAL)
+        try:
+            saved, evicted = await asyncio.to_thread(decks.snapshot)
+        except Exception:
+            log.exception("iniciativa: falha no snapshot")
+            continue
+        if saved or evicted:
+            log.info("iniciativa: %d gravados, %d fora da memória, %d em memória",
+                     saved, evicted, len(decks.decks))
+
+BANG_COMMANDS = {
+    "!help": lambda args: build_help_embed(),
+    "!odds": cmd_odds,
+    "!sim": cmd_sim,
+}
+# Recebem também a mensagem: handler(message, args)
+SOURCE_COMMANDS = {
+    "!stats": cmd_stats,
+    "!config": cmd_config,
+    "!init": cmd_init,
+    "!replay": cmd_replay,
+}
+# Só para ADMIN_USER_IDS; para os outros é como se não existissem
+ADMIN_COMMANDS = {
+    "!profile": cmd_profile,
+}
+# Comandos "!" que passam pelo agendador: nome -> estimativa de custo(args)
+BANG_COSTS = {
+    "!odds": odds_args_cost,
+    "!sim": sim_cost,
+    "!replay": replay_cost,
+}
+
+@client.event
+async def on_message(message: discord.Message):
+    if message.author.bot:
+        if metrics:
+            metrics.inc("swade_messages_total", outcome="bot")
+        return
+
+    content = message.content
+    t0 = time.perf_counter() if metrics else 0.0
+
+    # Comandos com "!"
+    if content.lstrip()[:1] == "!":
+        name, _, args = content.strip().partition(" ")
+        name = name.lower()
+        handler = BANG_COMMANDS.get(name)
+        if not handler and name in SOURCE_COMMANDS:
+            handler = partial(SOURCE_COMMANDS[name], message)
+        if not handler and message.author.id in ADMIN_USER_IDS:
+            handler = ADMIN_COMMANDS.get(name)
+        if not handler:
+            if metrics:
+                metrics.inc("swade_messages_total", outcome="unknown_command")
+            return
+        if name in BANG_COSTS:
+            result = await scheduler.run(message, BANG_COSTS[name](args), handler, args)
+        else:
+            result = handler(args)
+            if inspect.isawaitable(result):
+                result = await result
+        if metrics:
+            metrics.inc("swade_messages_total", outcome="command")
+            metrics.inc("swade_commands_total", type=name)
+            if isinstance(result, str):
+                metrics.inc("swade_command_errors_total", type=name)
+            metrics.phase("execute", name, time.perf_counter() - t0)
+        await send_result(message, result)
+        if metrics:
+            metrics.phase("total", name, time.perf_counter() - t0)
+        return
+
+    # Conversa comum sai aqui, sem rodar nenhum parser nem buscar a config do canal
+    cmds = None
+    if could_be_roll(content):
+        config = await channel_config(message.channel.id)
+        cmds = parse_message(content, config.target, config.wild)
+    if metrics:
+        metrics.inc("swade_messages_total", outcome="chat" if cmds is None else "roll")
+        metrics.phase("parse", "chat" if cmds is None else "roll", time.perf_counter() - t0)
+    if cmds is None:
+        return
+    await send_result(message, await run_commands(message, cmds, config))
+    if metrics:
+        metrics.phase("total", "roll", time.perf_counter() - t0)
+
+async def run_commands(source, cmds, config: ChannelConfig = DEFAULT_CONFIG):
+    """Executa as rolagens: as baratas direto, as caras pelo agendador. `source` é a Message/Interaction."""
+    # Acima de MAX_COMMAND_COST o roll_command só devolve o erro: não pesa na fila
+    cost = sum(c for c in map(command_cost, cmds) if c <= MAX_COMMAND_COST)
+    if cost <= INLINE_COST_LIMIT:
+        return execute_commands(cmds, source, config)
+    return await scheduler.run(source, cost, execute_commands, cmds, source, config)
+
+# ------------------------------------------------------------
+# Slash commands (/s, /dano, /odds) — parâmetros tipados, sem parser de texto
+# ------------------------------------------------------------
+def die_choices(dies):
+    return [app_commands.Choice(name=f"d{die}", value=die) for die in sorted(dies)]
+
+TRAIT_DIE_CHOICES = die_choices(TRAIT_DIES)
+DAMAGE_DIE_CHOICES = die_choices(DAMAGE_DIES)
+WILD_DIE_CHOICES = die_choices(WILD_DIES)
+
+TRAIT_PARAM_DOCS = {
+    "dado": "Dado da perícia/atributo",
+    "quantidade": f"Quantos dados no grupo (até {MAX_COUNT}) ou testes individuais",
+    "mod": "Modificador somado a cada dado",
+    "dif": f"Dificuldade (padrão do canal, {T_DEFAULT} se não configurado)",
+    "selvagem": f"Dado selvagem (padrão do canal, d{WILD_DEFAULT} se não configurado)",
+    "individuais": "Cada teste com seu próprio selvagem (N#sX)",
+}
+DAMAGE_PARAM_DOCS = {
+    "dado": "Dado do primeiro termo",
+    "quantidade": "Quantos dados no primeiro termo",
+    "dado2": "Dado do segundo termo (opcional)",
+    "quantidade2": "Quantos dados no segundo termo",
+    "mod": "Modificador aplicado uma vez no total",
+    "dif": f"Resistência/dificuldade (padrão do canal, {T_DEFAULT} se não configurado)",
+    "rolagens": "Quantas rolagens separadas (M#)",
+}
+
+# dif/selvagem em branco: vale o padrão do canal (!config)
+def trait_command_from(config: ChannelConfig, dado: int, quantidade: int, mod: int, dif: int | None,
+                       selvagem: int | None, individuais: bool):
+    dif = config.target if dif is None else dif
+    selvagem = config.wild if selvagem is None else selvagem
+    return TraitCommand(quantidade, dado, mod, dif, selvagem, individuais)
+
+def damage_command_from(config: ChannelConfig, dado: int, quantidade: int, dado2: int | None, quantidade2: int,
+                        mod: int, dif: int | None, rolagens: int):
+    terms = [DiceTerm(quantidade, dado)]
+    if dado2 is not None and quantidade2:
+        terms.append(DiceTerm(quantidade2, dado2))
+    return DamageCommand(rolagens, tuple(terms), mod, config.target if dif is None else dif, rolagens > 1)
+
+async def respond(interaction: discord.Interaction, results):
+    """Responde a interação: embeds visíveis; erro (str) só para quem pediu."""
+    if not isinstance(results, list):
+        results = [results]
+    if len(results) == 1 and isinstance(results[0], str):
+        kwargs = {"content": results[0], "ephemeral": True}
+    else:
+        kwargs = {"embeds": [build_error_embed(r) if isinstance(r, str) else r for r in results]}
+    if interaction.response.is_done():
+        await interaction.followup.send(**kwargs)
+    else:
+        await interaction.response.send_message(**kwargs)
+
+async def run_slash(interaction: discord.Interaction, cmd, config: ChannelConfig):
+    # Erro antes do defer: depois de um "pensando..." público, o follow-up
+    # não consegue mais ser só para quem pediu
+    error = command_error(cmd, config)
+    if error:
+        await respond(interaction, error)
+        return
+    # O Discord dá 3 s para a primeira resposta; rolagem cara responde "pensando..." antes
+    if command_cost(cmd) > INLINE_COST_LIMIT:
+        await interaction.response.defer(thinking=True)
+    # Slash sempre em embed: texto ali é erro (só para quem pediu)
+    if config.text:
+        config = replace(config, text=False)
+    await respond(interaction, await run_commands(interaction, [cmd], config))
+
+@tree.command(name="s", description="Teste com dado selvagem (SWADE)")
+@app_commands.describe(**TRAIT_PARAM_DOCS)
+@app_commands.choices(dado=TRAIT_DIE_CHOICES, selvagem=WILD_DIE_CHOICES)
+async def slash_trait(
+    interaction: discord.Interaction,
+    dado: int,
+    quantidade: app_commands.Range[int, 1, MAX_BIG_COUNT] = 1,
+    mod: int = 0,
+    dif: int | None = None,
+    selvagem: int | None = None,
+    individuais: bool = False,
+):
+    config = await channel_config(interaction.channel_id)
+    await run_slash(interaction, trait_command_from(config, dado, quantidade, mod, dif, selvagem, individuais), config)
+
+@tree.command(name="dano", description="Rolagem de dano sem selvagem, com até 2 termos")
+@app_commands.describe(**DAMAGE_PARAM_DOCS)
+@app_commands.choices(dado=DAMAGE_DIE_CHOICES, dado2=DAMAGE_DIE_CHOICES)
+async def slash_damage(
+    interaction: discord.Interaction,
+    dado: int,
+    quantidade: app_commands.Range[int, 1, 1000] = 1,
+    dado2: int | None = None,
+    quantidade2: app_commands.Range[int, 0, 1000] = 1,
+    mod: int = 0,
+    dif: int | None = None,
+    rolagens: app_commands.Range[int, 1, MAX_BIG_COUNT] = 1,
+):
+    config = await channel_config(interaction.channel_id)
+    await run_slash(interaction, damage_command_from(config, dado, quantidade, dado2, quantidade2, mod, dif, rolagens),
+                    config)
+
+odds_group = app_commands.Group(name="odds", description="Chances exatas de uma rolagem")
+
+@odds_group.command(name="s", description="Chances de um teste com dado selvagem")
+@app_commands.describe(**TRAIT_PARAM_DOCS)
+@app_commands.choices(dado=TRAIT_DIE_CHOICES, selvagem=WILD_DIE_CHOICES)
+async def slash_odds_trait(
+    interaction: discord.Interaction,
+    dado: int,
+    quantidade: app_commands.Range[int, 1, MAX_COUNT] = 1,
+    mod: int = 0,
+    dif: int | None = None,
+    selvagem: int | None = None,
+    individuais: bool = False,
+):
+    config = await channel_config(interaction.channel_id)
+    await respond(interaction, odds_for(trait_command_from(config, dado, quantidade, mod, dif, selvagem, individuais)))
+
+@odds_group.command(name="dano", description="Chances de uma rolagem de dano")
+@app_commands.describe(**DAMAGE_PARAM_DOCS)
+@app_commands.choices(dado=DAMAGE_DIE_CHOICES, dado2=DAMAGE_DIE_CHOICES)
+async def slash_odds_damage(
+    interaction: discord.Interaction,
+    dado: int,
+    quantidade: app_commands.Range[int, 1, 1000] = 1,
+    dado2: int | None = None,
+    quantidade2: app_commands.Range[int, 0, 1000] = 1,
+    mod: int = 0,
+    dif: int | None = None,
+    rolagens: app_commands.Range[int, 1, MAX_BIG_COUNT] = 1,
+):
+    config = await channel_config(interaction.channel_id)
+    await respond(interaction,
+                  odds_for(damage_command_from(config, dado, quantidade, dado2, quantidade2, mod, dif, rolagens)))
+
+tree.add_command(odds_group)
+
+async def sync_slash_commands():
+    if SLASH_SYNC == "global":
+        synced = await tree.sync()
+    else:
+        guild = discord.Object(id=int(SLASH_SYNC))
+        tree.copy_global_to(guild=guild)
+        synced = await tree.sync(guild=guild)
+    log.info("slash commands registrados (%s): %s", SLASH_SYNC, ", ".join(c.name for c in synced))
+
+# ------------------------------------------------------------
+async def main():
+    discord.utils.setup_logging()
+    # SIGTERM/SIGINT fecham o gateway direito (o launcher usa SIGTERM)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(sig, lambda: asyncio.ensure_future(client.close()))
+    # SIGUSR1: grava um profile de PROFILE_DEFAULT_SECONDS em PROFILE_DIR
+    if hasattr(signal, "SIGUSR1"):
+        loop.add_signal_handler(signal.SIGUSR1,
+                                lambda: asyncio.ensure_future(run_profile(PROFILE_DEFAULT_SECONDS)))
+
+    if history:
+        history.start()
+        log.info("histórico de rolagens em %s", ROLL_LOG_PATH)
+    health = asyncio.create_task(log_shard_health())
+    stats_task = asyncio.create_task(stats_maintenance())
+    config_task = asyncio.create_task(config_flush())
+    init_task = asyncio.create_task(init_maintenance())
+    metrics_runner = lag_watch = None
+    if metrics:
+        metrics_runner = await metrics.serve(METRICS_HOST, METRICS_PORT)
+        lag_watch = asyncio.create_task(metrics.watch_loop_lag())
+        log.info("métricas em http://%s:%s/metrics", METRICS_HOST, METRICS_PORT)
+    try:
+        async with client:
+            await client.login(TOKEN)
+            # No cluster de shards, só o processo com o shard 0 registra
+            if SLASH_SYNC and 0 in (getattr(client, "shard_ids", None) or [0]):
+                await sync_slash_commands()
+            await client.connect()
+    finally:
+        health.cancel()
+        stats_task.cancel()
+        config_task.cancel()
+        init_task.cancel()
+        if metrics_runner is not None:
+            lag_watch.cancel()
+            await metrics_runner.cleanup()
+        scheduler.pool.shutdown(wait=False, cancel_futures=True)
+        if _sim_pool is not None:
+            _sim_pool.shutdown(wait=False, cancel_futures=True)
+        if history:
+            await asyncio.to_thread(history.close)
+        await asyncio.to_thread(stats.close)
+        await asyncio.to_thread(channel_configs.close)
+        await asyncio.to_thread(decks.close)
+        log.info("bot encerrado")
+
+if __name__ == "__main__":
+    if not TOKEN or TOKEN == "COLOQUE_SEU_TOKEN_AQUI":
+        raise SystemExit("Defina a variável de ambiente DISCORD_TOKEN com o token do bot.")
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+"""
+Configuração por canal (!config): dificuldade e dado selvagem padrão,
+saída detalhada/compacta/texto e os limites das rolagens N#.
+
+O bot resolve a configuração de cada mensagem com get(): uma consulta a um
+OrderedDict em ordem de uso (até `max_entries` canais, cada entrada vale
+`ttl` segundos). Só na falta (canal novo ou expirado) load() busca no
+armazenamento, e o bot chama load() fora do event loop. Canais sem nada
+configurado também entram no cache, com os padrões, para não voltar ao
+disco a cada mensagem.
+
+Alterações valem na hora (vão direto para o cache) e esperam em `pending`
+até o flush(), que grava todas numa transação; o bot chama flush() de
+tempos em tempos e ao encerrar. Sem `path`, tudo fica num dict em memória.
+"""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channel_config (
+    channel_id  INTEGER PRIMARY KEY,
+    target      INTEGER NOT NULL,
+    wild        INTEGER NOT NULL,
+    compact     INTEGER NOT NULL,
+    max_count   INTEGER NOT NULL,
+    max_big     INTEGER NOT NULL,
+    text        INTEGER NOT NULL,
+    updated_at  REAL    NOT NULL
+);
+"""
+
+UPSERT = """
+INSERT INTO channel_config (channel_id, target, wild, compact, max_count, max_big, text, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (channel_id) DO UPDATE SET
+    target = excluded.target, wild = excluded.wild, compact = excluded.compact,
+    max_count = excluded.max_count, max_big = excluded.max_big, text = excluded.text,
+    updated_at = excluded.updated_at
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class ChannelConfig:
+    target: int               # dificuldade quando a rolagem não traz T
+    wild: int                 # dado selvagem quando a rolagem não traz DS
+    compact: bool             # N# pequenos numa linha por teste
+    max_count: int            # acima disso, N# vira resumo
+    max_big: int              # maior N aceito em N#
+    text: bool = False        # respostas em texto puro em vez de embed
+
+
+class ConfigStore:
+    def __init__(self, path: str, defaults: ChannelConfig, max_entries: int = 10_000, ttl: float = 3600.0):
+        self.path = path
+        self.defaults = defaults
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cache = OrderedDict()   # canal -> (config, expira em) — só no event loop
+        self.pending = {}            # canal -> config ainda não gravada
+        self.memory = {}             # sem path: o "armazenamento"
+        self.lock = threading.Lock()  # pending/memory e a conexão (load e flush rodam em threads)
+        self.conn = None
+        if path:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+
+    # ---------- Caminho de cada mensagem ----------
+    def get(self, channel_id):
+        """Config do canal se estiver no cache e valendo; None se precisa de load()."""
+        hit = self.cache.get(channel_id)
+        if hit is None or hit[1] < time.monotonic():
+            return None
+        self.cache.move_to_end(channel_id)
+        return hit[0]
+
+    def remember(self, channel_id, config: ChannelConfig, force: bool = False):
+        """Põe no cache o que load() trouxe (sem passar por cima de uma entrada válida mais nova)."""
+        now = time.monotonic()
+        hit = self.cache.get(channel_id)
+        if not force and hit is not None and hit[1] >= now:
+            return hit[0]
+        self.cache[channel_id] = (config, now + self.ttl)
+        self.cache.move_to_end(channel_id)
+        while len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+        return config
+
+    # ---------- Armazenamento ----------
+    def load(self, channel_id) -> ChannelConfig:
+        """Lê a config do canal (pendente, gravada ou os padrões). Pode ler o disco."""
+        with self.lock:
+            config = self.pending.get(channel_id) or self.memory.get(channel_id)
+            if config is not None or self.conn is None:
+                return config or self.defaults
+            row = self.conn.execute(
+                "SELECT target, wild, compact, max_count, max_big, text FROM channel_config WHERE channel_id = ?",
+                (channel_id,),
+            ).fetchone()
+        if row is None:
+            return self.defaults
+        target, wild, compact, max_count, max_big, text = row
+        return ChannelConfig(target, wild, bool(compact), max_count, max_big, bool(text))
+
+    def set(self, channel_id, config: ChannelConfig):
+        """Troca a config do canal: vale já; vai para o disco no próximo flush()."""
+        self.remember(channel_id, config, force=True)
+        with self.lock:
+            if self.conn is None:
+                if config == self.defaults:
+                    self.memory.pop(channel_id, None)
+                else:
+                    self.memory[channel_id] = config
+            else:
+                self.pending[channel_id] = config
+
+    def flush(self) -> int:
+        """Grava as alterações pendentes numa transação; canal de volta aos padrões sai da tabela."""
+        with self.lock:
+            if not self.pending or self.conn is None:
+                return 0
+            pending, self.pending = self.pending, {}
+            now = time.time()
+            upserts = [
+                (channel_id, c.target, c.wild, int(c.compact), c.max_count, c.max_big, int(c.text), now)
+                for channel_id, c in pending.items() if c != self.defaults
+            ]
+            deletes = [(channel_id,) for channel_id, c in pending.items() if c == self.defaults]
+            try:
+                with self.conn:
+                    self.conn.executemany(UPSERT, upserts)
+                    self.conn.executemany("DELETE FROM channel_config WHERE channel_id = ?", deletes)
+            except sqlite3.Error:
+                # Volta para a fila (sem passar por cima de alterações mais novas)
+                for channel_id, c in pending.items():
+                    self.pending.setdefault(channel_id, c)
+                raise
+        return len(pending)
+
+    def close(self):
+        if self.conn is not None:
+            self.flush()
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,128 @@
+"""
+Sorteio dos dados: backends trocáveis com buffers por lado de dado.
+
+Cada backend entrega `dice(lado, n)` -> ndarray int64 com n faces em
+1..lado. Com buffer, os sorteios saem de um bloco pré-sorteado por lado de
+dado (RNG_BUFFER faces) e o bloco é refeito inteiro quando acaba: o custo
+por chamada fica num fatiamento, não numa ida ao gerador. `dice_list(lado,
+n)` tira as mesmas faces do mesmo bloco, em lista de int: para poucos
+dados sai mais barato que criar um array (e a sequência não muda).
+
+  numpy   np.random.Generator(PCG64), bloco sorteado em C
+  python  random.Random (Mersenne Twister) do stdlib, bloco via choices()
+
+Rolagem com semente: o bot cria um backend novo *sem buffer* com aquela
+semente, então os mesmos sorteios saem de novo com a mesma semente e o
+mesmo backend, independente do tamanho do buffer configurado.
+"""
+import random
+import secrets
+import threading
+
+import numpy as np
+
+EMPTY = np.empty(0, dtype=np.int64)
+
+
+class BufferedDice:
+    name = ""
+
+    def __init__(self, seed=None, buffer_size: int = 0):
+        self.seed = seed
+        self.buffer_size = buffer_size
+        self.buffers = {}   # lado -> (bloco, posição)
+        self.lists = {}     # lado -> (bloco, o mesmo bloco em lista), feita na 1ª chamada de dice_list()
+
+    def _draw(self, die: int, n: int) -> np.ndarray:
+        raise NotImplementedError
+
+    def dice(self, die: int, n: int) -> np.ndarray:
+        if n >= self.buffer_size:
+            return self._draw(die, n)
+        buf, pos = self.buffers.get(die, (EMPTY, 0))
+        end = pos + n
+        if end <= len(buf):
+            self.buffers[die] = (buf, end)
+            return buf[pos:end]
+        head = buf[pos:]
+        buf = self._draw(die, self.buffer_size)
+        rest = n - len(head)
+        self.buffers[die] = (buf, rest)
+        return np.concatenate((head, buf[:rest]))
+
+    def dice_list(self, die: int, n: int) -> list:
+        """Como dice(), em lista de int: para poucos dados, sem criar um array por chamada."""
+        buf, pos = self.buffers.get(die, (EMPTY, 0))
+        end = pos + n
+        if n >= self.buffer_size or end > len(buf):
+            return self.dice(die, n).tolist()
+        cached = self.lists.get(die)
+        if cached is None or cached[0] is not buf:
+            cached = self.lists[die] = (buf, buf.tolist())
+        self.buffers[die] = (buf, end)
+        return cached[1][pos:end]
+
+
+class NumpyDice(BufferedDice):
+    name = "numpy"
+
+    def __init__(self, seed=None, buffer_size: int = 0):
+        super().__init__(seed, buffer_size)
+        self.gen = np.random.Generator(np.random.PCG64(seed))
+
+    def _draw(self, die: int, n: int) -> np.ndarray:
+        return self.gen.integers(1, die + 1, size=n)
+
+
+class PythonDice(BufferedDice):
+    name = "python"
+
+    def __init__(self, seed=None, buffer_size: int = 0):
+        super().__init__(seed, buffer_size)
+        self.rand = random.Random(seed)
+        self.faces = {}
+
+    def _draw(self, die: int, n: int) -> np.ndarray:
+        faces = self.faces.get(die)
+        if faces is None:
+            faces = self.faces[die] = range(1, die + 1)
+        return np.array(self.rand.choices(faces, k=n), dtype=np.int64)
+
+
+BACKENDS = {cls.name: cls for cls in (NumpyDice, PythonDice)}
+
+
+def make_dice(backend: str, seed=None, buffer_size: int = 0) -> BufferedDice:
+    try:
+        cls = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"backend de RNG desconhecido: {backend!r} (use {', '.join(BACKENDS)})") from None
+    return cls(seed, buffer_size)
+
+
+def new_seed() -> int:
+    """Semente curta (48 bits) para mostrar no rodapé e repetir a rolagem."""
+    return secrets.randbits(48)
+
+
+class ThreadDice:
+    """
+    Um backend com buffer por thread (as rolagens rodam no event loop e no
+    pool), cada um com semente própria da entropia do sistema.
+    """
+
+    def __init__(self, backend: str, buffer_size: int):
+        make_dice(backend)   # valida o nome já na configuração
+        self.backend = backend
+        self.buffer_size = buffer_size
+        self.local = threading.local()
+
+    def get(self) -> BufferedDice:
+        dice = getattr(self.local, "dice", None)
+        if dice is None:
+            dice = self.local.dice = make_dice(self.backend, None, self.buffer_size)
+        return dice
+
+    def reseed(self, seed):
+        """Semente fixa para a thread atual (benchmarks e testes)."""
+        self.local.dice = make_dice(self.backend, seed, self.buffer_size)
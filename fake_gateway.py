@@ -0,0 +1,264 @@
+"""
+Gateway + API do Discord falsos, locais, para testar o bot (e o
+shard_launcher.py) sem rede. Implementa só o que o bot usa:
+
+  GET  /api/v10/users/@me, /api/v10/oauth2/applications/@me, /api/v10/gateway/bot
+  WS   /gateway                 HELLO, IDENTIFY -> READY + GUILD_CREATE, heartbeat, RESUME
+  POST /api/v10/channels/{id}/messages   guarda as respostas do bot
+
+Controle do teste:
+  POST /_fake/messages   {"guild": 1, "content": "s8"}  -> MESSAGE_CREATE no shard dono do servidor
+  GET  /_fake/replies    respostas que o bot mandou
+  GET  /_fake/shards     shards conectados e horário de cada IDENTIFY
+
+Os IDENTIFYs são conferidos contra o limite do Discord (um por balde
+shard_id % max_concurrency a cada --identify-interval segundos); uma
+violação aparece no log e em /_fake/shards.
+
+Uso:
+  python fake_gateway.py --port 8765 --shards 4 --guilds 8
+  # em outro terminal (o script imprime estas variáveis):
+  DISCORD_TOKEN=fake DISCORD_API_BASE=http://127.0.0.1:8765/api/v10 \\
+  DISCORD_GATEWAY_URL=ws://127.0.0.1:8765/gateway SHARD_COUNT=4 SHARD_WORKERS=2 \\
+  python shard_launcher.py
+  # e então:
+  python fake_gateway.py send --port 8765 --guild 3 "2d6+d8 T5"
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import time
+from datetime import datetime, timezone
+
+import aiohttp
+from aiohttp import web
+
+log = logging.getLogger("swade.fake_gateway")
+
+BOT_USER = {"id": "1000", "username": "swade-bot", "discriminator": "0", "global_name": None,
+            "avatar": None, "bot": True}
+PLAYER = {"id": "2000", "username": "jogador", "discriminator": "0", "global_name": "Jogador",
+          "avatar": None, "bot": False}
+
+HELLO, HEARTBEAT, IDENTIFY, RESUME, HEARTBEAT_ACK, DISPATCH = 10, 1, 2, 6, 11, 0
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def json_response(data, status: int = 200):
+    # discord.py só decodifica com content-type exatamente "application/json" (sem charset)
+    return web.Response(body=json.dumps(data).encode(), status=status, content_type="application/json")
+
+
+def guild_id(n: int) -> int:
+    # Snowflakes com o timestamp deslocado, para (id >> 22) % shards variar
+    return (n << 22) | n
+
+
+def shard_for(gid: int, shard_count: int) -> int:
+    return (gid >> 22) % shard_count
+
+
+class FakeDiscord:
+    def __init__(self, port: int, shard_count: int, guilds: int, max_concurrency: int, identify_interval: float):
+        self.port = port
+        self.shard_count = shard_count
+        self.guild_ids = [guild_id(n) for n in range(1, guilds + 1)]
+        self.max_concurrency = max_concurrency
+        self.identify_interval = identify_interval
+        self.sockets = {}            # shard_id -> (ws, seq iterator)
+        self.identifies = []         # (shard_id, t)
+        self.violations = []
+        self.replies = []
+        self.ids = itertools.count(10_000)
+
+    @property
+    def api(self):
+        return f"http://127.0.0.1:{self.port}/api/v10"
+
+    @property
+    def gateway(self):
+        return f"ws://127.0.0.1:{self.port}/gateway"
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/api/v10/users/@me", self.users_me)
+        app.router.add_get("/api/v10/oauth2/applications/@me", self.application)
+        app.router.add_get("/api/v10/gateway/bot", self.gateway_bot)
+        app.router.add_get("/api/v10/gateway", self.gateway_bot)
+        app.router.add_post("/api/v10/channels/{channel_id}/messages", self.create_message)
+        app.router.add_get("/gateway", self.websocket)
+        app.router.add_post("/_fake/messages", self.inject_message)
+        app.router.add_get("/_fake/replies", self.list_replies)
+        app.router.add_get("/_fake/shards", self.list_shards)
+        return app
+
+    # ---------- REST ----------
+    async def users_me(self, request):
+        return json_response(BOT_USER)
+
+    async def application(self, request):
+        return json_response({
+            "id": BOT_USER["id"], "name": BOT_USER["username"], "icon": None, "description": "",
+            "bot_public": True, "bot_require_code_grant": False, "verify_key": "0" * 64,
+            "owner": PLAYER, "flags": 0,
+        })
+
+    async def gateway_bot(self, request):
+        return json_response({
+            "url": self.gateway,
+            "shards": self.shard_count,
+            "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0,
+                                    "max_concurrency": self.max_concurrency},
+        })
+
+    async def create_message(self, request):
+        if request.content_type.startswith("multipart/"):
+            reader = await request.multipart()
+            part = await reader.next()
+            payload = json.loads(await part.text())
+        else:
+            payload = await request.json()
+        channel_id = request.match_info["channel_id"]
+        message = self.message_payload(channel_id, None, BOT_USER, payload.get("content") or "")
+        message["embeds"] = payload.get("embeds") or []
+        message["message_reference"] = payload.get("message_reference")
+        self.replies.append(message)
+        log.info("resposta no canal %s: %s", channel_id,
+                 " | ".join(e.get("title") or "" for e in message["embeds"]) or message["content"])
+        return json_response(message)
+
+    def message_payload(self, channel_id, gid, author, content):
+        payload = {
+            "id": str(next(self.ids)), "channel_id": str(channel_id), "author": author,
+            "content": content, "timestamp": now_iso(), "edited_timestamp": None, "tts": False,
+            "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [],
+            "embeds": [], "pinned": False, "type": 0,
+        }
+        if gid is not None:
+            payload["guild_id"] = str(gid)
+        return payload
+
+    # ---------- Gateway ----------
+    async def websocket(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        seq = itertools.count(1)
+        shard_id = None
+        await ws.send_json({"op": HELLO, "d": {"heartbeat_interval": 41250}})
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+            data = json.loads(msg.data)
+            op = data.get("op")
+            if op == HEARTBEAT:
+                await ws.send_json({"op": HEARTBEAT_ACK})
+            elif op == IDENTIFY:
+                shard_id = (data["d"].get("shard") or [0, 1])[0]
+                self.check_identify(shard_id)
+                self.sockets[shard_id] = (ws, seq)
+                await self.send_ready(ws, seq, shard_id)
+            elif op == RESUME:
+                self.sockets[shard_id] = (ws, seq)
+                await ws.send_json({"op": DISPATCH, "t": "RESUMED", "s": next(seq), "d": {}})
+        if shard_id is not None and self.sockets.get(shard_id, (None,))[0] is ws:
+            del self.sockets[shard_id]
+            log.info("shard %s: desconectou", shard_id)
+        return ws
+
+    def check_identify(self, shard_id: int):
+        t = time.monotonic()
+        bucket = shard_id % self.max_concurrency
+        for other, t_other in reversed(self.identifies):
+            # 5% de folga para o jitter do agendamento
+            if other % self.max_concurrency == bucket and t - t_other < self.identify_interval * 0.95:
+                msg = f"shard {shard_id}: IDENTIFY {t - t_other:.2f}s depois do shard {other} (mesmo balde)"
+                self.violations.append(msg)
+                log.warning("limite de IDENTIFY violado — %s", msg)
+                break
+        self.identifies.append((shard_id, t))
+        log.info("shard %s: IDENTIFY", shard_id)
+
+    async def send_ready(self, ws, seq, shard_id: int):
+        guilds = [g for g in self.guild_ids if shard_for(g, self.shard_count) == shard_id]
+        await ws.send_json({"op": DISPATCH, "t": "READY", "s": next(seq), "d": {
+            "v": 10, "user": BOT_USER, "guilds": [{"id": str(g), "unavailable": True} for g in guilds],
+            "session_id": f"sessao-{shard_id}", "resume_gateway_url": self.gateway,
+            "shard": [shard_id, self.shard_count], "application": {"id": BOT_USER["id"], "flags": 0},
+        }})
+        for g in guilds:
+            await ws.send_json({"op": DISPATCH, "t": "GUILD_CREATE", "s": next(seq), "d": {
+                "id": str(g), "name": f"Mesa {g & 0x3FFFFF}", "owner_id": PLAYER["id"], "icon": None,
+                "roles": [], "emojis": [], "stickers": [], "features": [], "members": [],
+                "channels": [{"id": str(g), "type": 0, "name": "rolagens", "position": 0,
+                              "permission_overwrites": []}],
+                "threads": [], "voice_states": [], "presences": [], "stage_instances": [],
+                "guild_scheduled_events": [], "member_count": 2, "unavailable": False,
+                "large": False, "joined_at": now_iso(),
+            }})
+
+    # ---------- Controle ----------
+    async def inject_message(self, request):
+        body = await request.json()
+        gid = guild_id(int(body.get("guild", 1)))
+        shard_id = shard_for(gid, self.shard_count)
+        if shard_id not in self.sockets:
+            return json_response({"error": f"shard {shard_id} não conectado"}, status=409)
+        ws, seq = self.sockets[shard_id]
+        payload = self.message_payload(body.get("channel", gid), gid, PLAYER, body["content"])
+        await ws.send_json({"op": DISPATCH, "t": "MESSAGE_CREATE", "s": next(seq), "d": payload})
+        return json_response({"shard": shard_id, "message_id": payload["id"]})
+
+    async def list_replies(self, request):
+        return json_response(self.replies)
+
+    async def list_shards(self, request):
+        return json_response({
+            "connected": sorted(self.sockets),
+            "identifies": [{"shard": s, "t": t} for s, t in self.identifies],
+            "violations": self.violations,
+        })
+
+
+def serve(args):
+    fake = FakeDiscord(args.port, args.shards, args.guilds, args.max_concurrency, args.identify_interval)
+    print("Variáveis para o bot/launcher:")
+    print(f"  DISCORD_TOKEN=fake DISCORD_API_BASE={fake.api} DISCORD_GATEWAY_URL={fake.gateway} "
+          f"SHARD_COUNT={args.shards}")
+    web.run_app(fake.app(), host="127.0.0.1", port=args.port, print=None)
+
+
+async def send(args):
+    async with aiohttp.ClientSession() as session:
+        url = f"http://127.0.0.1:{args.port}/_fake/messages"
+        async with session.post(url, json={"guild": args.guild, "content": args.content}) as resp:
+            print(await resp.text())
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)-8s %(name)s: %(message)s")
+    ap = argparse.ArgumentParser(description="Gateway e API do Discord falsos para testes locais.")
+    sub = ap.add_subparsers(dest="mode")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--shards", type=int, default=2)
+    ap.add_argument("--guilds", type=int, default=4)
+    ap.add_argument("--max-concurrency", type=int, default=1)
+    ap.add_argument("--identify-interval", type=float, default=5.0,
+                    help="segundos mínimos entre IDENTIFYs do mesmo balde")
+    sp = sub.add_parser("send", help="injeta uma mensagem de jogador")
+    sp.add_argument("--port", type=int, default=8765)
+    sp.add_argument("--guild", type=int, default=1, help="número do servidor (1..--guilds)")
+    sp.add_argument("content")
+    args = ap.parse_args(argv)
+    if args.mode == "send":
+        asyncio.run(send(args))
+    else:
+        serve(args)
+
+
+if __name__ == "__main__":
+    main()
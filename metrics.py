@@ -0,0 +1,168 @@
+"""
+Métricas do bot no formato de texto do Prometheus, servidas por HTTP local.
+
+O bot só cria um Metrics quando METRICS_PORT está definido; desligado, cada
+ponto de medição custa um `if metrics:` com metrics = None.
+
+Séries (todas com prefixo swade_):
+  messages_total{outcome}               toda mensagem que chega ao on_message
+  commands_total{type}                  comandos executados, por tipo
+  command_errors_total{type}            comandos que responderam com erro
+  busy_total{scope}                     comandos recusados com a fila cheia
+  phase_seconds{phase,type}             histograma por fase: parse, roll,
+                                        embed, execute, reply, total
+  event_loop_lag_seconds                histograma do atraso do event loop
+  gauges                                fila do agendador e do envio (ver bot)
+"""
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+
+from aiohttp import web
+
+# Limites dos baldes dos histogramas, em segundos
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+FAMILIES = {
+    "swade_messages_total": ("counter", "Mensagens recebidas pelo on_message, por desfecho"),
+    "swade_commands_total": ("counter", "Comandos executados, por tipo"),
+    "swade_command_errors_total": ("counter", "Comandos que responderam com mensagem de erro"),
+    "swade_busy_total": ("counter", "Comandos recusados por fila cheia"),
+    "swade_phase_seconds": ("histogram", "Tempo de cada fase do atendimento"),
+    "swade_event_loop_lag_seconds": ("histogram", "Atraso do event loop medido por um sleep periódico"),
+}
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def fmt_labels(labels, extra: str = "") -> str:
+    parts = [f'{k}="{escape(v)}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metrics:
+    """
+    Contadores, histogramas e gauges em memória. As rolagens rodam no pool
+    de threads, então as atualizações passam por um lock.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}     # (nome, labels) -> valor
+        self.histograms = {}   # (nome, labels) -> Histogram
+        self.gauges = {}       # nome -> (ajuda, função que devolve {labels: valor})
+        self.local = threading.local()
+
+    # ---------- Atualização ----------
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(labels.items()))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, tuple(labels.items()))
+        with self.lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.observe(seconds)
+
+    def phase(self, phase: str, type_: str, seconds: float):
+        self.observe("swade_phase_seconds", seconds, phase=phase, type=type_)
+
+    def gauge(self, name: str, help_text: str, fn):
+        """fn() -> {((label, valor), ...): número}, chamada a cada leitura."""
+        self.gauges[name] = (help_text, fn)
+
+    # ---------- Tempo de rolagem dentro de um comando ----------
+    # As funções de rolagem embrulhadas somam o tempo gasto numa variável da
+    # thread; quem executa o comando zera antes e lê depois.
+    def track_roll_time(self, fn):
+        local = self.local
+
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                local.roll_seconds = getattr(local, "roll_seconds", 0.0) + time.perf_counter() - t0
+        wrapper.__wrapped__ = fn
+        return wrapper
+
+    def reset_roll_time(self):
+        self.local.roll_seconds = 0.0
+
+    def roll_time(self) -> float:
+        return getattr(self.local, "roll_seconds", 0.0)
+
+    # ---------- Event loop ----------
+    async def watch_loop_lag(self, interval: float = 0.5):
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(interval)
+            self.observe("swade_event_loop_lag_seconds", max(0.0, loop.time() - t0 - interval))
+
+    # ---------- Exposição ----------
+    def render(self) -> str:
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {key: (list(h.counts), h.total, h.count) for key, h in self.histograms.items()}
+        lines = []
+        for name, (kind, help_text) in FAMILIES.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (series, labels), value in counters.items():
+                    if series == name:
+                        lines.append(f"{name}{fmt_labels(labels)} {value}")
+                continue
+            for (series, labels), (counts, total, count) in histograms.items():
+                if series != name:
+                    continue
+                cumulative = 0
+                for bound, n in zip(BUCKETS + ("+Inf",), counts):
+                    cumulative += n
+                    le = f'le="{bound}"'
+                    lines.append(f"{name}_bucket{fmt_labels(labels, le)} {cumulative}")
+                lines.append(f"{name}_sum{fmt_labels(labels)} {total}")
+                lines.append(f"{name}_count{fmt_labels(labels)} {count}")
+        for name, (help_text, fn) in self.gauges.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in fn().items():
+                lines.append(f"{name}{fmt_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, host: str, port: int):
+        """Sobe GET /metrics; devolve o runner (para runner.cleanup() no fim)."""
+        async def handle(request):
+            return web.Response(body=self.render().encode(),
+                                headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
@@ -0,0 +1,136 @@
+"""
+Profiler por amostragem para o bot em produção.
+
+Uma thread olha as pilhas de todas as outras threads (sys._current_frames)
+a cada `interval` segundos, durante a captura e só nela: fora da captura
+não custa nada, e durante ela o custo é o de ler as pilhas, não o de
+instrumentar cada chamada como o cProfile.
+
+A saída são dois arquivos:
+  <base>.collapsed   pilhas no formato "thread;f1;f2;f3 N" (flamegraph.pl,
+                     speedscope, inferno)
+  <base>.txt         resumo com as funções que mais aparecem (próprias e
+                     inclusivas)
+
+Amostras de threads paradas esperando (event loop no select, workers do
+pool sem tarefa, locks) não entram nas pilhas; o resumo mostra quantas foram.
+
+A thread de amostragem precisa do GIL, então só pega as outras quando elas
+o soltam: chamadas em C que liberam o GIL (numpy, I/O) ou a troca forçada
+a cada sys.getswitchinterval(). Funções que passam tempo nessas chamadas
+aparecem um pouco acima do real; para comparar antes/depois, serve bem.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+# Folhas que significam "thread esperando": (arquivo, função)
+IDLE_LEAVES = frozenset((
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("process.py", "_process_worker"),
+    ("connection.py", "_recv"),
+    ("connection.py", "wait"),
+))
+
+
+@dataclass(slots=True)
+class Profile:
+    seconds: float
+    interval: float
+    samples: int = 0                       # amostras de pilha (uma por thread por tique)
+    idle: int = 0                          # dessas, quantas eram espera
+    ticks: int = 0
+    stacks: Counter = field(default_factory=Counter)       # "thread;f1;f2" -> amostras
+    own: Counter = field(default_factory=Counter)          # função no topo da pilha
+    inclusive: Counter = field(default_factory=Counter)    # função em qualquer ponto da pilha
+
+    @property
+    def busy(self) -> int:
+        return self.samples - self.idle
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stack(frame):
+    """Lista de rótulos da raiz para a folha, e a chave (arquivo, função) da folha."""
+    leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels, leaf
+
+
+def capture(seconds: float, interval: float = 0.005) -> Profile:
+    """Amostra as pilhas das outras threads por `seconds` segundos (bloqueia quem chama)."""
+    profile = Profile(seconds, interval)
+    me = threading.get_ident()
+    names = {}
+    deadline = time.perf_counter() + seconds
+    next_tick = time.perf_counter()
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        if now < next_tick:
+            time.sleep(next_tick - now)
+        next_tick += interval
+        profile.ticks += 1
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            labels, leaf = sample_stack(frame)
+            profile.samples += 1
+            if leaf in IDLE_LEAVES:
+                profile.idle += 1
+                continue
+            name = names.get(ident)
+            if name is None:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                name = names.get(ident, f"thread-{ident}")
+            profile.stacks[";".join([name] + labels)] += 1
+            profile.own[labels[-1]] += 1
+            for label in set(labels):
+                profile.inclusive[label] += 1
+    return profile
+
+
+def summary(profile: Profile, top: int = 20) -> str:
+    busy = profile.busy or 1
+    lines = [
+        f"captura de {profile.seconds:.1f}s, um tique a cada {profile.interval * 1000:.1f} ms "
+        f"({profile.ticks} tiques)",
+        f"amostras: {profile.samples} | trabalhando: {profile.busy} | esperando: {profile.idle}",
+        "",
+        f"{'próprio':>8} {'%':>6}  função",
+    ]
+    for label, count in profile.own.most_common(top):
+        lines.append(f"{count:>8} {count / busy:>6.1%}  {label}")
+    lines += ["", f"{'inclusivo':>9} {'%':>6}  função"]
+    for label, count in profile.inclusive.most_common(top):
+        lines.append(f"{count:>9} {count / busy:>6.1%}  {label}")
+    return "\n".join(lines) + "\n"
+
+
+def write(profile: Profile, directory: str, top: int = 20):
+    """Grava <dir>/profile-AAAAMMDD-HHMMSS.{collapsed,txt}; devolve os dois caminhos."""
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, time.strftime("profile-%Y%m%d-%H%M%S"))
+    collapsed, text = base + ".collapsed", base + ".txt"
+    with open(collapsed, "w", encoding="utf-8") as f:
+        for stack, count in profile.stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    with open(text, "w", encoding="utf-8") as f:
+        f.write(summary(profile, top))
+    return collapsed, text
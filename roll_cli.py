@@ -0,0 +1,165 @@
+"""
+Rolagens sem Discord: lê comandos da entrada padrão ou de arquivos, uma
+mensagem por linha (como no chat: `3s8 +1; 2d6+d8 T5`), e escreve uma
+linha JSON por linha de entrada, na mesma ordem. Usa o mesmo parser e as
+mesmas funções de rolagem do on_message (parse_message, roll_command,
+render_json); serve para preparar encontros e para medir a vazão do motor
+sem gateway, embed nem envio.
+
+Cada linha de saída:
+  {"line": 3, "input": "...", "results": [<desfecho>, ...]}
+com um desfecho (o dict do histórico: finals, successes, raises, dice ...)
+por comando, ou {"expr": ..., "error": ...} para comando inválido; linha
+que não é rolagem sai com "error". Linhas vazias e começadas por `#` são
+puladas (mas contam na numeração).
+
+Com --seed, cada comando rola com uma semente derivada de (seed, linha,
+posição), gravada no desfecho: a saída é a mesma com qualquer --workers e
+`!replay <semente> <rolagem>` no bot repete a rolagem num canal com a
+mesma config (--dif, --selvagem e --limite; mesmo RNG_BACKEND).
+
+Com --workers > 1, blocos de --chunk linhas vão para um pool de processos
+(cada processo já devolve o JSON pronto); a saída continua em ordem e só
+alguns blocos ficam em memória por vez. No fim, vazão vai para stderr.
+
+Uso:
+  echo "3s8 +1; 2d6+d8 T5" | python roll_cli.py
+  python roll_cli.py encontro.txt --text --dif 6
+  python roll_cli.py grande.txt --workers 4 --seed 42 > resultados.jsonl
+"""
+import argparse
+import fileinput
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import bot_swade_s as bot
+from dice_rng import make_dice
+
+DEFAULT_CHUNK = 1000
+
+
+def command_seed(seed: int, line_no: int, position: int) -> int:
+    """Semente de 48 bits (como as do bot) do comando `position` da linha `line_no`."""
+    state = np.random.SeedSequence([seed, line_no, position]).generate_state(1, np.uint64)
+    return int(state[0] >> np.uint64(16))
+
+
+def evaluate_line(line_no: int, text: str, config, seed: int | None = None, with_text: bool = False):
+    """Uma linha de entrada -> (dict da saída, comandos rolados)."""
+    cmds = bot.parse_message(text, config.target, config.wild)
+    if cmds is None:
+        return {"line": line_no, "input": text, "error": "não é uma rolagem"}, 0
+    results = []
+    for position, cmd in enumerate(cmds):
+        cmd_seed = None if seed is None else command_seed(seed, line_no, position)
+        rng = None if cmd_seed is None else make_dice(bot.RNG_BACKEND, cmd_seed)
+        result = bot.roll_command(cmd, rng, config)
+        if isinstance(result, str):
+            results.append({"expr": bot.command_text(cmd), "error": result})
+            continue
+        outcome = bot.render_json(result)
+        if cmd_seed is not None:
+            outcome["seed"] = cmd_seed
+        if with_text:
+            outcome["text"] = bot.render_text(result)
+        results.append(outcome)
+    return {"line": line_no, "input": text, "results": results}, len(cmds)
+
+
+def evaluate_chunk(chunk, config, seed: int | None, with_text: bool):
+    """Bloco de (nº, linha) -> (texto JSON lines, linhas, comandos). Roda no processo filho."""
+    out, commands = [], 0
+    for line_no, text in chunk:
+        row, n = evaluate_line(line_no, text, config, seed, with_text)
+        commands += n
+        out.append(json.dumps(row, ensure_ascii=False, separators=(",", ":")))
+    return "\n".join(out) + "\n" if out else "", len(chunk), commands
+
+
+def init_worker():
+    # Cada processo com seu próprio sorteio (nada herdado do pai pelo fork)
+    bot.DICE.reseed(None)
+
+
+def read_chunks(files, size: int):
+    """Blocos de até `size` linhas (nº, texto), sem as vazias e os comentários."""
+    chunk = []
+    with fileinput.input(files or ["-"], encoding="utf-8") as lines:
+        for line_no, line in enumerate(lines, start=1):
+            text = line.strip()
+            if not text or text.startswith("#"):
+                continue
+            chunk.append((line_no, text))
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_serial(chunks, *args):
+    for chunk in chunks:
+        yield evaluate_chunk(chunk, *args)
+
+
+def run_parallel(chunks, workers: int, *args):
+    """Como run_serial, num pool; no máximo 2 blocos por processo em voo."""
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(evaluate_chunk, chunk, *args))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("files", nargs="*", help="arquivos de entrada (padrão: entrada padrão; `-` também)")
+    ap.add_argument("--dif", type=int, default=bot.T_DEFAULT, help="dificuldade quando a rolagem não traz T")
+    ap.add_argument("--selvagem", type=int, choices=sorted(bot.WILD_DIES), default=bot.WILD_DEFAULT,
+                    help="dado selvagem quando a rolagem não traz DS")
+    ap.add_argument("--limite", type=int, default=bot.MAX_COUNT,
+                    help="N# acima disso só tem resumo (sem finals/dice), como no chat")
+    ap.add_argument("--text", action="store_true", help="inclui a resposta em texto puro de cada comando")
+    ap.add_argument("--seed", type=int, help="rolagens reprodutíveis (semente por comando no desfecho)")
+    ap.add_argument("--workers", type=int, default=1, help="processos (padrão 1: sem pool; 0: um por núcleo)")
+    ap.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="linhas por bloco enviado a um processo")
+    args = ap.parse_args(argv)
+    if args.limite < 1 or args.chunk < 1:
+        ap.error("--limite e --chunk precisam ser positivos")
+
+    config = bot.ChannelConfig(args.dif, args.selvagem, False, args.limite, bot.MAX_BIG_COUNT)
+    chunks = read_chunks(args.files, args.chunk)
+    work = (config, args.seed, args.text)
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    blocks = run_parallel(chunks, workers, *work) if workers > 1 else run_serial(chunks, *work)
+
+    t0 = time.perf_counter()
+    lines = commands = 0
+    out = sys.stdout
+    try:
+        for text, n_lines, n_commands in blocks:
+            out.write(text)
+            out.flush()
+            lines += n_lines
+            commands += n_commands
+    except BrokenPipeError:
+        # `| head`: quem lê fechou; sai quieto (e sem erro ao fechar o stdout)
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    elapsed = time.perf_counter() - t0
+    print(f"{lines} linha(s), {commands} comando(s) em {elapsed:.2f} s "
+          f"({commands / elapsed if elapsed else 0:,.0f} comandos/s, {workers} processo(s))", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Histórico de rolagens em SQLite (modo WAL), só acrescenta.
+
+Quem rola não espera o disco: RollLog.log() põe a linha numa fila em
+memória com limite e volta na hora. Uma thread tira da fila e grava em
+lotes (até `batch` linhas, ou o que chegou em `flush_interval` segundos
+depois da primeira), um executemany numa transação por lote.
+
+Fila cheia: a linha nova é descartada e contada em `dropped` (e avisada
+no log uma vez a cada DROP_WARN_EVERY). O bot nunca bloqueia por causa do
+histórico; se o disco não acompanha, perde-se histórico, não rolagens.
+
+As colunas dice/finals guardam JSON; a conversão roda na thread de escrita.
+"""
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+log = logging.getLogger("swade.historico")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rolls (
+    id          INTEGER PRIMARY KEY,
+    ts          REAL    NOT NULL,
+    guild_id    INTEGER,
+    channel_id  INTEGER,
+    user_id     INTEGER,
+    type        TEXT    NOT NULL,
+    expr        TEXT    NOT NULL,
+    seed        INTEGER,
+    count       INTEGER NOT NULL,
+    successes   INTEGER NOT NULL,
+    raises      INTEGER NOT NULL,
+    crits       INTEGER NOT NULL,
+    finals      TEXT,
+    dice        TEXT
+);
+CREATE INDEX IF NOT EXISTS rolls_guild_user_ts ON rolls (guild_id, user_id, ts);
+CREATE INDEX IF NOT EXISTS rolls_channel_ts ON rolls (channel_id, ts);
+"""
+
+INSERT = """
+INSERT INTO rolls (ts, guild_id, channel_id, user_id, type, expr, seed, count, successes, raises, crits, finals, dice)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+DROP_WARN_EVERY = 1000
+_STOP = object()
+
+
+def to_json(value):
+    return None if value is None else json.dumps(value, separators=(",", ":"))
+
+
+class RollLog:
+    def __init__(self, path: str, max_queue: int = 10_000, batch: int = 500, flush_interval: float = 1.0):
+        self.path = path
+        self.queue = queue.Queue(max_queue)
+        self.batch = batch
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.thread = None
+
+    def start(self):
+        # A conexão abre aqui, para erros de caminho/permissão aparecerem na partida
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        self.thread = threading.Thread(target=self._run, args=(conn,), name="historico", daemon=True)
+        self.thread.start()
+
+    def log(self, ts: float, guild_id, channel_id, user_id, outcome: dict):
+        """Enfileira uma rolagem (um dict de desfecho do bot). Nunca bloqueia."""
+        try:
+            self.queue.put_nowait((ts, guild_id, channel_id, user_id, outcome))
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+                dropped = self.dropped
+            if dropped % DROP_WARN_EVERY == 1:
+                log.warning("fila do histórico cheia: %d rolagens descartadas até agora", dropped)
+
+    def close(self, timeout: float = 5.0):
+        """Grava o que está na fila e para a thread (espera até `timeout` segundos)."""
+        if self.thread is None:
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            log.warning("histórico: fila cheia ao encerrar, %d rolagens não gravadas", self.queue.qsize())
+            return
+        self.thread.join(timeout)
+
+    def _take_batch(self):
+        """Espera a primeira linha e junta as que chegarem até o lote encher ou o prazo vencer."""
+        first = self.queue.get()
+        if first is _STOP:
+            return [], True
+        rows = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(rows) < self.batch:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return rows, True
+            rows.append(item)
+        return rows, False
+
+    def _run(self, conn):
+        stop = False
+        while not stop:
+            items, stop = self._take_batch()
+            if not items:
+                continue
+            rows = [
+                (ts, guild_id, channel_id, user_id, o["type"], o["expr"], o.get("seed"), o["count"],
+                 o["successes"], o["raises"], o["crits"], to_json(o["finals"]), to_json(o["dice"]))
+                for ts, guild_id, channel_id, user_id, o in items
+            ]
+            try:
+                with conn:
+                    conn.executemany(INSERT, rows)
+            except sqlite3.Error:
+                log.exception("histórico: falha gravando %d rolagens", len(rows))
+                with self.lock:
+                    self.failed += len(rows)
+                continue
+            with self.lock:
+                self.written += len(rows)
+        conn.close()
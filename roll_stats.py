@@ -0,0 +1,223 @@
+"""
+Estatísticas de testes por usuário e por canal (!stats), atualizadas a
+cada rolagem sem reler histórico nenhum.
+
+Cada entrada é um array('d') plano: uma linha por lado de dado (d4..d12)
+com contadores, média e M2 de Welford dos finais e um histograma pequeno
+(falha, sucesso, 1..4 ampliações, 5+). Atualizar custa O(1) por teste.
+
+Persistência (com `path`): snapshot() grava as entradas alteradas numa
+tabela SQLite e tira da memória as que ficaram `idle_seconds` sem rolagem.
+Uma rolagem de quem não está na memória não lê o disco: começa uma entrada
+"delta" que o snapshot soma à linha gravada (Welford combina médias e M2
+de duas partes). A leitura do disco só acontece no !stats (lookup), que o
+bot chama fora do event loop. Sem `path`, entradas ociosas são descartadas.
+
+Rolagens grandes (N# acima do limite do embed) não entram: só têm resumo,
+e um 100000#s6 dominaria as médias de quem rolou.
+"""
+import math
+import sqlite3
+import threading
+import time
+from array import array
+
+DIES = (4, 6, 8, 10, 12)
+DIE_ROW = {die: row for row, die in enumerate(DIES)}
+
+# Colunas de cada linha
+ROLLS, TESTS, SUCCESSES, CRITS, WILD_SAVES, RAISES, N, MEAN, M2 = range(9)
+HIST = 9          # HIST + 0 = falha, + 1 = sucesso, + k = k-1 ampliações
+HIST_BINS = 7     # o último junta 5+ ampliações
+FIELDS = HIST + HIST_BINS
+SIZE = len(DIES) * FIELDS
+SUMMED = tuple(c for c in range(FIELDS) if c not in (N, MEAN, M2))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stats (
+    scope      TEXT    NOT NULL,
+    id         INTEGER NOT NULL,
+    last_seen  REAL    NOT NULL,
+    data       BLOB    NOT NULL,
+    PRIMARY KEY (scope, id)
+) WITHOUT ROWID;
+"""
+
+UPSERT = """
+INSERT INTO stats (scope, id, last_seen, data) VALUES (?, ?, ?, ?)
+ON CONFLICT (scope, id) DO UPDATE SET last_seen = excluded.last_seen, data = excluded.data
+"""
+
+
+def empty() -> array:
+    return array("d", bytes(SIZE * 8))
+
+
+def merge(a: array, b: array) -> array:
+    """Soma duas entradas (contadores somados; média/M2 pela fórmula de Chan)."""
+    out = array("d", a)
+    for base in range(0, SIZE, FIELDS):
+        for c in SUMMED:
+            out[base + c] += b[base + c]
+        na, nb = a[base + N], b[base + N]
+        if nb:
+            n = na + nb
+            delta = b[base + MEAN] - a[base + MEAN]
+            out[base + N] = n
+            out[base + MEAN] = a[base + MEAN] + delta * nb / n
+            out[base + M2] = a[base + M2] + b[base + M2] + delta * delta * na * nb / n
+    return out
+
+
+def describe(data: array):
+    """Uma linha por lado de dado com testes: dict com taxas e médias prontas para mostrar."""
+    rows = []
+    for die, row in DIE_ROW.items():
+        d = data[row * FIELDS:(row + 1) * FIELDS]
+        tests = d[TESTS]
+        if not tests:
+            continue
+        n = d[N]
+        rows.append({
+            "die": die, "rolls": int(d[ROLLS]), "tests": int(tests),
+            "success_rate": d[SUCCESSES] / tests, "raises_per_test": d[RAISES] / tests,
+            "crits": int(d[CRITS]), "wild_saves": int(d[WILD_SAVES]),
+            "mean_final": d[MEAN], "std_final": math.sqrt(d[M2] / (n - 1)) if n > 1 else 0.0,
+            "hist": [int(x) for x in d[HIST:HIST + HIST_BINS]],
+        })
+    return rows
+
+
+class StatsEntry:
+    __slots__ = ("data", "last_seen", "dirty", "loaded")
+
+    def __init__(self, data: array, last_seen: float, dirty: bool, loaded: bool):
+        self.data = data
+        self.last_seen = last_seen
+        self.dirty = dirty
+        self.loaded = loaded     # False: `data` é só o que chegou depois do último snapshot
+
+
+class RollStats:
+    def __init__(self, path: str = "", idle_seconds: float = 3600.0):
+        self.path = path
+        self.idle_seconds = idle_seconds
+        self.entries = {}                    # (escopo, id) -> StatsEntry
+        self.lock = threading.Lock()         # entradas em memória (rolagens, em qualquer thread)
+        self.io_lock = threading.Lock()      # disco: snapshot e lookup não se cruzam
+        self.conn = None
+        if path:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+
+    # ---------- Atualização (caminho das rolagens) ----------
+    def record(self, user_id, channel_id, outcome: dict, now: float | None = None):
+        """Soma um desfecho de teste (dict do bot) nas entradas do usuário e do canal."""
+        row = DIE_ROW.get(outcome["die"])
+        finals = outcome["finals"]
+        if row is None or finals is None:
+            return
+        now = time.time() if now is None else now
+        T_value = outcome["target"]
+        crit_idx = outcome["crit_idx"]
+        buckets = [0 if (v < T_value or i in crit_idx) else min(1 + (v - T_value) // 4, HIST_BINS - 1)
+                   for i, v in enumerate(finals)]
+        base = row * FIELDS
+        with self.lock:
+            for key in (("user", user_id), ("channel", channel_id)):
+                entry = self.entries.get(key)
+                if entry is None:
+                    entry = self.entries[key] = StatsEntry(empty(), now, True, not self.path)
+                entry.last_seen = now
+                entry.dirty = True
+                d = entry.data
+                d[base + ROLLS] += 1
+                d[base + TESTS] += len(finals)
+                d[base + SUCCESSES] += outcome["successes"]
+                d[base + CRITS] += outcome["crits"]
+                d[base + WILD_SAVES] += outcome["wild_saves"]
+                d[base + RAISES] += outcome["raises"]
+                n, mean, m2 = d[base + N], d[base + MEAN], d[base + M2]
+                for v in finals:
+                    n += 1
+                    delta = v - mean
+                    mean += delta / n
+                    m2 += delta * (v - mean)
+                d[base + N], d[base + MEAN], d[base + M2] = n, mean, m2
+                for b in buckets:
+                    d[base + HIST + b] += 1
+
+    # ---------- Leitura (!stats) — pode ler o disco: chamar fora do event loop ----------
+    def lookup(self, scope: str, ident):
+        """Cópia da entrada (array) ou None se nunca rolou."""
+        key = (scope, ident)
+        with self.io_lock:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None and entry.loaded:
+                    return array("d", entry.data)
+            stored = self._read(key)
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is None:
+                    if stored is None:
+                        return None
+                    entry = self.entries[key] = StatsEntry(stored, time.time(), False, True)
+                elif not entry.loaded:
+                    if stored is not None:
+                        entry.data = merge(stored, entry.data)
+                    entry.loaded = True
+                return array("d", entry.data)
+
+    def _read(self, key):
+        if self.conn is None:
+            return None
+        row = self.conn.execute("SELECT data FROM stats WHERE scope = ? AND id = ?", key).fetchone()
+        if row is None or len(row[0]) != SIZE * 8:
+            return None
+        data = array("d")
+        data.frombytes(row[0])
+        return data
+
+    # ---------- Manutenção (thread à parte, de tempos em tempos) ----------
+    def snapshot(self, now: float | None = None):
+        """Grava as entradas alteradas e tira da memória as ociosas. Retorna (gravadas, removidas)."""
+        now = time.time() if now is None else now
+        with self.io_lock:
+            writes = []
+            with self.lock:
+                for key, entry in self.entries.items():
+                    if not entry.dirty or self.conn is None:
+                        continue
+                    if entry.loaded:
+                        writes.append((key, entry.last_seen, array("d", entry.data), False))
+                    else:
+                        # O delta sai da entrada; o que chegar daqui em diante é um delta novo
+                        writes.append((key, entry.last_seen, entry.data, True))
+                        entry.data = empty()
+                    entry.dirty = False
+            if writes:
+                rows = []
+                for key, last_seen, data, is_delta in writes:
+                    if is_delta:
+                        stored = self._read(key)
+                        if stored is not None:
+                            data = merge(stored, data)
+                    rows.append((key[0], key[1], last_seen, data.tobytes()))
+                with self.conn:
+                    self.conn.executemany(UPSERT, rows)
+
+            cutoff = now - self.idle_seconds
+            with self.lock:
+                idle = [key for key, entry in self.entries.items()
+                        if entry.last_seen < cutoff and (not entry.dirty or self.conn is None)]
+                for key in idle:
+                    del self.entries[key]
+        return len(writes), len(idle)
+
+    def close(self):
+        if self.conn is not None:
+            self.snapshot(now=0.0)    # grava tudo; now=0 não expulsa ninguém
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,150 @@
+"""
+Sobe o bot em vários processos, cada um dono de uma faixa de shards
+(AutoShardedClient com SHARD_IDS). Configuração por variáveis de ambiente:
+
+  DISCORD_TOKEN           token do bot
+  SHARD_COUNT             total de shards (obrigatório)
+  SHARD_WORKERS           quantos processos (padrão: min(SHARD_COUNT, núcleos))
+  SHARD_CONNECT_DELAY     segundos entre IDENTIFYs do mesmo balde (padrão 5)
+  SHARD_MAX_CONCURRENCY   max_concurrency do /gateway/bot (padrão 1)
+  SHUTDOWN_TIMEOUT        segundos esperando os processos fecharem (padrão 20)
+  RESTART_DELAY           espera antes de reiniciar um processo que caiu (padrão 10)
+  SHARD_STARTUP_GRACE     segundos para os processos subirem antes do 1º IDENTIFY (padrão 5)
+  METRICS_PORT            porta das métricas do 1º processo; o processo k usa METRICS_PORT + k
+
+Os IDENTIFYs saem em horários fixos, um a cada
+SHARD_CONNECT_DELAY / SHARD_MAX_CONCURRENCY segundos no cluster inteiro
+(o shard N no horário N): o launcher passa o horário inicial em
+SHARD_IDENTIFY_START e cada processo espera o horário dos seus shards, não
+importa quanto tempo levou para subir. Shards do mesmo balde
+(id % concorrência) ficam sempre SHARD_CONNECT_DELAY segundos separados.
+
+SIGINT/SIGTERM repassam SIGTERM aos processos (o bot fecha o gateway) e,
+passado SHUTDOWN_TIMEOUT, os que sobrarem são mortos.
+
+Uso:  SHARD_COUNT=8 SHARD_WORKERS=2 python shard_launcher.py
+Teste sem rede: ver fake_gateway.py.
+"""
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+
+BOT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot_swade_s.py")
+
+log = logging.getLogger("swade.launcher")
+
+
+def shard_ranges(shard_count: int, workers: int):
+    """Divide 0..shard_count-1 em `workers` faixas contíguas: [(início, fim), ...]."""
+    workers = max(1, min(workers, shard_count))
+    base, extra = divmod(shard_count, workers)
+    ranges, start = [], 0
+    for k in range(workers):
+        size = base + (1 if k < extra else 0)
+        ranges.append((start, start + size - 1))
+        start += size
+    return ranges
+
+
+class ShardWorker:
+    def __init__(self, first: int, last: int, shard_count: int, identify_interval: float, metrics_port: int = 0):
+        self.first, self.last = first, last
+        self.shard_count = shard_count
+        self.identify_interval = identify_interval
+        self.metrics_port = metrics_port
+        self.proc = None
+
+    @property
+    def name(self):
+        return f"shards {self.first}-{self.last}"
+
+    def start(self, identify_start: float):
+        """identify_start: horário (epoch) do shard 0; o shard N identifica N intervalos depois."""
+        env = dict(os.environ)
+        env.update({
+            "SHARD_COUNT": str(self.shard_count),
+            "SHARD_IDS": f"{self.first}-{self.last}",
+            "SHARD_CONNECT_DELAY": str(self.identify_interval),
+            "SHARD_IDENTIFY_START": repr(identify_start),
+        })
+        if self.metrics_port:
+            env["METRICS_PORT"] = str(self.metrics_port)
+        self.proc = subprocess.Popen([sys.executable, BOT_SCRIPT], env=env)
+        log.info("%s: processo %s iniciado", self.name, self.proc.pid)
+
+    def running(self):
+        return self.proc is not None and self.proc.poll() is None
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)-8s %(name)s: %(message)s")
+    if not os.getenv("SHARD_COUNT", "").isdigit():
+        raise SystemExit("Defina SHARD_COUNT com o total de shards.")
+    shard_count = int(os.environ["SHARD_COUNT"])
+    workers = int(os.getenv("SHARD_WORKERS", "0")) or min(shard_count, os.cpu_count() or 1)
+    connect_delay = float(os.getenv("SHARD_CONNECT_DELAY", "5"))
+    max_concurrency = max(1, int(os.getenv("SHARD_MAX_CONCURRENCY", "1")))
+    shutdown_timeout = float(os.getenv("SHUTDOWN_TIMEOUT", "20"))
+    restart_delay = float(os.getenv("RESTART_DELAY", "10"))
+    startup_grace = float(os.getenv("SHARD_STARTUP_GRACE", "5"))
+    metrics_port = int(os.getenv("METRICS_PORT", "0"))
+
+    identify_interval = connect_delay / max_concurrency
+    pool = [
+        ShardWorker(a, b, shard_count, identify_interval, metrics_port + k if metrics_port else 0)
+        for k, (a, b) in enumerate(shard_ranges(shard_count, workers))
+    ]
+    log.info("%d shard(s) em %d processo(s), um IDENTIFY a cada %.2fs", shard_count, len(pool), identify_interval)
+
+    stopping = False
+
+    def request_stop(signum, _frame):
+        nonlocal stopping
+        if not stopping:
+            log.info("sinal %s: encerrando os processos", signal.Signals(signum).name)
+        stopping = True
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    identify_start = time.time() + startup_grace
+    for worker in pool:
+        worker.start(identify_start)
+
+    restarts = {}   # worker -> horário do reinício
+    while not stopping:
+        now = time.monotonic()
+        for worker in pool:
+            if worker.running():
+                continue
+            if worker not in restarts:
+                log.warning("%s: processo saiu com código %s; reinício em %.0fs",
+                            worker.name, worker.proc.returncode, restart_delay)
+                restarts[worker] = now + restart_delay
+            elif now >= restarts[worker]:
+                del restarts[worker]
+                # Os shards deste processo voltam em sequência, a partir de agora
+                worker.start(time.time() + startup_grace - worker.first * identify_interval)
+        time.sleep(0.2)
+
+    for worker in pool:
+        if worker.running():
+            worker.proc.terminate()
+    deadline = time.monotonic() + shutdown_timeout
+    for worker in pool:
+        if worker.proc is None:
+            continue
+        try:
+            worker.proc.wait(timeout=max(0.0, deadline - time.monotonic()))
+            log.info("%s: encerrado (código %s)", worker.name, worker.proc.returncode)
+        except subprocess.TimeoutExpired:
+            log.warning("%s: não fechou em %.0fs, matando", worker.name, shutdown_timeout)
+            worker.proc.kill()
+            worker.proc.wait()
+
+
+if __name__ == "__main__":
+    main()